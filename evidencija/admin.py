@@ -1,14 +1,137 @@
 # evidencija/admin.py
 from django.contrib import admin
-from .models import Gradiliste, Dogadjaj, Dopis
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Count, Max
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+from .models import Gradiliste, Dogadjaj, Dopis, BrojacDopisa
+
+# --- Velike tablice ---
+# Admin po defaultu na svakoj stranici radi točan COUNT(*) (i još jedan za
+# "od ukupno"), facete i sve retke inlinea – kod stotina tisuća dopisa to je
+# skuplje od same stranice.
+
+KES_FILTERA = 10 * 60  # s
+
+
+class ProcijenjeniPaginator(Paginator):
+    """
+    COUNT(*) se broji najviše do PRAG redova (podupit s LIMIT). Preko toga:
+    nefiltrirana tablica -> procjena iz sqlite_stat1 (ANALYZE) ili MAX(id),
+    filtrirani upit -> PRAG (dalje od toga treba suziti filter).
+    """
+    PRAG = 10_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        n = qs.order_by()[: self.PRAG + 1].count()
+        if n <= self.PRAG:
+            return n
+        if not qs.query.has_filters():
+            return max(n, procjena_redova(qs.model))
+        return self.PRAG
+
+
+def procjena_redova(model):
+    """Približan broj redova tablice bez brojanja."""
+    if connection.vendor == "sqlite":
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [model._meta.db_table])
+                red = cursor.fetchone()
+            if red:
+                return int(red[0].split()[0])
+        except DatabaseError:  # ANALYZE nikad nije pokrenut – nema sqlite_stat1
+            pass
+    return model.objects.aggregate(n=Max("pk"))["n"] or 0
+
+
+class GradilisteFilter(admin.SimpleListFilter):
+    """
+    Gradilišta s brojem redova u zagradi. Grupirani COUNT ide preko cijele
+    tablice pa se kešira (KES_FILTERA) umjesto da se radi na svakoj stranici.
+    """
+    title = "gradilište"
+    parameter_name = "gradiliste__id__exact"  # isti parametar kao defaultni filter
+
+    def lookups(self, request, model_admin):
+        model = model_admin.model
+        kljuc = f"admin_filter:{model._meta.label_lower}:gradiliste"
+        izbori = cache.get(kljuc)
+        if izbori is None:
+            broj = dict(model.objects.order_by().values_list("gradiliste").annotate(n=Count("pk")))
+            izbori = [
+                (str(g.pk), f"{g.naziv} ({broj.get(g.pk, 0)})")
+                for g in Gradiliste.objects.order_by("id")  # kao GradilisteAdmin.ordering
+            ]
+            cache.set(kljuc, izbori, KES_FILTERA)
+        return izbori
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(gradiliste_id=self.value())
+        return queryset
+
+
+class VelikaTablicaAdmin(admin.ModelAdmin):
+    paginator = ProcijenjeniPaginator
+    show_full_result_count = False  # bez drugog COUNT(*) za "od ukupno"
+    show_facets = admin.ShowFacets.NEVER  # facete = COUNT po svakoj opciji filtra
+
 
 # --- Inlines ---
+class StraniceFormSet(BaseInlineFormSet):
+    """Inline formset koji prikazuje (i sprema) samo jednu stranicu redova."""
+    stranica = 1
+    po_stranici = 25
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            qs = super().get_queryset()
+            self.ukupno = qs.count()
+            pocetak = (self.stranica - 1) * self.po_stranici
+            self._queryset = qs[pocetak:pocetak + self.po_stranici]
+        return self._queryset
+
+    @property
+    def stranica_od(self):
+        return min((self.stranica - 1) * self.po_stranici + 1, self.ukupno)
+
+    @property
+    def stranica_do(self):
+        return min(self.stranica * self.po_stranici, self.ukupno)
+
+    @property
+    def prethodna(self):
+        return self.stranica - 1 if self.stranica > 1 else None
+
+    @property
+    def sljedeca(self):
+        return self.stranica + 1 if self.stranica * self.po_stranici < self.ukupno else None
+
+
 class DopisInline(admin.TabularInline):
     model = Dopis
     extra = 0
     fields = ("kategorija", "oznaka", "vrsta", "poslano", "razuman_rok")
     ordering = ("poslano", "id")
     show_change_link = True
+    formset = StraniceFormSet
+    template = "admin/evidencija/dopis_inline.html"
+    parametar_stranice = "dopisi"
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)  # nova klasa za svaki request
+        try:
+            formset.stranica = max(1, int(request.GET.get(self.parametar_stranice, 1)))
+        except ValueError:
+            formset.stranica = 1
+        formset.parametar_stranice = self.parametar_stranice
+        return formset
 
 # --- Admini ---
 @admin.register(Gradiliste)
@@ -18,17 +141,25 @@ class GradilisteAdmin(admin.ModelAdmin):
     ordering = ("id",)
 
 @admin.register(Dogadjaj)
-class DogadjajAdmin(admin.ModelAdmin):
+class DogadjajAdmin(VelikaTablicaAdmin):
     list_display = ("id", "gradiliste", "broj", "naziv", "status", "preporucena_radnja", "datum")
-    list_filter  = ("gradiliste", "status", "preporucena_radnja")
+    list_filter  = (GradilisteFilter, "status", "preporucena_radnja")
+    list_select_related = ("gradiliste",)
     search_fields = ("broj", "naziv", "opis")
     ordering = ("gradiliste", "broj", "id")
     inlines = [DopisInline]
 
 @admin.register(Dopis)
-class DopisAdmin(admin.ModelAdmin):
+class DopisAdmin(VelikaTablicaAdmin):
     list_display  = ("id", "dogadjaj", "kategorija", "oznaka", "vrsta", "poslano", "razuman_rok")
-    list_filter   = ("dogadjaj__gradiliste", "kategorija", "vrsta", "poslano")
+    list_filter   = (GradilisteFilter, "kategorija", "vrsta", "poslano")
+    list_select_related = ("dogadjaj",)
     search_fields = ("broj", "oznaka", "sadrzaj")
-    ordering      = ("dogadjaj__gradiliste", "dogadjaj", "kategorija", "oznaka", "poslano", "id")
+    ordering      = ("gradiliste", "dogadjaj", "kategorija", "oznaka", "poslano", "id")
     autocomplete_fields = ("dogadjaj",)
+
+@admin.register(BrojacDopisa)
+class BrojacDopisaAdmin(admin.ModelAdmin):
+    list_display  = ("gradiliste", "kategorija", "zadnji")
+    list_filter   = ("gradiliste", "kategorija")
+    ordering      = ("gradiliste", "kategorija")
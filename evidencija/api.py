@@ -0,0 +1,147 @@
+"""
+JSON API (samo čitanje) za gradilišta, događaje i dopise – za interne izvještaje.
+
+Redovi idu ravno iz values(), bez model instanci. ?fields=a,b bira stupce
+(sparse fieldset); stupci po kojima se sortira uvijek se dohvate jer iz
+njih nastaje kursor, ali se u odgovor ne stavljaju ako nisu traženi.
+Paginacija je keyset (pagination.keyset_page) s najviše MAX_LIMIT redova po
+stranici, pa je memorija po requestu ograničena i kod velikih povlačenja –
+klijent ide po `next` dok ne dobije null.
+
+Uz ?promijenjeno_od= poredak je (updated_at, id): klijent zapamti
+updated_at zadnjeg reda i idući put povlači samo promjene.
+"""
+from datetime import datetime
+
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+
+from .pagination import NeispravanKursor, keyset_page
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+# ime u JSON-u -> polje/lookup za values()
+POLJA_GRADILISTA = {
+    "id": "id",
+    "naziv": "naziv",
+    "lokacija": "lokacija",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+POLJA_DOGADJAJA = {
+    "id": "id",
+    "gradiliste_id": "gradiliste_id",
+    "broj": "broj",
+    "naziv": "naziv",
+    "opis": "opis",
+    "datum": "datum",
+    "status": "status",
+    "preporucena_radnja": "preporucena_radnja",
+    "last_dopis_id": "last_dopis_id",
+    "last_vrsta": "last_vrsta",
+    "last_poslano": "last_poslano",
+    "effective_due": "effective_due",
+    "updated_at": "updated_at",
+}
+POLJA_DOPISA = {
+    "id": "id",
+    "gradiliste_id": "gradiliste_id",
+    "dogadjaj_id": "dogadjaj_id",
+    "dogadjaj_broj": "dogadjaj__broj",
+    "kategorija": "kategorija",
+    "oznaka": "oznaka",
+    "broj": "broj",
+    "broj_int": "broj_int",
+    "vrsta": "vrsta",
+    "poslano": "poslano",
+    "razuman_rok": "razuman_rok",
+    "sadrzaj": "sadrzaj",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+
+
+class GreskaUpita(ValueError):
+    pass
+
+
+def greska(poruka):
+    return JsonResponse({"greska": poruka}, status=400)
+
+
+def promijenjeno_od(request):
+    """?promijenjeno_od= (ISO datum ili datum+vrijeme) -> aware datetime ili None."""
+    tekst = (request.GET.get("promijenjeno_od") or "").strip()
+    if not tekst:
+        return None
+    try:
+        vrijednost = parse_datetime(tekst)
+        if vrijednost is None and (datum := parse_date(tekst)):
+            vrijednost = datetime.combine(datum, datetime.min.time())
+    except ValueError:
+        vrijednost = None
+    if vrijednost is None:
+        raise GreskaUpita(f"neispravan promijenjeno_od '{tekst}'")
+    if timezone.is_naive(vrijednost):
+        vrijednost = timezone.make_aware(vrijednost)
+    return vrijednost
+
+
+def broj(request, ime):
+    """Cjelobrojni GET parametar (npr. ?gradiliste=3) ili None."""
+    tekst = (request.GET.get(ime) or "").strip()
+    if not tekst:
+        return None
+    try:
+        return int(tekst)
+    except ValueError:
+        raise GreskaUpita(f"{ime} mora biti broj")
+
+
+def _polja(request, polja):
+    tekst = (request.GET.get("fields") or "").strip()
+    if not tekst:
+        return list(polja)
+    trazena = [p.strip() for p in tekst.split(",") if p.strip()]
+    nepoznata = [p for p in trazena if p not in polja]
+    if nepoznata:
+        raise GreskaUpita(f"nepoznata polja: {', '.join(nepoznata)}")
+    return trazena
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise GreskaUpita("limit mora biti broj")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def stranica(request, qs, polja, order=("id",)):
+    """JsonResponse s jednom stranicom: {"results": [...], "next": url|null, "next_cursor": ...}."""
+    trazena = _polja(request, polja)
+    # kursor se gradi iz sortirnih stupaca pa moraju biti u values()
+    stupci = dict.fromkeys([*trazena, *order])
+    izrazi = {ime: F(polja[ime]) for ime in stupci if polja[ime] != ime}
+    qs = qs.values(*[ime for ime in stupci if ime not in izrazi], **izrazi)
+
+    try:
+        page = keyset_page(qs, order, after=request.GET.get("nakon"), size=_limit(request), strogo=True)
+    except NeispravanKursor:
+        # API ne vraća tiho prvu stranicu – klijent bi povukao sve ispočetka
+        raise GreskaUpita("neispravan kursor")
+    suvisni = [ime for ime in stupci if ime not in trazena]
+    redovi = list(page)
+    for red in redovi:
+        for ime in suvisni:
+            del red[ime]
+
+    sljedeca = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params["nakon"] = page.next_cursor
+        sljedeca = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return JsonResponse({"results": redovi, "next": sljedeca, "next_cursor": page.next_cursor})
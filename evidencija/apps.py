@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class EvidencijaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'evidencija'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+
+        if "evidencija.profiliranje.ProfilMiddleware" in settings.MIDDLEWARE:
+            from .profiliranje import mjeri_templatee
+
+            mjeri_templatee()
@@ -0,0 +1,126 @@
+"""
+Mjerenje glavnih viewova na sintetičkim podacima (manage.py benchmark_viewova).
+
+Svaki scenarij (view + parametri) se zove kroz Django test Client: prvo par
+zagrijavanja, pa N mjerenih poziva (p50/p95 u ms, broj SQL upita), pa još
+jedan poziv pod tracemallocom za vršnu memoriju – tracemalloc usporava
+Python pa se ne miješa s vremenima.
+
+usporedi() vraća regresije prema spremljenom baselineu: broj upita je
+determinističan pa se uspoređuje točno, a vrijeme i memorija uz toleranciju
+(i apsolutni prag, da šum na brzim viewovima ne ruši mjerenje).
+"""
+import math
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Dogadjaj
+
+ZAGRIJAVANJE = 2
+MEMORIJA_PRAG_KB = 64
+
+
+@contextmanager
+def privremena_baza(**postavke):
+    """Nova SQLite baza u privremenom direktoriju (migrate); prava baza se ne dira."""
+    db = connections.settings["default"]
+    staro = {k: db.get(k) for k in ("NAME", *postavke)}
+    tmp = tempfile.mkdtemp(prefix="benchmark_")
+    connection.close()
+    db.update(NAME=str(Path(tmp) / "bench.sqlite3"), **postavke)
+    try:
+        call_command("migrate", verbosity=0, interactive=False)
+        yield Path(tmp)
+    finally:
+        connection.close()
+        db.update(staro)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def scenariji(gradiliste):
+    """ime -> URL; događaj za detalj je onaj s najviše dopisa (najgori slučaj)."""
+    g = gradiliste.pk
+    dogadjaj = (
+        Dogadjaj.objects.filter(gradiliste=gradiliste)
+        .annotate(broj_dopisa=Count("dopisi")).order_by("-broj_dopisa", "id").first()
+    )
+    lista = reverse("dogadjaj_list", args=[g])
+    dopisi = reverse("dopisi_po_kategoriji", args=[g])
+    return {
+        "dogadjaj_list": lista,
+        "dogadjaj_list_hitnost": f"{lista}?sort=hitnost",
+        "dogadjaj_detail": reverse("dogadjaj_detail", args=[g, dogadjaj.pk]),
+        "dopisi_po_kategoriji": dopisi,
+        "dopisi_po_kategoriji_zzi": f"{dopisi}?kategorija=zzi&sort=rok_desc",
+        "next_broj_for_kategorija": reverse("next_broj_for_kategorija", args=[g]) + "?kategorija=zzi",
+    }
+
+
+def percentil(vrijednosti, p):
+    """Nearest-rank percentil (p u 0–100)."""
+    v = sorted(vrijednosti)
+    return v[max(0, math.ceil(p / 100 * len(v)) - 1)]
+
+
+def mjeri(client, url, ponavljanja):
+    for _ in range(ZAGRIJAVANJE):
+        client.get(url)
+
+    vremena, upita = [], 0
+    for _ in range(ponavljanja):
+        with CaptureQueriesContext(connection) as upiti:
+            pocetak = time.perf_counter()
+            response = client.get(url)
+            vremena.append((time.perf_counter() - pocetak) * 1000)
+        upita = max(upita, len(upiti))
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: status {response.status_code}")
+
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, vrh = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentil(vremena, 50), 2),
+        "p95_ms": round(percentil(vremena, 95), 2),
+        "upita": upita,
+        "memorija_kb": round(vrh / 1024, 1),
+    }
+
+
+def usporedi(rezultati, baseline, tolerancija=0.25, prag_ms=2.0):
+    """
+    Lista regresija (tekst) za svaku skalu i scenarij koji postoje u oba.
+    `rezultati` i `baseline` su {"skale": {skala: {scenarij: mjerenje}}}.
+    """
+    regresije = []
+    for skala, mjerenja in rezultati["skale"].items():
+        for ime, sad in mjerenja.items():
+            prije = baseline.get("skale", {}).get(skala, {}).get(ime)
+            if not prije:
+                continue
+            oznaka = f"[{skala}] {ime}"
+            if sad["upita"] > prije["upita"]:
+                regresije.append(f"{oznaka}: upita {prije['upita']} -> {sad['upita']}")
+            if sad["p95_ms"] > prije["p95_ms"] * (1 + tolerancija) and sad["p95_ms"] - prije["p95_ms"] > prag_ms:
+                regresije.append(f"{oznaka}: p95 {prije['p95_ms']} -> {sad['p95_ms']} ms")
+            if (
+                sad["memorija_kb"] > prije["memorija_kb"] * (1 + tolerancija)
+                and sad["memorija_kb"] - prije["memorija_kb"] > MEMORIJA_PRAG_KB
+            ):
+                regresije.append(f"{oznaka}: memorija {prije['memorija_kb']} -> {sad['memorija_kb']} KB")
+    return regresije
+
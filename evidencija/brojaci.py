@@ -0,0 +1,88 @@
+"""
+Brojači dopisa po (gradilište, kategorija) i brojevi događaja po gradilištu.
+
+Umjesto traženja najvećeg broja regexom preko svih dopisa, zadnji
+dodijeljeni broj drži se u tablici BrojacDopisa. Rezervacija je jedan
+UPDATE ... SET zadnji = zadnji + 1 unutar transakcije, pa dva korisnika
+ne mogu dobiti isti broj.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import BrojacDopisa, Gradiliste
+
+BROJ_RE = re.compile(r"(\d+)\s*$")
+
+
+def broj_iz_oznake(tekst):
+    """Broj na kraju oznake ("ZZI 14" -> 14) ili None."""
+    m = BROJ_RE.search(str(tekst or ""))
+    return int(m.group(1)) if m else None
+
+
+def sljedeci_broj(gradiliste_id, kategorija):
+    """Broj koji bi dobio sljedeći dopis – samo čita, ništa ne rezervira."""
+    zadnji = (
+        BrojacDopisa.objects.filter(gradiliste_id=gradiliste_id, kategorija=kategorija)
+        .values_list("zadnji", flat=True)
+        .first()
+    )
+    return (zadnji or 0) + 1
+
+
+def rezerviraj_broj(gradiliste_id, kategorija):
+    """Atomarno uzima sljedeći broj za gradilište i kategoriju i vraća ga."""
+    brojac = BrojacDopisa.objects.filter(gradiliste_id=gradiliste_id, kategorija=kategorija)
+    with transaction.atomic():
+        # prvo pišemo (UPDATE zaključava red / bazu), tek onda čitamo
+        if not brojac.update(zadnji=F("zadnji") + 1):
+            try:
+                with transaction.atomic():
+                    BrojacDopisa.objects.create(
+                        gradiliste_id=gradiliste_id, kategorija=kategorija, zadnji=1
+                    )
+                return 1
+            except IntegrityError:
+                # netko ga je upravo stvorio
+                brojac.update(zadnji=F("zadnji") + 1)
+        return brojac.values_list("zadnji", flat=True).get()
+
+
+def uskladi_brojac(gradiliste_id, kategorija, broj):
+    """Pomiče brojač na barem `broj` (ručno upisani brojevi se ne ponavljaju)."""
+    if not broj:
+        return
+    brojac = BrojacDopisa.objects.filter(gradiliste_id=gradiliste_id, kategorija=kategorija)
+    with transaction.atomic():
+        if brojac.filter(zadnji__lt=broj).update(zadnji=broj) or brojac.exists():
+            return
+        try:
+            with transaction.atomic():
+                BrojacDopisa.objects.create(
+                    gradiliste_id=gradiliste_id, kategorija=kategorija, zadnji=broj
+                )
+        except IntegrityError:
+            # netko ga je upravo stvorio
+            brojac.filter(zadnji__lt=broj).update(zadnji=broj)
+
+
+def rezerviraj_brojeve_dogadjaja(gradiliste_id, koliko=1):
+    """
+    Atomarno uzima `koliko` uzastopnih brojeva događaja za gradilište i
+    vraća prvi. Brojač je stupac Gradiliste.zadnji_broj_dogadjaja.
+    """
+    gradiliste = Gradiliste.objects.filter(pk=gradiliste_id)
+    with transaction.atomic():
+        if not gradiliste.update(zadnji_broj_dogadjaja=F("zadnji_broj_dogadjaja") + koliko):
+            raise Gradiliste.DoesNotExist(gradiliste_id)
+        zadnji = gradiliste.values_list("zadnji_broj_dogadjaja", flat=True).get()
+    return zadnji - koliko + 1
+
+
+def uskladi_broj_dogadjaja(gradiliste_id, broj):
+    """Pomiče brojač događaja na barem `broj` (ručno upisani broj)."""
+    Gradiliste.objects.filter(pk=gradiliste_id, zadnji_broj_dogadjaja__lt=broj).update(
+        zadnji_broj_dogadjaja=broj
+    )
@@ -0,0 +1,182 @@
+"""
+Export registra dopisa (CSV / XLSX) kao generator bajtova za StreamingHttpResponse.
+
+Redovi dolaze iz values_list(...).iterator(chunk_size=...), pa se u memoriji
+drži samo jedan chunk, a prvi bajtovi idu klijentu odmah.
+
+XLSX je običan ZIP s nekoliko XML-ova; zipfile zna pisati u tok koji nije
+seekable (data descriptor iza svakog fajla), pa se list (sheet1.xml)
+piše red po red i bajtovi se predaju dalje čim ih zipfile izbaci.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from .models import Dopis
+
+CHUNK_SIZE = 2000
+
+# (naslov stupca, polje za values_list)
+STUPCI = [
+    ("Događaj", "dogadjaj__broj"),
+    ("Naziv događaja", "dogadjaj__naziv"),
+    ("Kategorija", "kategorija"),
+    ("Oznaka", "oznaka"),
+    ("Broj", "broj"),
+    ("Vrsta", "vrsta"),
+    ("Poslano", "poslano"),
+    ("Razuman rok", "razuman_rok"),
+    ("Sadržaj", "sadrzaj"),
+]
+
+_PRIKAZ = {
+    "kategorija": dict(Dopis.KATEGORIJA_CHOICES),
+    "vrsta": dict(Dopis.VRSTA_CHOICES),
+}
+
+
+def redovi(dopisi, ordering):
+    """Tuple vrijednosti za STUPCI, choices zamijenjeni labelama."""
+    polja = [polje for _, polje in STUPCI]
+    indeksi = [(i, _PRIKAZ[p]) for i, p in enumerate(polja) if p in _PRIKAZ]
+    qs = dopisi.order_by(*ordering).values_list(*polja)
+    for red in qs.iterator(chunk_size=CHUNK_SIZE):
+        red = list(red)
+        for i, labele in indeksi:
+            red[i] = labele.get(red[i], red[i])
+        yield red
+
+
+# --- CSV ---
+
+class _Echo:
+    """csv.writer piše u ovo, a mi samo vratimo redak (vidi Django docs)."""
+
+    def write(self, value):
+        return value
+
+
+def csv_dijelovi(rows):
+    writer = csv.writer(_Echo(), delimiter=";")
+    # BOM da Excel prepozna UTF-8 (č, ć, ž...)
+    yield "\ufeff" + writer.writerow([naslov for naslov, _ in STUPCI])
+    for red in rows:
+        yield writer.writerow(["" if v is None else v for v in red])
+
+
+# --- XLSX ---
+
+_NEDOPUSTENO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_EXCEL_EPOHA = date(1899, 12, 30)
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Dopisi" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# stil 0 = obično, 1 = datum (ugrađeni format 14), 2 = podebljano (zaglavlje)
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="1"><fill><patternFill patternType="none"/></fill></fills>
+<borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf/></cellStyleXfs>
+<cellXfs count="3"><xf/><xf numFmtId="14" applyNumberFormat="1"/><xf fontId="1" applyFont="1"/></cellXfs>
+</styleSheet>"""
+
+_SHEET_POCETAK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+_SHEET_KRAJ = "</sheetData></worksheet>"
+
+
+def _celija(v, stil=0):
+    if v is None or v == "":
+        return "<c/>"
+    if isinstance(v, bool):
+        return f'<c t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, (int, float)):
+        return f"<c><v>{v}</v></c>"
+    if isinstance(v, datetime):
+        v = v.date()
+    if isinstance(v, date):
+        return f'<c s="1"><v>{(v - _EXCEL_EPOHA).days}</v></c>'
+    tekst = escape(_NEDOPUSTENO_XML.sub("", str(v)))
+    s = f' s="{stil}"' if stil else ""
+    return f'<c t="inlineStr"{s}><is><t xml:space="preserve">{tekst}</t></is></c>'
+
+
+def _red(vrijednosti, stil=0):
+    return "<row>" + "".join(_celija(v, stil) for v in vrijednosti) + "</row>"
+
+
+class _Tok:
+    """Write-only, ne-seekable 'datoteka' – skuplja bajtove dok ih ne pokupimo."""
+
+    def __init__(self):
+        self.dijelovi = []
+
+    def write(self, b):
+        self.dijelovi.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def pokupi(self):
+        b = b"".join(self.dijelovi)
+        self.dijelovi.clear()
+        return b
+
+
+def xlsx_dijelovi(rows, redova_po_dijelu=500):
+    tok = _Tok()
+    with zipfile.ZipFile(tok, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for ime, sadrzaj in (
+            ("[Content_Types].xml", _CONTENT_TYPES),
+            ("_rels/.rels", _RELS),
+            ("xl/workbook.xml", _WORKBOOK),
+            ("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS),
+            ("xl/styles.xml", _STYLES),
+        ):
+            zf.writestr(ime, sadrzaj)
+        yield tok.pokupi()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(_SHEET_POCETAK.encode())
+            sheet.write(_red([naslov for naslov, _ in STUPCI], stil=2).encode())
+            buf = []
+            for red in rows:
+                buf.append(_red(red))
+                if len(buf) >= redova_po_dijelu:
+                    sheet.write("".join(buf).encode())
+                    buf.clear()
+                    # deflate drži dio u sebi – šaljemo tek kad nešto izbaci
+                    if tok.dijelovi:
+                        yield tok.pokupi()
+            sheet.write(("".join(buf) + _SHEET_KRAJ).encode())
+    yield tok.pokupi()
@@ -0,0 +1,105 @@
+"""
+Keš izrenderanih redova dogadjaj_list po gradilištu.
+
+Ključ = gradilište + Gradiliste.verzija i updated_at (dižu se signalima
+pri svakoj promjeni događaja / dopisa / priloga, vidi signals.py) + parametri
+prikaza + današnji datum (badgeovi ovise o danu). Stari ključevi se ne
+brišu – nakon promjene se jednostavno više ne traže i isteknu.
+
+Radi s bilo kojim Django cache backendom (locmem, filebased...).
+Brojači pogodaka/promašaja broje se u procesu, a u keš se prebacuju tek
+svakih ZAPISI_SVAKIH dohvata (i na izlazu procesa) – nema dodatnog pisanja
+u keš na svaki request. incr na filebased kešu nije atomaran pa je
+statistika približna (ali se gubi najviše jedan paket, ne svaki request).
+Brojke se čitaju iz procesa koji poslužuje (view kes_statistika, samo
+staff) – s locmem kešem to je jedino mjesto gdje postoje; naredba
+kes_statistika vidi samo zajednički keš (KES_DIR).
+"""
+import atexit
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+TIMEOUT = 24 * 60 * 60
+PREFIKS = "dogadjaj_list"
+BROJACI = ("hit", "miss")
+ZAPISI_SVAKIH = 100
+
+_lokalno = Counter()
+_lock = threading.Lock()
+
+
+def kljuc(gradiliste, *parametri):
+    # created_at razlikuje gradilište od nekog starijeg s istim ID-em (npr. baza
+    # vraćena iz backupa ili ispražnjena) – verzija tada kreće opet od 0
+    dijelovi = [
+        gradiliste.pk,
+        gradiliste.created_at.timestamp() if gradiliste.created_at else "",
+        gradiliste.verzija,
+        gradiliste.updated_at.timestamp() if gradiliste.updated_at else "",
+        timezone.localdate().isoformat(),
+        *parametri,
+    ]
+    sazetak = hashlib.md5("|".join(map(str, dijelovi)).encode()).hexdigest()
+    return f"{PREFIKS}:{gradiliste.pk}:{sazetak}"
+
+
+def _uzmi_lokalno():
+    with _lock:
+        brojaci = dict(_lokalno)
+        _lokalno.clear()
+    return brojaci
+
+
+def _broji(ime):
+    with _lock:
+        _lokalno[ime] += 1
+        if sum(_lokalno.values()) < ZAPISI_SVAKIH:
+            return
+    zapisi_statistiku()
+
+
+def zapisi_statistiku():
+    """Prebacuje brojače ovog procesa u keš (zajednički svim procesima s KES_DIR)."""
+    for ime, n in _uzmi_lokalno().items():
+        k = f"{PREFIKS}:brojac:{ime}"
+        if cache.add(k, n, timeout=None):
+            continue
+        try:
+            cache.incr(k, n)
+        except ValueError:  # istekao/izbačen između add i incr
+            cache.set(k, n, timeout=None)
+
+
+# gunicorn/uwsgi worker na uobičajenom gašenju ne ostavlja neprebačen paket
+atexit.register(zapisi_statistiku)
+
+
+def zajednicki():
+    """Dijele li procesi keš (pa i brojače) – locmem je zaseban za svaki proces."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def dohvati(k):
+    vrijednost = cache.get(k)
+    _broji("miss" if vrijednost is None else "hit")
+    return vrijednost
+
+
+def spremi(k, vrijednost):
+    cache.set(k, vrijednost, TIMEOUT)
+
+
+def statistika():
+    zapisi_statistiku()  # i ono što je ovaj proces izbrojio od zadnjeg zapisa
+    vrijednosti = cache.get_many([f"{PREFIKS}:brojac:{ime}" for ime in BROJACI])
+    return {ime: vrijednosti.get(f"{PREFIKS}:brojac:{ime}", 0) for ime in BROJACI}
+
+
+def resetiraj_statistiku():
+    _uzmi_lokalno()
+    cache.delete_many([f"{PREFIKS}:brojac:{ime}" for ime in BROJACI])
@@ -0,0 +1,125 @@
+"""
+Usporedba SQLite profila pod istovremenim pisanjem i čitanjem dopisa.
+
+Za svaki profil napravi se nova privremena baza (migrate), a zatim
+N dretvi pisaca sprema dopise (puni Dopis.save – brojač, signali) i
+M dretvi čitatelja lista dopise gradilišta kao dopisi_po_kategoriji.
+Nakon svake operacije zove se close_old_connections(), kao na kraju
+requesta, pa se vidi i razlika CONN_MAX_AGE=0 / trajna konekcija.
+
+Prava baza iz settingsa se ne dira.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from evidencija.benchmark import privremena_baza
+from evidencija.models import Dogadjaj, Dopis, Gradiliste
+from evidencija.pagination import keyset_page
+
+PROFILI = {
+    # ono što je bilo prije: rollback journal, DEFERRED, nova konekcija po requestu
+    "default": {"OPTIONS": {}, "CONN_MAX_AGE": 0},
+    "tuned": {"OPTIONS": settings.SQLITE_OPTIONS, "CONN_MAX_AGE": 600},
+}
+
+
+class Command(BaseCommand):
+    help = "Mjeri propusnost i 'database is locked' greške za SQLite profile (default / tuned)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pisaca", type=int, default=4, help="broj dretvi koje spremaju dopise")
+        parser.add_argument("--citatelja", type=int, default=4, help="broj dretvi koje čitaju")
+        parser.add_argument("--trajanje", type=float, default=5.0, help="sekundi po profilu")
+        parser.add_argument(
+            "--profil", choices=[*PROFILI, "oba"], default="oba", help="koji profil mjeriti"
+        )
+
+    def handle(self, *args, **options):
+        profili = list(PROFILI) if options["profil"] == "oba" else [options["profil"]]
+        for ime in profili:
+            r = self.mjeri(PROFILI[ime], options["pisaca"], options["citatelja"], options["trajanje"])
+            t = r["trajanje"]
+            self.stdout.write(
+                f"{ime:8} pisanja: {r['pisanja']:6} ({r['pisanja'] / t:7.1f}/s)  "
+                f"čitanja: {r['citanja']:6} ({r['citanja'] / t:7.1f}/s)  "
+                f"locked: {r['locked']:4}  ostale greške: {r['greske']}"
+            )
+            if r.get("prva_greska"):
+                self.stdout.write(self.style.WARNING(f"         {r['prva_greska']}"))
+
+    def mjeri(self, profil, pisaca, citatelja, trajanje):
+        with privremena_baza(**profil):
+            g = Gradiliste.objects.create(naziv="Benchmark")
+            dogadjaji = [
+                d.pk
+                for d in Dogadjaj.objects.bulk_create_numbered(
+                    Dogadjaj(gradiliste=g, naziv=f"Događaj {i}", preporucena_radnja="zzi")
+                    for i in range(50)
+                )
+            ]
+            connection.close()
+            return self.pokreni(g.pk, dogadjaji, pisaca, citatelja, trajanje)
+
+    def pokreni(self, gradiliste_id, dogadjaji, pisaca, citatelja, trajanje):
+        brojac = Counter()
+        lock = threading.Lock()
+        kraj = threading.Event()
+        start = threading.Barrier(pisaca + citatelja + 1)
+
+        def pisi():
+            Dopis.objects.create(
+                dogadjaj_id=random.choice(dogadjaji),
+                kategorija="zzi",
+                vrsta=random.choice(["incoming", "outgoing"]),
+            )
+            return "pisanja"
+
+        def citaj():
+            list(
+                keyset_page(
+                    Dopis.objects.select_related("dogadjaj").filter(gradiliste_id=gradiliste_id),
+                    ("-poslano", "-id"),
+                )
+            )
+            return "citanja"
+
+        def radi(posao):
+            start.wait()
+            try:
+                while not kraj.is_set():
+                    try:
+                        kljuc = posao()
+                    except OperationalError as e:
+                        kljuc = "locked" if "locked" in str(e) else "greske"
+                        with lock:
+                            brojac.setdefault("prva_greska", str(e))
+                    with lock:
+                        brojac[kljuc] += 1
+                    close_old_connections()  # kraj "requesta"
+            finally:
+                connection.close()
+
+        dretve = [threading.Thread(target=radi, args=(pisi,)) for _ in range(pisaca)]
+        dretve += [threading.Thread(target=radi, args=(citaj,)) for _ in range(citatelja)]
+        for t in dretve:
+            t.start()
+        start.wait()
+        t0 = time.monotonic()
+        time.sleep(trajanje)
+        kraj.set()
+        for t in dretve:
+            t.join()
+        return {
+            "pisanja": brojac["pisanja"],
+            "citanja": brojac["citanja"],
+            "locked": brojac["locked"],
+            "greske": brojac["greske"],
+            "prva_greska": brojac.get("prva_greska"),
+            "trajanje": time.monotonic() - t0,
+        }
@@ -0,0 +1,96 @@
+"""
+Benchmark dogadjaj_list, dogadjaj_detail, dopisi_po_kategoriji i
+next_broj_for_kategorija na sintetičkim podacima (vidi benchmark.py).
+
+Za svaku skalu (broj događaja po gradilištu) nova privremena baza i
+privremeni MEDIA_ROOT; prava baza se ne dira. Keš je isključen (DummyCache),
+osim uz --s-kesom – inače bi se dogadjaj_list mjerio samo iz keša.
+
+  manage.py benchmark_viewova --izlaz rezultat.json --baseline baseline.json
+  manage.py benchmark_viewova --baseline baseline.json --spremi-baseline
+
+Ako je neki scenarij sporiji od baselinea preko tolerancije (ili ima više
+upita), naredba završava s greškom – može ići u CI.
+"""
+import json
+import platform
+import tempfile
+from pathlib import Path
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from evidencija.benchmark import mjeri, privremena_baza, scenariji, usporedi
+from evidencija.models import Gradiliste
+from evidencija.sinteticki import Skala, generiraj
+
+BEZ_KESA = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+class Command(BaseCommand):
+    help = "Mjeri p50/p95, broj upita i vršnu memoriju glavnih viewova na sintetičkim podacima."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skale", default="100,1000", help="događaja po gradilištu, zarezom odvojeno")
+        parser.add_argument("--ponavljanja", type=int, default=20, help="mjerenih poziva po scenariju")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--izlaz", help="JSON s rezultatima")
+        parser.add_argument("--baseline", help="JSON s kojim se uspoređuje")
+        parser.add_argument("--spremi-baseline", action="store_true", help="rezultat zapiši u --baseline")
+        parser.add_argument("--tolerancija", type=float, default=0.25, help="dopušteni rast p95 i memorije (0.25 = 25 %%)")
+        parser.add_argument("--prag-ms", type=float, default=2.0, help="manji rast p95 od ovoga se ne broji")
+        parser.add_argument("--s-kesom", action="store_true", help="mjeri s uključenim kešom")
+
+    def handle(self, *args, **options):
+        try:
+            skale = [int(s) for s in options["skale"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--skale mora biti lista brojeva, npr. 100,1000")
+        if options["spremi_baseline"] and not options["baseline"]:
+            raise CommandError("--spremi-baseline traži --baseline")
+
+        rezultati = {
+            "seed": options["seed"],
+            "ponavljanja": options["ponavljanja"],
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "skale": {},
+        }
+        for skala in skale:
+            self.stdout.write(f"Skala {skala} događaja po gradilištu...")
+            rezultati["skale"][str(skala)] = mjerenja = self.mjeri_skalu(skala, options)
+            for ime, m in mjerenja.items():
+                self.stdout.write(
+                    f"  {ime:28} p50 {m['p50_ms']:8.2f} ms  p95 {m['p95_ms']:8.2f} ms  "
+                    f"upita {m['upita']:3}  memorija {m['memorija_kb']:9.1f} KB"
+                )
+
+        if options["izlaz"]:
+            Path(options["izlaz"]).write_text(json.dumps(rezultati, indent=2, ensure_ascii=False))
+        if options["spremi_baseline"]:
+            Path(options["baseline"]).write_text(json.dumps(rezultati, indent=2, ensure_ascii=False))
+            self.stdout.write(self.style.SUCCESS(f"Baseline zapisan u {options['baseline']}"))
+            return
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text())
+            regresije = usporedi(rezultati, baseline, options["tolerancija"], options["prag_ms"])
+            for r in regresije:
+                self.stdout.write(self.style.ERROR(r))
+            if regresije:
+                raise CommandError(f"{len(regresije)} regresija prema {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("Bez regresija prema baselineu."))
+
+    def mjeri_skalu(self, skala, options):
+        postavke = {"ALLOWED_HOSTS": ["testserver"], "PROFIL_UZORAK": 0}
+        if not options["s_kesom"]:
+            postavke["CACHES"] = BEZ_KESA
+        with tempfile.TemporaryDirectory(prefix="benchmark_media_") as media, \
+                override_settings(MEDIA_ROOT=media, **postavke), privremena_baza():
+            # dva gradilišta da tablice nisu samo od mjerenog
+            generiraj(Skala(gradilista=2, dogadjaja=skala), seed=options["seed"])
+            g = Gradiliste.objects.order_by("id").first()
+            client = Client()
+            client.force_login(User.objects.create_user("benchmark"))
+            return {ime: mjeri(client, url, options["ponavljanja"]) for ime, url in scenariji(g).items()}
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from evidencija.prilozi import dedupliciraj
+
+
+class Command(BaseCommand):
+    help = "Prebacuje stare priloge (prilozi/<ime>) u spremište po SHA-256; duplikati se brišu."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="samo izračunaj uštedu, ništa ne mijenjaj")
+
+    def handle(self, *args, **options):
+        r = dedupliciraj(dry_run=options["dry_run"])
+        for ime in r.nedostaje:
+            self.stdout.write(self.style.WARNING(f"  nema datoteke: {ime}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Datoteka: {r.datoteka}, duplikata: {r.duplikata}, "
+                f"{'moglo bi se osloboditi' if options['dry_run'] else 'oslobođeno'}: "
+                f"{r.oslobodeno / 2**20:.1f} MB"
+            )
+        )
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from evidencija.sinteticki import Skala, generiraj
+
+
+class Command(BaseCommand):
+    help = "Puni bazu sintetičkim gradilištima, događajima, dopisima, bilješkama i prilozima (isti seed = isti podaci)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--gradilista", type=int, default=1)
+        parser.add_argument("--dogadjaja", type=int, default=100, help="događaja po gradilištu")
+        parser.add_argument("--dopisa", type=float, default=4, help="prosječno dopisa po događaju")
+        parser.add_argument("--biljeski", type=float, default=0.5, help="prosječno bilješki po dopisu")
+        parser.add_argument("--priloga", type=float, default=0.2, help="prosječno priloga po dopisu")
+        parser.add_argument("--blobova", type=int, default=20, help="različitih sadržaja priloga")
+        parser.add_argument("--autor", help="korisničko ime autora bilješki")
+
+    def handle(self, *args, **options):
+        autor = None
+        if options["autor"]:
+            try:
+                autor = User.objects.get(username=options["autor"])
+            except User.DoesNotExist:
+                raise CommandError(f"nema korisnika '{options['autor']}'")
+        skala = Skala(**{k: options[k] for k in ("gradilista", "dogadjaja", "dopisa", "biljeski", "priloga", "blobova")})
+        r = generiraj(skala, seed=options["seed"], autor=autor)
+        self.stdout.write(self.style.SUCCESS(
+            f"Gradilišta: {r.gradilista}, događaja: {r.dogadjaja}, dopisa: {r.dopisa}, "
+            f"bilješki: {r.biljeski}, priloga: {r.priloga}"
+        ))
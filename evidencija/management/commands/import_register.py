@@ -0,0 +1,56 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from evidencija.models import Gradiliste
+from evidencija.uvoz import CHUNK_SIZE, Uvoz
+
+
+class Command(BaseCommand):
+    help = (
+        "Uvozi povijesni registar događaja i dopisa iz CSV-a za jedno gradilište "
+        "(bulk_create u komadima). Stupci: vidi evidencija/uvoz.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("datoteka", help="CSV (UTF-8, ',' ili ';')")
+        parser.add_argument("--gradiliste", type=int, required=True, help="ID gradilišta")
+        parser.add_argument("--dry-run", action="store_true", help="sve provjeri, ništa ne spremi")
+        parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="redova po transakciji")
+        parser.add_argument("--delimiter", help="separator (zadano: pogađa se iz zaglavlja)")
+        parser.add_argument("--greske", help="CSV u koji se zapišu neispravni redovi (redak, greška)")
+
+    def handle(self, *args, **options):
+        try:
+            gradiliste = Gradiliste.objects.get(pk=options["gradiliste"])
+        except Gradiliste.DoesNotExist:
+            raise CommandError(f"Gradilište {options['gradiliste']} ne postoji.")
+
+        t0 = time.monotonic()
+        try:
+            with open(options["datoteka"], encoding="utf-8-sig", newline="") as f:
+                rezultat = Uvoz(gradiliste, chunk_size=options["chunk"]).pokreni(
+                    f, delimiter=options["delimiter"], dry_run=options["dry_run"]
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options["greske"]:
+            with open(options["greske"], "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["redak", "greska"])
+                writer.writerows(rezultat.greske)
+        else:
+            for redak, poruka in rezultat.greske[:20]:
+                self.stderr.write(f"redak {redak}: {poruka}")
+            if len(rezultat.greske) > 20:
+                self.stderr.write(f"... i još {len(rezultat.greske) - 20} (--greske za sve)")
+
+        poruka = (
+            f"{'[dry-run] ' if options['dry_run'] else ''}"
+            f"redova: {rezultat.redova}, novih događaja: {rezultat.dogadjaja}, "
+            f"dopisa: {rezultat.dopisa}, grešaka: {len(rezultat.greske)} "
+            f"({time.monotonic() - t0:.1f} s)"
+        )
+        self.stdout.write(self.style.SUCCESS(poruka) if not rezultat.greske else self.style.WARNING(poruka))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from evidencija import kes
+
+
+class Command(BaseCommand):
+    help = (
+        "Pogoci/promašaji keša redova dogadjaj_list iz zajedničkog keša (KES_DIR). "
+        "S locmem kešem brojke su samo u worker procesu – tada /kes/statistika/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="nakon ispisa vrati brojače na 0")
+
+    def handle(self, *args, **options):
+        if not kes.zajednicki():
+            raise CommandError(
+                "keš nije zajednički (locmem) – brojke su u worker procesima, vidi /kes/statistika/"
+            )
+        s = kes.statistika()
+        ukupno = s["hit"] + s["miss"]
+        omjer = f"{100 * s['hit'] / ukupno:.1f} %" if ukupno else "-"
+        self.stdout.write(f"pogoci: {s['hit']}  promašaji: {s['miss']}  omjer pogodaka: {omjer}")
+        if options["reset"]:
+            kes.resetiraj_statistiku()
+            self.stdout.write("Brojači vraćeni na 0.")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from evidencija.prilozi import PRAG_SATI, pocisti, prebroji_reference
+
+
+class Command(BaseCommand):
+    help = "Briše blobove priloga bez referenci i stare nedovršene uploade (inače noću kroz crontab, vidi CRONJOBS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sati", type=int, default=PRAG_SATI, help="samo blobovi nekorišteni barem toliko sati")
+        parser.add_argument("--prebroji", action="store_true", help="prije čišćenja prebroji reference iz tablice priloga")
+        parser.add_argument("--dry-run", action="store_true", help="samo ispiši što bi se obrisalo")
+
+    def handle(self, *args, **options):
+        if options["prebroji"]:
+            prebroji_reference()
+        r = pocisti(prag_sati=options["sati"], dry_run=options["dry_run"])
+        for ime in r.obrisano:
+            self.stdout.write(f"  {ime}")
+        glagol = "Za brisanje" if options["dry_run"] else "Obrisano"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{glagol}: {len(r.obrisano)} blobova, {r.oslobodeno / 2**20:.1f} MB, "
+                f"nedovršenih uploada: {r.uploada}"
+            )
+        )
@@ -0,0 +1,28 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from evidencija.models import PodsjetnikStanje
+from evidencija.podsjetnik import pokreni, sazetak
+
+
+class Command(BaseCommand):
+    help = "Ručno pokretanje podsjetnika na rokove (inače ga pokreće crontab, vidi CRONJOBS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dana", type=int, help="prag u danima (default settings.PODSJETNIK_DANA)")
+        parser.add_argument("--dry-run", action="store_true", help="samo ispiši, bez maila i bez pomicanja watermarka")
+        parser.add_argument("--ispocetka", action="store_true", help="zaboravi watermark – pregledaj sve događaje")
+
+    def handle(self, *args, **options):
+        if options["ispocetka"]:
+            PodsjetnikStanje.objects.filter(pk=1).delete()
+        try:
+            r = pokreni(dana=options["dana"], posalji=not options["dry_run"])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        if options["dry_run"] and r.dogadjaji:
+            self.stdout.write(sazetak(r.dogadjaji, timezone.localdate()))
+        self.stdout.write(
+            self.style.SUCCESS(f"Događaja u podsjetniku: {len(r.dogadjaji)}, mail poslan: {'da' if r.poslano else 'ne'}")
+        )
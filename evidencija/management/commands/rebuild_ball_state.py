@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from evidencija.models import Dogadjaj, rebuild_ball_state
+
+
+class Command(BaseCommand):
+    help = "Ponovno izračuna stanje po zadnjem dopisu (last_dopis, last_vrsta, last_poslano, effective_due) za sve događaje."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gradiliste", type=int, help="samo događaji tog gradilišta (ID)")
+
+    def handle(self, *args, **options):
+        qs = Dogadjaj.objects.all()
+        if options["gradiliste"]:
+            qs = qs.filter(gradiliste_id=options["gradiliste"])
+        n = rebuild_ball_state(qs)
+        self.stdout.write(self.style.SUCCESS(f"Osvježeno događaja: {n}"))
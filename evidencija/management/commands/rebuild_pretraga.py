@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from evidencija.pretraga import podrzano, rebuild_pretragu
+
+
+class Command(BaseCommand):
+    help = "Ponovno puni FTS5 indeks pretrage (dopisi i događaji) iz tablica."
+
+    def handle(self, *args, **options):
+        if not podrzano():
+            raise CommandError("Pretraga (FTS5) postoji samo na SQLite bazi.")
+        n = rebuild_pretragu()
+        self.stdout.write(self.style.SUCCESS(f"Indeksirano redova: {n}"))
@@ -0,0 +1,13 @@
+# evidencija/migrations/0012_merge_20260216_1121.py
+from django.db import migrations
+
+class Migration(migrations.Migration):
+
+    # 0013 ovisi o ovoj migraciji, a datoteka nije bila u repozitoriju
+    dependencies = [
+        ('evidencija', '0011_dogadjaj_status_alter_dopis_kategorija'),
+    ]
+
+    operations = [
+        # prazno – ovo je samo merge marker
+    ]
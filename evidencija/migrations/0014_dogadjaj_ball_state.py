@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:28
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def popuni_ball_state(apps, schema_editor):
+    Dogadjaj = apps.get_model('evidencija', 'Dogadjaj')
+    Dopis = apps.get_model('evidencija', 'Dopis')
+    zadnji = Dopis.objects.filter(dogadjaj=OuterRef('pk')).order_by('-poslano', '-id')
+    rok = Coalesce(
+        'razuman_rok',
+        models.ExpressionWrapper(F('poslano') + datetime.timedelta(days=7), output_field=models.DateField()),
+    )
+    Dogadjaj.objects.update(
+        last_dopis=Subquery(zadnji.values('id')[:1]),
+        last_vrsta=Subquery(zadnji.values('vrsta')[:1]),
+        last_poslano=Subquery(zadnji.values('poslano')[:1]),
+        effective_due=Subquery(zadnji.annotate(rok=rok).values('rok')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0013_merge_20260216_1510'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dogadjaj',
+            name='effective_due',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Rok po zadnjem dopisu'),
+        ),
+        migrations.AddField(
+            model_name='dogadjaj',
+            name='last_dopis',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='evidencija.dopis'),
+        ),
+        migrations.AddField(
+            model_name='dogadjaj',
+            name='last_poslano',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Zadnji dopis poslan'),
+        ),
+        migrations.AddField(
+            model_name='dogadjaj',
+            name='last_vrsta',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, verbose_name='Vrsta zadnjeg dopisa'),
+        ),
+        migrations.AddIndex(
+            model_name='dogadjaj',
+            index=models.Index(fields=['gradiliste', 'last_vrsta', 'effective_due', 'id'], name='dogadjaj_hitnost_idx'),
+        ),
+        migrations.RunPython(popuni_ball_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:30
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BROJ_RE = re.compile(r"(\d+)\s*$")
+
+
+def popuni_brojace(apps, schema_editor):
+    """Jednokratno: najveći postojeći broj (broj_int, oznaka, broj) po gradilištu i kategoriji."""
+    Dopis = apps.get_model('evidencija', 'Dopis')
+    BrojacDopisa = apps.get_model('evidencija', 'BrojacDopisa')
+    najveci = {}
+    redovi = (
+        Dopis.objects.exclude(kategorija='')
+        .filter(dogadjaj__gradiliste__isnull=False)
+        .values_list('dogadjaj__gradiliste_id', 'kategorija', 'broj_int', 'oznaka', 'broj')
+    )
+    for gradiliste_id, kategorija, broj_int, oznaka, broj in redovi.iterator(chunk_size=2000):
+        n = broj_int or 0
+        for tekst in (oznaka, broj):
+            m = BROJ_RE.search(tekst or '')
+            if m:
+                n = max(n, int(m.group(1)))
+        kljuc = (gradiliste_id, kategorija)
+        najveci[kljuc] = max(najveci.get(kljuc, 0), n)
+    BrojacDopisa.objects.bulk_create(
+        BrojacDopisa(gradiliste_id=g, kategorija=k, zadnji=n)
+        for (g, k), n in najveci.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0014_dogadjaj_ball_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrojacDopisa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kategorija', models.CharField(max_length=30, verbose_name='Kategorija dopisa')),
+                ('zadnji', models.PositiveIntegerField(default=0, verbose_name='Zadnji dodijeljeni broj')),
+                ('gradiliste', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brojaci_dopisa', to='evidencija.gradiliste')),
+            ],
+            options={
+                'verbose_name': 'Brojač dopisa',
+                'verbose_name_plural': 'Brojači dopisa',
+                'constraints': [models.UniqueConstraint(fields=('gradiliste', 'kategorija'), name='uniq_brojac_dopisa')],
+            },
+        ),
+        migrations.RunPython(popuni_brojace, migrations.RunPython.noop),
+    ]
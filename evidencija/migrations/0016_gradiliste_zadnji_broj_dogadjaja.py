@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:31
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def popuni_brojac(apps, schema_editor):
+    Gradiliste = apps.get_model('evidencija', 'Gradiliste')
+    Dogadjaj = apps.get_model('evidencija', 'Dogadjaj')
+    najveci = (
+        Dogadjaj.objects.filter(gradiliste=OuterRef('pk'))
+        .values('gradiliste')
+        .annotate(m=Max('broj'))
+        .values('m')
+    )
+    Gradiliste.objects.update(zadnji_broj_dogadjaja=Coalesce(Subquery(najveci), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0015_brojacdopisa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradiliste',
+            name='zadnji_broj_dogadjaja',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Zadnji broj događaja'),
+        ),
+        migrations.RunPython(popuni_brojac, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def normaliziraj_oznaku(kategorija, oznaka):
+    # kopija evidencija.models.normaliziraj_oznaku (migracija ne smije ovisiti o kodu koji se mijenja)
+    oznaka = " ".join((oznaka or "").split())
+    if not kategorija or not oznaka:
+        return None
+    return oznaka.casefold()
+
+
+def popuni(apps, schema_editor):
+    Dogadjaj = apps.get_model('evidencija', 'Dogadjaj')
+    Dopis = apps.get_model('evidencija', 'Dopis')
+    Dopis.objects.update(
+        gradiliste_id=Subquery(Dogadjaj.objects.filter(pk=OuterRef('dogadjaj_id')).values('gradiliste_id')[:1])
+    )
+
+    promijenjeni, vidjeni, duplikati = [], {}, []
+    redovi = Dopis.objects.exclude(kategorija='').exclude(oznaka='').only(
+        'id', 'gradiliste_id', 'kategorija', 'oznaka'
+    )
+    for dp in redovi.iterator(chunk_size=2000):
+        dp.oznaka_norm = normaliziraj_oznaku(dp.kategorija, dp.oznaka)
+        if dp.oznaka_norm is None:
+            continue
+        if dp.gradiliste_id is not None:
+            kljuc = (dp.gradiliste_id, dp.kategorija, dp.oznaka_norm)
+            if kljuc in vidjeni:
+                duplikati.append((vidjeni[kljuc], dp.id, dp.oznaka))
+            vidjeni[kljuc] = dp.id
+        promijenjeni.append(dp)
+    if duplikati:
+        popis = "\n".join(f"  dopis {a} i {b}: {oznaka!r}" for a, b, oznaka in duplikati)
+        raise RuntimeError(
+            "Postoje dopisi s istom oznakom na istom gradilištu i kategoriji – "
+            "ispravi ih prije migracije:\n" + popis
+        )
+    Dopis.objects.bulk_update(promijenjeni, ['oznaka_norm'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0016_gradiliste_zadnji_broj_dogadjaja'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dopis',
+            name='gradiliste',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dopisi', to='evidencija.gradiliste'),
+        ),
+        migrations.AddField(
+            model_name='dopis',
+            name='oznaka_norm',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='Oznaka (normalizirana)'),
+        ),
+        migrations.RunPython(popuni, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dopis',
+            constraint=models.UniqueConstraint(fields=('gradiliste', 'kategorija', 'oznaka_norm'), name='uniq_oznaka_per_gradiliste', violation_error_message='Ta oznaka već postoji za tu vrstu dopisa na ovom gradilištu.'),
+        ),
+    ]
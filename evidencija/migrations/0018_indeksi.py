@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0017_dopis_gradiliste_oznaka_norm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dogadjaj',
+            name='gradiliste',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dogadjaji', to='evidencija.gradiliste'),
+        ),
+        migrations.AlterField(
+            model_name='dopis',
+            name='dogadjaj',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='dopisi', to='evidencija.dogadjaj'),
+        ),
+        migrations.AlterField(
+            model_name='dopis',
+            name='gradiliste',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dopisi', to='evidencija.gradiliste'),
+        ),
+        migrations.AddIndex(
+            model_name='dogadjaj',
+            index=models.Index(fields=['gradiliste', 'datum', 'id'], name='dogadjaj_datum_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['dogadjaj', 'poslano', 'id'], name='dopis_dog_poslano_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['dogadjaj', 'razuman_rok', 'id'], name='dopis_dog_rok_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['dogadjaj', 'broj', 'id'], name='dopis_dog_broj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'poslano', 'id'], name='dopis_grad_poslano_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'razuman_rok', 'id'], name='dopis_grad_rok_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'broj', 'id'], name='dopis_grad_broj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'kategorija', 'poslano', 'id'], name='dopis_kat_poslano_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'kategorija', 'razuman_rok', 'id'], name='dopis_kat_rok_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'kategorija', 'broj', 'id'], name='dopis_kat_broj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['gradiliste', 'dogadjaj', 'kategorija', 'oznaka', 'poslano', 'id'], name='dopis_admin_idx'),
+        ),
+    ]
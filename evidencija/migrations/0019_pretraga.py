@@ -0,0 +1,96 @@
+from django.db import migrations
+
+# kopija SQL-a iz evidencija.pretraga u trenutku ove migracije
+# (migracija ne smije ovisiti o kodu koji se mijenja)
+TABLICA = """
+    CREATE VIRTUAL TABLE evidencija_pretraga USING fts5(
+        gradiliste_id, naslov, tekst,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+TRIGGERI = [
+    # dopisi
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_ai AFTER INSERT ON evidencija_dopis BEGIN
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_au
+    AFTER UPDATE OF oznaka, sadrzaj, gradiliste_id ON evidencija_dopis BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id;
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_ad AFTER DELETE ON evidencija_dopis BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id;
+    END
+    """,
+    # događaji
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_ai AFTER INSERT ON evidencija_dogadjaj BEGIN
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_au
+    AFTER UPDATE OF naziv, opis, gradiliste_id ON evidencija_dogadjaj BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id + 1;
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_ad AFTER DELETE ON evidencija_dogadjaj BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id + 1;
+    END
+    """,
+]
+
+OBRISI_TRIGGERE = [
+    f"DROP TRIGGER IF EXISTS evidencija_pretraga_{ime}"
+    for ime in ("dopis_ai", "dopis_au", "dopis_ad", "dogadjaj_ai", "dogadjaj_au", "dogadjaj_ad")
+]
+
+PUNI = [
+    """
+    INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+    SELECT 2 * id, gradiliste_id, oznaka, sadrzaj FROM evidencija_dopis
+    """,
+    """
+    INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+    SELECT 2 * id + 1, gradiliste_id, naziv, opis FROM evidencija_dogadjaj
+    """,
+    "INSERT INTO evidencija_pretraga(evidencija_pretraga) VALUES ('optimize')",
+]
+
+
+def stvori(apps, schema_editor):
+    # FTS5 postoji samo u SQLiteu – na drugim bazama pretraga ostaje isključena
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in [TABLICA, *TRIGGERI, *PUNI]:
+        schema_editor.execute(sql)
+
+
+def obrisi(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in [*OBRISI_TRIGGERE, "DROP TABLE IF EXISTS evidencija_pretraga"]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("evidencija", "0018_indeksi"),
+    ]
+
+    operations = [
+        migrations.RunPython(stvori, obrisi),
+    ]
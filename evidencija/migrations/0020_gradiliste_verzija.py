@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0019_pretraga'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradiliste',
+            name='verzija',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Verzija'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+# kopija FTS triggera iz 0019 (migracija ne smije ovisiti o kodu koji se mijenja)
+TRIGGERI = [
+    # dopisi
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_ai AFTER INSERT ON evidencija_dopis BEGIN
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_au
+    AFTER UPDATE OF oznaka, sadrzaj, gradiliste_id ON evidencija_dopis BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id;
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dopis_ad AFTER DELETE ON evidencija_dopis BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id;
+    END
+    """,
+    # događaji
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_ai AFTER INSERT ON evidencija_dogadjaj BEGIN
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_au
+    AFTER UPDATE OF naziv, opis, gradiliste_id ON evidencija_dogadjaj BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id + 1;
+        INSERT INTO evidencija_pretraga(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    """
+    CREATE TRIGGER evidencija_pretraga_dogadjaj_ad AFTER DELETE ON evidencija_dogadjaj BEGIN
+        DELETE FROM evidencija_pretraga WHERE rowid = 2 * old.id + 1;
+    END
+    """,
+]
+
+OBRISI_TRIGGERE = [
+    f"DROP TRIGGER IF EXISTS evidencija_pretraga_{ime}"
+    for ime in ("dopis_ai", "dopis_au", "dopis_ad", "dogadjaj_ai", "dogadjaj_au", "dogadjaj_ad")
+]
+
+
+def triggeri(apps, schema_editor):
+    # AddField ovdje na SQLiteu radi novu tablicu pa nestanu FTS triggeri
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in OBRISI_TRIGGERE + TRIGGERI:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0020_gradiliste_verzija'),
+    ]
+
+    operations = [
+        # unatrag: RemoveField opet radi novu tablicu, triggeri se vraćaju na kraju
+        migrations.RunPython(migrations.RunPython.noop, triggeri),
+        migrations.AddField(
+            model_name='dogadjaj',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='dopis',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='gradiliste',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(triggeri, migrations.RunPython.noop),
+    ]
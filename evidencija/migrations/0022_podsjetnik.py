@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0021_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PodsjetnikStanje',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zadnje_pokretanje', models.DateTimeField(blank=True, null=True, verbose_name='Zadnje pokretanje')),
+                ('zadnji_datum', models.DateField(blank=True, null=True, verbose_name='Datum zadnjeg pokretanja')),
+            ],
+            options={
+                'verbose_name': 'Stanje podsjetnika',
+                'verbose_name_plural': 'Stanje podsjetnika',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dogadjaj',
+            index=models.Index(fields=['updated_at'], name='dogadjaj_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dogadjaj',
+            index=models.Index(fields=['last_vrsta', 'effective_due'], name='dogadjaj_rok_idx'),
+        ),
+    ]
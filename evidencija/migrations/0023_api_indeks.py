@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0022_podsjetnik'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dopis',
+            index=models.Index(fields=['updated_at', 'id'], name='dopis_updated_idx'),
+        ),
+    ]
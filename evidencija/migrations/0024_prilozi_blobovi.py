@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:59
+
+import django.utils.timezone
+import evidencija.prilozi
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0023_api_indeks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prilog',
+            name='ime',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Izvorno ime datoteke'),
+        ),
+        migrations.AlterField(
+            model_name='prilog',
+            name='file',
+            field=models.FileField(storage=evidencija.prilozi.storage, upload_to='prilozi/'),
+        ),
+        migrations.CreateModel(
+            name='Datoteka',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ime', models.CharField(max_length=100, unique=True, verbose_name='Ime u spremištu')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('velicina', models.PositiveBigIntegerField(verbose_name='Veličina (B)')),
+                ('reference', models.IntegerField(default=0, verbose_name='Broj referenci')),
+                ('zadnje_koristeno', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Zadnje korišteno')),
+            ],
+            options={
+                'verbose_name': 'Datoteka priloga',
+                'verbose_name_plural': 'Datoteke priloga',
+                'indexes': [models.Index(fields=['reference', 'zadnje_koristeno'], name='datoteka_gc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def popuni_sazetke(apps, schema_editor):
+    """Jednokratno za postojeća gradilišta (dalje ih održava models.osvjezi_sazetke)."""
+    Gradiliste = apps.get_model('evidencija', 'Gradiliste')
+    Dogadjaj = apps.get_model('evidencija', 'Dogadjaj')
+    Dopis = apps.get_model('evidencija', 'Dopis')
+    GradilisteSazetak = apps.get_model('evidencija', 'GradilisteSazetak')
+    sazeci = {pk: GradilisteSazetak(gradiliste_id=pk, zadnja_aktivnost=timezone.now())
+              for pk in Gradiliste.objects.values_list('id', flat=True)}
+    for red in Dogadjaj.objects.filter(gradiliste__isnull=False).order_by().values('gradiliste_id').annotate(
+        otvoreno=Count('id', filter=Q(status='otvoreno')),
+        odgovoreno=Count('id', filter=Q(status='odgovoreno')),
+        zatvoreno=Count('id', filter=Q(status='zatvoreno')),
+        na_nama=Count('id', filter=Q(status='otvoreno', last_vrsta='incoming')),
+    ):
+        s = sazeci[red.pop('gradiliste_id')]
+        for k, v in red.items():
+            setattr(s, k, v)
+    for gradiliste_id, kategorija, n in (
+        Dopis.objects.filter(gradiliste__isnull=False).order_by()
+        .values_list('gradiliste_id', 'kategorija').annotate(n=Count('id'))
+    ):
+        s = sazeci[gradiliste_id]
+        s.po_kategoriji[kategorija] = n
+        s.dopisa += n
+    GradilisteSazetak.objects.bulk_create(sazeci.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidencija', '0024_prilozi_blobovi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradilisteSazetak',
+            fields=[
+                ('gradiliste', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sazetak', serialize=False, to='evidencija.gradiliste')),
+                ('otvoreno', models.PositiveIntegerField(default=0, verbose_name='Otvorenih događaja')),
+                ('odgovoreno', models.PositiveIntegerField(default=0, verbose_name='Odgovorenih događaja')),
+                ('zatvoreno', models.PositiveIntegerField(default=0, verbose_name='Zatvorenih događaja')),
+                ('na_nama', models.PositiveIntegerField(default=0, verbose_name='Otvorenih, na nama potez')),
+                ('dopisa', models.PositiveIntegerField(default=0, verbose_name='Dopisa')),
+                ('po_kategoriji', models.JSONField(default=dict, verbose_name='Dopisa po kategoriji')),
+                ('zadnja_aktivnost', models.DateTimeField(blank=True, null=True, verbose_name='Zadnja promjena')),
+            ],
+            options={
+                'verbose_name': 'Sažetak gradilišta',
+                'verbose_name_plural': 'Sažeci gradilišta',
+            },
+        ),
+        migrations.RunPython(popuni_sazetke, migrations.RunPython.noop),
+    ]
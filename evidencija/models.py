@@ -1,18 +1,54 @@
-from django.db import models
+import os
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from datetime import timedelta
 from django.utils import timezone  # koristimo Django-ov timezone
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import (
+    Case, Count, DateField, DurationField, ExpressionWrapper, F, Func, IntegerField, OuterRef, Q,
+    Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+
+from . import prilozi
 
 # helper za default rok (+7 dana) – ovo se može serijalizirati u migracijama
 def default_razuman_rok():
     return timezone.localdate() + timedelta(days=7)
 
+def normaliziraj_oznaku(kategorija, oznaka):
+    """
+    Oznaka za provjeru jedinstvenosti: bez razmaka na rubovima, jedan razmak
+    unutra, casefold. None ako dopis nema kategoriju ili oznaku (tada se
+    jedinstvenost ne provjerava – NULL-ovi se u unique indeksu ne sudaraju).
+    """
+    oznaka = " ".join((oznaka or "").split())
+    if not kategorija or not oznaka:
+        return None
+    return oznaka.casefold()
+
+def rok_dopisa(dp):
+    """Rok za odgovor na dopis: razuman_rok, a ako ga nema poslano + 7 dana (ili None)."""
+    if dp.razuman_rok:
+        return dp.razuman_rok
+    if dp.poslano:
+        return dp.poslano + timedelta(days=7)
+    return None
+
 class Gradiliste(models.Model):
     naziv = models.CharField("Naziv gradilišta", max_length=200, unique=True)
     lokacija = models.CharField("Lokacija", max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # brojač za Dogadjaj.broj (vidi brojaci.rezerviraj_brojeve_dogadjaja)
+    zadnji_broj_dogadjaja = models.PositiveIntegerField("Zadnji broj događaja", default=0, editable=False)
+    # raste pri svakoj promjeni događaja/dopisa/priloga gradilišta (signals.py) –
+    # dio ključa keša za dogadjaj_list (kes.py)
+    verzija = models.PositiveIntegerField("Verzija", default=0, editable=False)
+    # zadnja promjena gradilišta ili bilo čega na njemu (oznaci_promjenu) –
+    # ETag/Last-Modified stranica gradilišta (views._promjena_gradilista)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["naziv"]
@@ -22,6 +58,124 @@ class Gradiliste(models.Model):
     def __str__(self):
         return self.naziv
 
+    # brojače dižu samo UPDATE-i s F() – spremanje forme/admina iz starije
+    # instance ne smije ih vratiti unatrag (sudar broja, stari ETag/keš)
+    BROJACI = ("zadnji_broj_dogadjaja", "verzija")
+
+    def save(self, *args, **kwargs):
+        novo = self._state.adding
+        if not novo and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in self.BROJACI
+            ]
+        super().save(*args, **kwargs)
+        if novo:
+            # sažetak se dalje samo pomiče (pomakni_sazetak) – mora postojati od početka
+            GradilisteSazetak.objects.get_or_create(gradiliste=self)
+
+# --- rokovi i boje kao anotacije (jedno mjesto za pravila; views.py samo
+# prevodi ključeve u CSS klase i tekst) ---
+
+# dopis: broj dana do roka ispod kojeg je badge žut
+DOPIS_USKORO_DANA = 2
+# događaj: broj dana do roka ispod kojeg je red žut
+DOGADJAJ_USKORO_DANA = 14
+
+
+def rok_dopisa_expr(prefix=""):
+    """SQL verzija rok_dopisa(): razuman_rok, inače poslano + 7 dana."""
+    return Coalesce(
+        f"{prefix}razuman_rok",
+        ExpressionWrapper(F(f"{prefix}poslano") + timedelta(days=7), output_field=DateField()),
+    )
+
+
+def _do_roka(rok, today):
+    """rok - danas kao interval (timedelta; .days je broj dana, negativno = kasni)."""
+    return ExpressionWrapper(rok - Value(today, output_field=DateField()), output_field=DurationField())
+
+
+class DogadjajQuerySet(models.QuerySet):
+    def s_stanjem(self, today=None):
+        """
+        Anotira `do_roka` (effective_due - danas) i `stanje`:
+        zatvoreno / odgovoreno / kasni / uskoro / ok – po zadnjem dopisu,
+        samo ako je loptica kod nas (zadnji dopis ulazni).
+        """
+        today = today or timezone.localdate()
+        kod_nas = Q(last_vrsta="incoming", effective_due__isnull=False)
+        return self.annotate(
+            do_roka=_do_roka(F("effective_due"), today),
+            stanje=Case(
+                When(status="zatvoreno", then=Value("zatvoreno")),
+                When(status="odgovoreno", then=Value("odgovoreno")),
+                When(kod_nas & Q(effective_due__lt=today), then=Value("kasni")),
+                When(
+                    kod_nas & Q(effective_due__lte=today + timedelta(days=DOGADJAJ_USKORO_DANA)),
+                    then=Value("uskoro"),
+                ),
+                default=Value("ok"),
+                output_field=models.CharField(),
+            ),
+        )
+
+    def broj_po_stanju(self, today=None):
+        """{stanje: broj događaja} – jedan GROUP BY upit."""
+        return dict(
+            self.s_stanjem(today).order_by().values_list("stanje").annotate(n=Count("id"))
+        )
+
+
+class DopisQuerySet(models.QuerySet):
+    def s_rokom(self, today=None):
+        """
+        Anotira `rok` (kao rok_dopisa), `do_roka` (rok - danas) i `rok_stanje`:
+        zatvoreno / kod_njih / bez_roka / kasni / uskoro / ok. Stanje ovisi o
+        događaju (status, tko je na potezu), pa upit radi JOIN na događaj.
+        """
+        today = today or timezone.localdate()
+        return self.annotate(
+            rok=rok_dopisa_expr(),
+        ).annotate(
+            do_roka=_do_roka(F("rok"), today),
+            rok_stanje=Case(
+                When(dogadjaj__status="zatvoreno", then=Value("zatvoreno")),
+                When(~Q(dogadjaj__last_vrsta="incoming"), then=Value("kod_njih")),
+                When(rok__isnull=True, then=Value("bez_roka")),
+                When(rok__lt=today, then=Value("kasni")),
+                When(rok__lte=today + timedelta(days=DOPIS_USKORO_DANA), then=Value("uskoro")),
+                default=Value("ok"),
+                output_field=models.CharField(),
+            ),
+        )
+
+
+class DogadjajManager(models.Manager.from_queryset(DogadjajQuerySet)):
+    def bulk_create_numbered(self, objs, batch_size=None):
+        """
+        bulk_create koji događajima bez broja dodjeljuje uzastopne brojeve –
+        jedan UPDATE brojača po gradilištu, umjesto upita po redu (uvoz registra).
+        """
+        from .brojaci import rezerviraj_brojeve_dogadjaja, uskladi_broj_dogadjaja
+
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            bez_broja, najveci = {}, {}
+            for obj in objs:
+                if not obj.gradiliste_id:
+                    raise ValueError("bulk_create_numbered traži gradilište za svaki događaj")
+                if obj.broj is None:
+                    bez_broja.setdefault(obj.gradiliste_id, []).append(obj)
+                else:
+                    najveci[obj.gradiliste_id] = max(najveci.get(obj.gradiliste_id, 0), obj.broj)
+            for gradiliste_id, broj in najveci.items():
+                uskladi_broj_dogadjaja(gradiliste_id, broj)
+            for gradiliste_id, grupa in bez_broja.items():
+                prvi = rezerviraj_brojeve_dogadjaja(gradiliste_id, len(grupa))
+                for i, obj in enumerate(grupa):
+                    obj.broj = prvi + i
+            return self.bulk_create(objs, batch_size=batch_size)
+
 class Dogadjaj(models.Model):
     STATUS_CHOICES = [
         ("otvoreno", "Otvoreno"),
@@ -50,7 +204,16 @@ class Dogadjaj(models.Model):
     opis = models.TextField("Opis", blank=True)
     datum = models.DateField("Datum događaja", default=timezone.localdate)
     preporucena_radnja = models.CharField("Preporučena radnja", max_length=20, choices=RADNJA_CHOICES)
-    gradiliste = models.ForeignKey("Gradiliste", on_delete=models.CASCADE, related_name="dogadjaji", null=True, blank=True)
+    # bez zasebnog FK indeksa – pokrivaju ga uniq_broj_per_gradiliste i Meta.indexes
+    gradiliste = models.ForeignKey("Gradiliste", on_delete=models.CASCADE, related_name="dogadjaji", null=True, blank=True, db_index=False)
+
+    # "loptica" – stanje po zadnjem dopisu; održava se signalima pri svakom
+    # spremanju/brisanju dopisa (signals.py), ručno: manage.py rebuild_ball_state
+    last_dopis = models.ForeignKey("Dopis", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
+    last_vrsta = models.CharField("Vrsta zadnjeg dopisa", max_length=20, null=True, blank=True, editable=False)
+    last_poslano = models.DateField("Zadnji dopis poslan", null=True, blank=True, editable=False)
+    effective_due = models.DateField("Rok po zadnjem dopisu", null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Događaj"
@@ -59,19 +222,90 @@ class Dogadjaj(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['gradiliste', 'broj'], name='uniq_broj_per_gradiliste')  # ⬅ NOVO
         ]
+        indexes = [
+            # SORT_MAP u dogadjaj_list (broj pokriva uniq_broj_per_gradiliste)
+            models.Index(fields=['gradiliste', 'datum', 'id'], name='dogadjaj_datum_idx'),
+            # sortiranje "hitnost" u dogadjaj_list
+            models.Index(fields=['gradiliste', 'last_vrsta', 'effective_due', 'id'], name='dogadjaj_hitnost_idx'),
+            # podsjetnik.py – promjene od zadnjeg pokretanja i rokovi koji prelaze prag
+            models.Index(fields=['updated_at'], name='dogadjaj_updated_idx'),
+            models.Index(fields=['last_vrsta', 'effective_due'], name='dogadjaj_rok_idx'),
+        ]
+
+    objects = DogadjajManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # pamtimo gradilište iz baze – dopisi ga imaju denormalizirano
+        instance._loaded_gradiliste_id = instance.__dict__.get("gradiliste_id")
+        return instance
 
     def save(self, *args, **kwargs):
-        if self.broj is None:  # ako nije ručno zadan
-            qs = Dogadjaj.objects.all()
+        from .brojaci import rezerviraj_brojeve_dogadjaja, uskladi_broj_dogadjaja
+
+        # brojač se mijenja u istoj transakciji kao i INSERT – ako spremanje
+        # ne uspije, broj se vraća i ne nastaje rupa
+        with transaction.atomic():
+            # stanje iz baze (ne iz možda zastarjele instance) – za pomak sažetka
+            prije = None
+            if not self._state.adding and self.pk:
+                prije = (
+                    Dogadjaj.objects.filter(pk=self.pk)
+                    .values_list("gradiliste_id", "status", "last_vrsta").first()
+                )
             if self.gradiliste_id:
-                qs = qs.filter(gradiliste_id=self.gradiliste_id)
-            last = qs.order_by('-broj').first()
-            self.broj = 1 if not last or not last.broj else last.broj + 1
-        super().save(*args, **kwargs)
+                if self.broj is None:  # ako nije ručno zadan
+                    self.broj = rezerviraj_brojeve_dogadjaja(self.gradiliste_id)
+                else:
+                    uskladi_broj_dogadjaja(self.gradiliste_id, self.broj)
+            elif self.broj is None:
+                last = Dogadjaj.objects.filter(gradiliste__isnull=True).order_by('-broj').first()
+                self.broj = 1 if not last or not last.broj else last.broj + 1
+            super().save(*args, **kwargs)
+            if (
+                hasattr(self, "_loaded_gradiliste_id")
+                and self._loaded_gradiliste_id != self.gradiliste_id
+            ):
+                Dopis.objects.filter(dogadjaj=self).update(gradiliste_id=self.gradiliste_id)
+                # signal je već osvježio oba gradilišta, ali prije premještanja dopisa;
+                # premještanje je rijetko – sažeci oba gradilišta se izračunaju ispočetka
+                oznaci_promjenu({self._loaded_gradiliste_id, self.gradiliste_id})
+                osvjezi_sazetke({self._loaded_gradiliste_id, self.gradiliste_id})
+            elif prije is None or prije[0] == self.gradiliste_id:
+                pomakni_sazetak(self.gradiliste_id, razlika(
+                    doprinos_dogadjaja(*prije[1:]) if prije else {},
+                    doprinos_dogadjaja(self.status, self.last_vrsta),
+                ))
+            else:  # premješten iz instance bez _loaded_gradiliste_id
+                osvjezi_sazetke({prije[0], self.gradiliste_id})
+            self._loaded_gradiliste_id = self.gradiliste_id
 
     def __str__(self):
         return f"{self.broj} – {self.naziv} ({self.get_preporucena_radnja_display()})"
 
+    @property
+    def ball_on_us(self):
+        """Loptica je na nama ako je zadnji dopis ulazni."""
+        return self.last_vrsta == "incoming"
+
+    def refresh_ball_state(self):
+        """Ponovno izračuna stanje po zadnjem dopisu i spremi samo ta polja."""
+        prije = doprinos_dogadjaja(self.status, self.last_vrsta)
+        last = self.dopisi.order_by("-poslano", "-id").first()
+        self.last_dopis = last
+        self.last_vrsta = last.vrsta if last else None
+        self.last_poslano = last.poslano if last else None
+        self.effective_due = rok_dopisa(last) if last else None
+        Dogadjaj.objects.filter(pk=self.pk).update(
+            last_dopis=self.last_dopis,
+            last_vrsta=self.last_vrsta,
+            last_poslano=self.last_poslano,
+            effective_due=self.effective_due,
+            updated_at=timezone.now(),
+        )
+        pomakni_sazetak(self.gradiliste_id, razlika(prije, doprinos_dogadjaja(self.status, self.last_vrsta)))
+
 class Dopis(models.Model):
     VRSTA_CHOICES = [
         ('incoming', 'Ulazno'),
@@ -89,7 +323,8 @@ class Dopis(models.Model):
         ('dopis', 'Dopis'),
     ]
 
-    dogadjaj = models.ForeignKey(Dogadjaj, on_delete=models.CASCADE, related_name="dopisi")
+    # FK indekse (dogadjaj, gradiliste) pokrivaju složeni indeksi iz Meta.indexes
+    dogadjaj = models.ForeignKey(Dogadjaj, on_delete=models.CASCADE, related_name="dopisi", db_index=False)
     broj_int = models.PositiveIntegerField("Broj dopisa (INT)", null=True, blank=True)
     broj = models.CharField("Broj dopisa (staro)", max_length=50, blank=True)
     vrsta = models.CharField("Vrsta dopisa", max_length=20, choices=VRSTA_CHOICES, default='incoming')
@@ -99,13 +334,90 @@ class Dopis(models.Model):
     razuman_rok = models.DateField("Razuman rok za odgovor", default=default_razuman_rok)
     sadrzaj = models.TextField("Sadržaj", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # denormalizirano iz dogadjaj.gradiliste i oznake – puni se u save(),
+    # a jedinstvenost oznake provjerava baza (uniq_oznaka_per_gradiliste)
+    gradiliste = models.ForeignKey(Gradiliste, on_delete=models.CASCADE, related_name="dopisi", null=True, blank=True, editable=False, db_index=False)
+    oznaka_norm = models.CharField("Oznaka (normalizirana)", max_length=100, null=True, blank=True, editable=False)
+
+    objects = DopisQuerySet.as_manager()
 
     class Meta:
         # sortirajmo po novom integeru (pa tie-break po id)
         ordering = ["poslano", "id"]
         verbose_name = "Dopis"
         verbose_name_plural = "Dopisi"
-       
+        constraints = [
+            models.UniqueConstraint(
+                fields=["gradiliste", "kategorija", "oznaka_norm"],
+                name="uniq_oznaka_per_gradiliste",
+                violation_error_message="Ta oznaka već postoji za tu vrstu dopisa na ovom gradilištu.",
+            ),
+        ]
+        # indeksi prate poretke iz views.py (D_SORT_MAP, ordering_map) i DopisAdmin.ordering,
+        # tako da SQLite čita redove već sortirane (bez full scana i TEMP B-TREE) –
+        # provjerava ih UpitniPlanoviTest
+        indexes = [
+            # dopisi jednog događaja: dogadjaj_list (prefetch), dogadjaj_detail
+            models.Index(fields=["dogadjaj", "poslano", "id"], name="dopis_dog_poslano_idx"),
+            models.Index(fields=["dogadjaj", "razuman_rok", "id"], name="dopis_dog_rok_idx"),
+            models.Index(fields=["dogadjaj", "broj", "id"], name="dopis_dog_broj_idx"),
+            # dopisi_po_kategoriji – sve kategorije
+            models.Index(fields=["gradiliste", "poslano", "id"], name="dopis_grad_poslano_idx"),
+            models.Index(fields=["gradiliste", "razuman_rok", "id"], name="dopis_grad_rok_idx"),
+            models.Index(fields=["gradiliste", "broj", "id"], name="dopis_grad_broj_idx"),
+            # dopisi_po_kategoriji – jedna kategorija
+            models.Index(fields=["gradiliste", "kategorija", "poslano", "id"], name="dopis_kat_poslano_idx"),
+            models.Index(fields=["gradiliste", "kategorija", "razuman_rok", "id"], name="dopis_kat_rok_idx"),
+            models.Index(fields=["gradiliste", "kategorija", "broj", "id"], name="dopis_kat_broj_idx"),
+            # DopisAdmin.ordering
+            models.Index(fields=["gradiliste", "dogadjaj", "kategorija", "oznaka", "poslano", "id"], name="dopis_admin_idx"),
+            # API: ?promijenjeno_od= (poredak updated_at, id)
+            models.Index(fields=["updated_at", "id"], name="dopis_updated_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # pamtimo događaj iz baze – ako se dopis premjesti, treba osvježiti oba
+        instance._loaded_dogadjaj_id = instance.__dict__.get("dogadjaj_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.dogadjaj_id:
+            self.gradiliste_id = self.dogadjaj.gradiliste_id
+        self.oznaka_norm = normaliziraj_oznaku(self.kategorija, self.oznaka)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "gradiliste", "oznaka_norm"}
+
+        # broj po kategoriji: prazan -> rezerviraj sljedeći, ručno upisan -> pomakni brojač;
+        # sve u istoj transakciji kao i INSERT – neuspjelo spremanje (npr. duplikat
+        # oznake) vraća i brojač, pa u registru ne nastaje rupa
+        with transaction.atomic():
+            prije = None
+            if not self._state.adding and self.pk:
+                prije = Dopis.objects.filter(pk=self.pk).values_list("gradiliste_id", "kategorija").first()
+            if self.kategorija and self.dogadjaj_id:
+                from .brojaci import rezerviraj_broj, uskladi_brojac, broj_iz_oznake
+
+                gradiliste_id = self.gradiliste_id
+                if gradiliste_id:
+                    if self.broj_int is None:
+                        self.broj_int = rezerviraj_broj(gradiliste_id, self.kategorija)
+                    najveci = max(
+                        self.broj_int,
+                        broj_iz_oznake(self.oznaka) or 0,
+                        broj_iz_oznake(self.broj) or 0,
+                    )
+                    uskladi_brojac(gradiliste_id, self.kategorija, najveci)
+            super().save(*args, **kwargs)
+            if prije != (self.gradiliste_id, self.kategorija):
+                if prije:
+                    pomakni_sazetak(prije[0], kategorije={prije[1]: -1})
+                pomakni_sazetak(self.gradiliste_id, kategorije={self.kategorija: 1})
+
     def __str__(self):
         kat = dict(self.KATEGORIJA_CHOICES).get(self.kategorija, '—')
         if self.kategorija and self.oznaka:
@@ -115,12 +427,13 @@ class Dopis(models.Model):
     def clean(self):
         super().clean()
         # Ako ima i kategoriju i broj, provjeri jedinstvenost unutar *istog gradilišta* i *iste kategorije*
-        if self.kategorija and self.oznaka and self.dogadjaj_id:
-            gradiliste_id = self.dogadjaj.gradiliste_id
+        # (isto provjerava i unique indeks u bazi; ovdje samo radi poruke na formi)
+        oznaka_norm = normaliziraj_oznaku(self.kategorija, self.oznaka)
+        if oznaka_norm and self.dogadjaj_id:
             qs = Dopis.objects.filter(
-                    dogadjaj__gradiliste_id=gradiliste_id,
+                    gradiliste_id=self.dogadjaj.gradiliste_id,
                     kategorija=self.kategorija,
-                    oznaka__iexact=self.oznaka,
+                    oznaka_norm=oznaka_norm,
                 )
             if self.pk:
                     qs = qs.exclude(pk=self.pk)
@@ -140,6 +453,193 @@ class Dopis(models.Model):
     #        return (self.razuman_rok - timezone.localdate()).days
     #    return None
 
+def oznaci_promjenu(gradiliste_ids):
+    """
+    Podiže Gradiliste.verzija i updated_at (jedan UPDATE) – stari keš i
+    ETagovi tih gradilišta više ne vrijede.
+    """
+    ids = {i for i in gradiliste_ids if i}
+    if ids:
+        Gradiliste.objects.filter(pk__in=ids).update(
+            verzija=F("verzija") + 1, updated_at=timezone.now()
+        )
+
+
+def doprinos_dogadjaja(status, last_vrsta):
+    """Koliko jedan događaj doprinosi brojevima u GradilisteSazetak (0/1 po polju)."""
+    return {
+        "otvoreno": int(status == "otvoreno"),
+        "odgovoreno": int(status == "odgovoreno"),
+        "zatvoreno": int(status == "zatvoreno"),
+        "na_nama": int(status == "otvoreno" and last_vrsta == "incoming"),
+    }
+
+
+def razlika(prije, poslije):
+    return {k: poslije.get(k, 0) - prije.get(k, 0) for k in {*prije, *poslije}}
+
+
+def _pomak_kategorije(izraz, kategorija, za):
+    # po_kategoriji[kategorija] += za u SQL-u; ključ s 0 se briše (kao u osvjezi_sazetke)
+    put = Value(f'$."{kategorija}"')
+    broj = Coalesce(Func(izraz, put, function="json_extract", output_field=IntegerField()), 0) + za
+    return Case(
+        When(Exact(broj, 0), then=Func(izraz, put, function="json_remove")),
+        default=Func(izraz, put, broj, function="json_set"),
+        output_field=models.JSONField(),
+    )
+
+
+def pomakni_sazetak(gradiliste_id, dogadjaji=None, kategorije=None):
+    """
+    Inkrementalna promjena sažetka jednog gradilišta – jedan UPDATE s F(),
+    neovisno o veličini gradilišta. `dogadjaji` = {polje: +-n} (razlika dva
+    doprinos_dogadjaja), `kategorije` = {kategorija dopisa: +-n}.
+    Ako sažetka nema (npr. obrisan ručno), izračuna se cijeli.
+    """
+    polja = {k: F(k) + v for k, v in (dogadjaji or {}).items() if v}
+    kategorije = {k: v for k, v in (kategorije or {}).items() if v}
+    if not gradiliste_id or not (polja or kategorije):
+        return
+    if kategorije:
+        polja["dopisa"] = F("dopisa") + sum(kategorije.values())
+        izraz = F("po_kategoriji")
+        for kategorija, za in kategorije.items():
+            izraz = _pomak_kategorije(izraz, kategorija, za)
+        polja["po_kategoriji"] = izraz
+    if not GradilisteSazetak.objects.filter(gradiliste_id=gradiliste_id).update(
+        zadnja_aktivnost=timezone.now(), **polja
+    ):
+        osvjezi_sazetke({gradiliste_id})
+
+
+def osvjezi_sazetke(gradiliste_ids):
+    """
+    Ponovno izračuna GradilisteSazetak za zadana gradilišta: jedan grupirani
+    upit po događajima, jedan po dopisima (po kategoriji, iz indeksa) i jedan
+    upsert. Ostala gradilišta se ne diraju. Za bulk promjene (uvoz,
+    rebuild_ball_state, premještanje događaja) – pojedinačne idu kroz pomakni_sazetak.
+    """
+    ids = set(Gradiliste.objects.filter(pk__in=gradiliste_ids).values_list("id", flat=True))
+    if not ids:
+        return
+    dogadjaji = {
+        red.pop("gradiliste_id"): red
+        for red in Dogadjaj.objects.filter(gradiliste_id__in=ids).order_by().values("gradiliste_id").annotate(
+            otvoreno=Count("id", filter=Q(status="otvoreno")),
+            odgovoreno=Count("id", filter=Q(status="odgovoreno")),
+            zatvoreno=Count("id", filter=Q(status="zatvoreno")),
+            na_nama=Count("id", filter=Q(status="otvoreno", last_vrsta="incoming")),
+        )
+    }
+    po_kategoriji = {}
+    for gradiliste_id, kategorija, n in (
+        Dopis.objects.filter(gradiliste_id__in=ids).order_by()
+        .values_list("gradiliste_id", "kategorija").annotate(n=Count("id"))
+    ):
+        po_kategoriji.setdefault(gradiliste_id, {})[kategorija] = n
+
+    sad = timezone.now()
+    GradilisteSazetak.objects.bulk_create(
+        [
+            GradilisteSazetak(
+                gradiliste_id=i,
+                **dogadjaji.get(i, {}),
+                dopisa=sum(po_kategoriji.get(i, {}).values()),
+                po_kategoriji=po_kategoriji.get(i, {}),
+                zadnja_aktivnost=sad,
+            )
+            for i in ids
+        ],
+        update_conflicts=True,
+        unique_fields=["gradiliste"],
+        update_fields=[
+            "otvoreno", "odgovoreno", "zatvoreno", "na_nama", "dopisa", "po_kategoriji", "zadnja_aktivnost",
+        ],
+    )
+
+
+def rebuild_ball_state(dogadjaji):
+    """
+    Set-based varijanta Dogadjaj.refresh_ball_state() – jedan UPDATE s
+    koreliranim subqueryjima za sve zadane događaje. Vraća broj redova.
+    """
+    zadnji = Dopis.objects.filter(dogadjaj=OuterRef("pk")).order_by("-poslano", "-id")
+    rok = rok_dopisa_expr()
+    # update() ne okida signale – verziju (i sažetak) gradilišta dižemo ručno, nakon UPDATE-a
+    gradilista = set(dogadjaji.order_by().values_list("gradiliste_id", flat=True).distinct())
+    broj = dogadjaji.update(
+        last_dopis=Subquery(zadnji.values("id")[:1]),
+        last_vrsta=Subquery(zadnji.values("vrsta")[:1]),
+        last_poslano=Subquery(zadnji.values("poslano")[:1]),
+        effective_due=Subquery(zadnji.annotate(rok=rok).values("rok")[:1]),
+        updated_at=timezone.now(),
+    )
+    oznaci_promjenu(gradilista)
+    osvjezi_sazetke(gradilista)
+    return broj
+
+class BrojacDopisa(models.Model):
+    """Zadnji dodijeljeni broj dopisa po gradilištu i kategoriji (vidi brojaci.py)."""
+    gradiliste = models.ForeignKey(Gradiliste, on_delete=models.CASCADE, related_name="brojaci_dopisa")
+    kategorija = models.CharField("Kategorija dopisa", max_length=30)
+    zadnji = models.PositiveIntegerField("Zadnji dodijeljeni broj", default=0)
+
+    class Meta:
+        verbose_name = "Brojač dopisa"
+        verbose_name_plural = "Brojači dopisa"
+        constraints = [
+            models.UniqueConstraint(fields=["gradiliste", "kategorija"], name="uniq_brojac_dopisa"),
+        ]
+
+    def __str__(self):
+        return f"{self.gradiliste} / {self.kategorija}: {self.zadnji}"
+
+class GradilisteSazetak(models.Model):
+    """
+    Brojevi po gradilištu za gradiliste_list, pa početna stranica ne broji
+    dopise. Spremanje/brisanje događaja i dopisa ih pomiče za razliku
+    (pomakni_sazetak), a bulk promjene (uvoz, rebuild_ball_state) računaju
+    ispočetka (osvjezi_sazetke). Kašnjenja ovise o današnjem datumu pa se ne
+    spremaju (vidi views.gradiliste_list).
+    """
+    gradiliste = models.OneToOneField(Gradiliste, on_delete=models.CASCADE, primary_key=True, related_name="sazetak")
+    otvoreno = models.PositiveIntegerField("Otvorenih događaja", default=0)
+    odgovoreno = models.PositiveIntegerField("Odgovorenih događaja", default=0)
+    zatvoreno = models.PositiveIntegerField("Zatvorenih događaja", default=0)
+    na_nama = models.PositiveIntegerField("Otvorenih, na nama potez", default=0)
+    dopisa = models.PositiveIntegerField("Dopisa", default=0)
+    po_kategoriji = models.JSONField("Dopisa po kategoriji", default=dict)
+    zadnja_aktivnost = models.DateTimeField("Zadnja promjena", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Sažetak gradilišta"
+        verbose_name_plural = "Sažeci gradilišta"
+
+    def __str__(self):
+        return f"Sažetak: {self.gradiliste_id}"
+
+    @property
+    def kategorije(self):
+        """[(naziv kategorije, broj)] – najviše dopisa prvo."""
+        nazivi = dict(Dopis.KATEGORIJA_CHOICES)
+        return sorted(
+            ((nazivi.get(k, k) if k else "Bez kategorije", n) for k, n in self.po_kategoriji.items()),
+            key=lambda par: (-par[1], par[0]),
+        )
+
+class PodsjetnikStanje(models.Model):
+    """Watermark podsjetnika na rokove (podsjetnik.py) – jedan red, pk=1."""
+    zadnje_pokretanje = models.DateTimeField("Zadnje pokretanje", null=True, blank=True)
+    zadnji_datum = models.DateField("Datum zadnjeg pokretanja", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Stanje podsjetnika"
+        verbose_name_plural = "Stanje podsjetnika"
+
+    def __str__(self):
+        return f"Podsjetnik: {self.zadnje_pokretanje or 'nije pokretan'}"
+
 class Biljeska(models.Model):
     dopis = models.ForeignKey(Dopis, on_delete=models.CASCADE, related_name='biljeske')
     autor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -154,9 +654,32 @@ class Biljeska(models.Model):
         return f"Bilješka za {self.dopis}"
 
 
+class Datoteka(models.Model):
+    """Blob priloga u HashStorage (prilozi.py) – jedan red po sadržaju."""
+    ime = models.CharField("Ime u spremištu", max_length=100, unique=True)
+    sha256 = models.CharField("SHA-256", max_length=64)
+    velicina = models.PositiveBigIntegerField("Veličina (B)")
+    # broj Prilog redova s ovim blobom – održavaju ga signali (signals.py)
+    reference = models.IntegerField("Broj referenci", default=0)
+    zadnje_koristeno = models.DateTimeField("Zadnje korišteno", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Datoteka priloga"
+        verbose_name_plural = "Datoteke priloga"
+        indexes = [
+            # prilozi.pocisti – blobovi bez referenci
+            models.Index(fields=["reference", "zadnje_koristeno"], name="datoteka_gc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ime} ({self.reference})"
+
+
 class Prilog(models.Model):
     dopis = models.ForeignKey(Dopis, on_delete=models.CASCADE, related_name='prilozi')
-    file = models.FileField(upload_to='prilozi/')
+    # ime u spremištu je SHA-256 sadržaja (prilozi.HashStorage), pravo ime je u `ime`
+    file = models.FileField(upload_to='prilozi/', storage=prilozi.storage)
+    ime = models.CharField("Izvorno ime datoteke", max_length=255, blank=True)
     opis = models.CharField("Opis", max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -164,5 +687,18 @@ class Prilog(models.Model):
         verbose_name = "Prilog"
         verbose_name_plural = "Prilozi"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # pamtimo blob iz baze – signali prebacuju referencu kad se datoteka zamijeni
+        instance._loaded_file = instance.__dict__.get("file")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # novi upload: zapamti pravo ime prije nego ga spremište zamijeni hashom
+        if self.file and not self.file._committed and not self.ime:
+            self.ime = os.path.basename(self.file.name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Prilog za {self.dopis}"
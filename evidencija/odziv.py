@@ -0,0 +1,150 @@
+"""
+Brzina odgovora po gradilištu (za sporove oko potraživanja): koliko je dana
+prošlo od dopisa jedne strane do prvog idućeg dopisa druge strane.
+
+Sve se računa u SQL-u, window funkcijama nad dopisima gradilišta
+particioniranim po događaju (poredak poslano, id – kao loptica):
+  1. LAG(vrsta) – dopis kojem prethodi dopis iste vrste ne mijenja potez
+     (drugi ulazni zaredom ne pomiče početak našeg čekanja), pa ostaju samo
+     prvi dopisi svakog niza,
+  2. LEAD nad njima – početak idućeg niza je odgovor druge strane,
+  3. ROW_NUMBER/COUNT po grupi – medijan i p90 (nearest-rank).
+U Python dolaze samo gotovi brojevi po grupi i N najsporijih odgovora.
+
+Smjer: "mi" = ulazni dopis -> naš izlazni, "oni" = naš izlazni -> njihov ulazni.
+Interval se pripisuje kategoriji, mjesecu i događaju dopisa na koji se odgovara.
+Nizovi na koje još nema odgovora ne ulaze u statistiku (vidi kasnjenja).
+"""
+from datetime import date
+
+from django.db import connection
+
+from .models import Dogadjaj, Dopis
+
+# izraz za grupiranje -> SQL (ne dolazi od korisnika, samo ključevi)
+GRUPE = {
+    "kategorija": "kategorija",
+    "mjesec": "substr(poslano, 1, 7)",
+    "dogadjaj": "dogadjaj_id",
+}
+SMJER = {"incoming": "mi", "outgoing": "oni"}
+
+_INTERVALI = """
+    WITH redovi AS (
+        SELECT id, dogadjaj_id, kategorija, oznaka, vrsta, poslano,
+               LAG(vrsta) OVER po_dogadjaju AS prethodna_vrsta
+        FROM evidencija_dopis
+        WHERE gradiliste_id = %s
+        WINDOW po_dogadjaju AS (PARTITION BY dogadjaj_id ORDER BY poslano, id)
+    ),
+    potezi AS (
+        SELECT id, dogadjaj_id, kategorija, oznaka, vrsta, poslano,
+               LEAD(id) OVER po_dogadjaju AS odgovor_id,
+               LEAD(poslano) OVER po_dogadjaju AS odgovor_poslano
+        FROM redovi
+        WHERE prethodna_vrsta IS NULL OR prethodna_vrsta <> vrsta
+        WINDOW po_dogadjaju AS (PARTITION BY dogadjaj_id ORDER BY poslano, id)
+    ),
+    intervali AS (
+        SELECT *, CAST(julianday(odgovor_poslano) - julianday(poslano) AS INTEGER) AS dana
+        FROM potezi
+        WHERE odgovor_id IS NOT NULL AND poslano >= %s AND poslano <= %s
+    )
+"""
+
+# nearest-rank: k-ti najmanji, k = ceil(p * n / 100) – cjelobrojno (p * n + 99) / 100
+_STATISTIKA = _INTERVALI + """
+    , rangirani AS (
+        SELECT {grupa} AS grupa, vrsta, dana,
+               ROW_NUMBER() OVER (PARTITION BY {grupa}, vrsta ORDER BY dana) AS rn,
+               COUNT(*) OVER (PARTITION BY {grupa}, vrsta) AS n
+        FROM intervali
+    )
+    SELECT grupa, vrsta, n,
+           MAX(CASE WHEN rn = (50 * n + 99) / 100 THEN dana END) AS medijan,
+           MAX(CASE WHEN rn = (90 * n + 99) / 100 THEN dana END) AS p90,
+           MAX(dana) AS najdulje,
+           AVG(dana) AS prosjek
+    FROM rangirani
+    GROUP BY grupa, vrsta
+    ORDER BY grupa, vrsta
+"""
+
+_NAJSPORIJI = _INTERVALI + """
+    SELECT i.id, i.oznaka, i.kategorija, i.vrsta, i.poslano, i.odgovor_id,
+           o.oznaka, i.odgovor_poslano, i.dana, d.id, d.broj, d.naziv
+    FROM intervali i
+    JOIN evidencija_dopis o ON o.id = i.odgovor_id
+    JOIN evidencija_dogadjaj d ON d.id = i.dogadjaj_id
+    WHERE i.vrsta = %s
+    ORDER BY i.dana DESC, i.poslano, i.id
+    LIMIT %s
+"""
+
+
+def _raspon(od, do):
+    return [(od or date.min).isoformat(), (do or date.max).isoformat()]
+
+
+def _datum(v):
+    # SQLite vraća date samo za stupce s deklariranim tipom (ne za LEAD)
+    return v if isinstance(v, date) else date.fromisoformat(v)
+
+
+def statistika(gradiliste_id, grupiraj="kategorija", od=None, do=None):
+    """
+    Lista dictova {grupa, smjer, broj, medijan, p90, najdulje, prosjek}
+    (dani) po kategoriji, mjesecu ili događaju (grupiraj) i smjeru.
+    """
+    sql = _STATISTIKA.format(grupa=GRUPE[grupiraj])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [gradiliste_id, *_raspon(od, do)])
+        redovi = cursor.fetchall()
+    if grupiraj == "kategorija":
+        nazivi = {k: v for k, v in Dopis.KATEGORIJA_CHOICES if k} | {"": "Bez kategorije"}
+    elif grupiraj == "dogadjaj":
+        dogadjaji = Dogadjaj.objects.filter(pk__in={r[0] for r in redovi})
+        nazivi = {pk: f"{broj} – {naziv}" for pk, broj, naziv in dogadjaji.values_list("id", "broj", "naziv")}
+    else:
+        nazivi = {}
+    return [
+        {
+            "grupa": grupa,
+            "naziv": nazivi.get(grupa, grupa),
+            "smjer": SMJER[vrsta],
+            "broj": n,
+            "medijan": medijan,
+            "p90": p90,
+            "najdulje": najdulje,
+            "prosjek": round(prosjek, 1),
+        }
+        for grupa, vrsta, n, medijan, p90, najdulje, prosjek in redovi
+    ]
+
+
+def najsporiji(gradiliste_id, smjer="mi", limit=10, od=None, do=None):
+    """N najduljih odgovora u smjeru ("mi"/"oni") – s dopisima i događajem."""
+    vrsta = {v: k for k, v in SMJER.items()}[smjer]
+    with connection.cursor() as cursor:
+        cursor.execute(_NAJSPORIJI, [gradiliste_id, *_raspon(od, do), vrsta, limit])
+        redovi = cursor.fetchall()
+    return [
+        {
+            "dopis_id": dopis_id,
+            "oznaka": oznaka,
+            "kategorija": kategorija,
+            "smjer": SMJER[vrsta],
+            "poslano": _datum(poslano),
+            "odgovor_id": odgovor_id,
+            "odgovor_oznaka": odgovor_oznaka,
+            "odgovor_poslano": _datum(odgovor_poslano),
+            "dana": dana,
+            "dogadjaj_id": dogadjaj_id,
+            "dogadjaj_broj": dogadjaj_broj,
+            "dogadjaj_naziv": dogadjaj_naziv,
+        }
+        for (
+            dopis_id, oznaka, kategorija, vrsta, poslano, odgovor_id,
+            odgovor_oznaka, odgovor_poslano, dana, dogadjaj_id, dogadjaj_broj, dogadjaj_naziv,
+        ) in redovi
+    ]
@@ -0,0 +1,204 @@
+"""
+Keyset (cursor) paginacija za registre događaja i dopisa.
+
+Umjesto OFFSET-a stranica se nastavlja od vrijednosti sortirnih stupaca
+zadnjeg (ili prvog) prikazanog reda, pa je stranica N jednako skupa kao
+stranica 1. Poredak je isti tuple koji koriste SORT_MAP / D_SORT_MAP /
+ordering_map u views.py, s "id" kao zadnjim tie-breakerom.
+"""
+import base64
+import binascii
+import datetime
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+
+PAGE_SIZE = 50
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.prev_cursor)
+
+
+def _kljucevi(order):
+    """
+    ("-datum", "id") ili OrderBy izrazi -> [(ime, desc, nulls_last)].
+    SQLite NULL tretira kao najmanju vrijednost: ASC -> NULL prvi, DESC -> NULL zadnji.
+    """
+    kljucevi = []
+    for o in order:
+        if isinstance(o, OrderBy):
+            desc = o.descending
+            if o.nulls_last:
+                nulls_last = True
+            elif o.nulls_first:
+                nulls_last = False
+            else:
+                nulls_last = desc
+            kljucevi.append((o.expression.name, desc, nulls_last))
+        elif o.startswith("-"):
+            kljucevi.append((o[1:], True, True))
+        else:
+            kljucevi.append((o, False, False))
+    return kljucevi
+
+
+def _order_by(kljucevi):
+    izrazi = []
+    for name, desc, nulls_last in kljucevi:
+        if nulls_last == desc:  # zadani SQLite poredak, bez NULLS klauzule
+            izrazi.append(f"-{name}" if desc else name)
+        elif nulls_last:
+            izrazi.append(OrderBy(F(name), descending=desc, nulls_last=True))
+        else:
+            izrazi.append(OrderBy(F(name), descending=desc, nulls_first=True))
+    return izrazi
+
+
+def _iza(name, desc, nulls_last, value):
+    """Q za redove koji u tom stupcu dolaze strogo iza `value`."""
+    if value is None:
+        return Q(pk__in=[]) if nulls_last else Q(**{f"{name}__isnull": False})
+    q = Q(**{f"{name}__lt" if desc else f"{name}__gt": value})
+    if nulls_last:
+        q |= Q(**{f"{name}__isnull": True})
+    return q
+
+
+def _nakon(kljucevi, values):
+    """(k1, k2, ...) > (v1, v2, ...) u leksikografskom smislu, uz NULL-ove."""
+    uvjet = Q(pk__in=[])
+    jednako = Q()
+    for (name, desc, nulls_last), value in zip(kljucevi, values):
+        uvjet |= jednako & _iza(name, desc, nulls_last, value)
+        if value is None:
+            jednako &= Q(**{f"{name}__isnull": True})
+        else:
+            jednako &= Q(**{name: value})
+    return uvjet
+
+
+def _vrijednosti(obj, kljucevi):
+    if isinstance(obj, dict):  # qs.values() – sortirni stupci moraju biti među poljima
+        return [obj[name] for name, _, _ in kljucevi]
+    values = []
+    for name, _, _ in kljucevi:
+        value = obj
+        for dio in name.split("__"):
+            value = getattr(value, dio) if value is not None else None
+        values.append(value)
+    return values
+
+
+class _KursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder reže datetime na milisekunde – u kursoru bi svi redovi
+    # iz iste milisekunde (updated_at) ponovno bili "iza" i stranica se vrti
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=_KursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+class NeispravanKursor(ValueError):
+    pass
+
+
+def _polja(qs, kljucevi):
+    """Model polje (ili output_field anotacije) za svaki sortirni stupac."""
+    polja = []
+    for name, _, _ in kljucevi:
+        if name in qs.query.annotations:  # values(alias=F(...)) u api.py
+            polja.append(qs.query.annotations[name].output_field)
+            continue
+        model, field = qs.model, None
+        for dio in name.split("__"):
+            field = model._meta.pk if dio == "pk" else model._meta.get_field(dio)
+            model = field.related_model
+        polja.append(field.target_field if field.is_relation else field)
+    return polja
+
+
+def decode_cursor(cursor, polja):
+    """
+    Vraća listu vrijednosti (pretvorenih to_python() sortirnih polja) ili None
+    ako kursor nije ispravan – i kad je ispravan JSON, ali s krivim tipovima.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(polja):
+        return None
+    try:
+        return [None if v is None else f.to_python(v) for f, v in zip(polja, values)]
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def keyset_page(qs, order, *, after=None, before=None, size=PAGE_SIZE, strogo=False):
+    """
+    Vraća KeysetPage s najviše `size` redova iz `qs` sortiranog po `order`.
+    `after` / `before` su kursori iz prethodne stranice (GET parametri).
+    Neispravan kursor daje prvu stranicu, a uz strogo=True NeispravanKursor.
+    """
+    kljucevi = _kljucevi(order)
+    polja = _polja(qs, kljucevi)
+    after_values = decode_cursor(after, polja)
+    before_values = decode_cursor(before, polja)
+    if strogo and (after and after_values is None or before and before_values is None):
+        raise NeispravanKursor("neispravan kursor")
+
+    if before_values is not None and after_values is None:
+        # unatrag: obrnuti poredak, pa okrenemo rezultat
+        obrnuti = [(name, not desc, not nulls_last) for name, desc, nulls_last in kljucevi]
+        rows = list(
+            qs.filter(_nakon(obrnuti, before_values)).order_by(*_order_by(obrnuti))[: size + 1]
+        )
+        ima_prije = len(rows) > size
+        rows = rows[:size][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(_vrijednosti(rows[-1], kljucevi)) if rows else None,
+            prev_cursor=encode_cursor(_vrijednosti(rows[0], kljucevi)) if ima_prije else None,
+        )
+
+    qs = qs.order_by(*_order_by(kljucevi))
+    if after_values is not None:
+        qs = qs.filter(_nakon(kljucevi, after_values))
+    rows = list(qs[: size + 1])
+    ima_dalje = len(rows) > size
+    rows = rows[:size]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(_vrijednosti(rows[-1], kljucevi)) if ima_dalje else None,
+        prev_cursor=(
+            encode_cursor(_vrijednosti(rows[0], kljucevi))
+            if after_values is not None and rows
+            else None
+        ),
+    )
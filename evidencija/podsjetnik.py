@@ -0,0 +1,117 @@
+"""
+Podsjetnik na rokove (django_crontab, vidi settings.CRONJOBS).
+
+Traže se događaji na kojima je loptica kod nas (zadnji dopis ulazni,
+događaj otvoren) i rok zadnjeg dopisa (effective_due) je za najviše
+N dana ili je već prošao. Rezultat ide mailom kao jedan sažetak.
+
+Inkrementalno: PodsjetnikStanje pamti vrijeme i datum zadnjeg pokretanja,
+pa se gledaju samo
+  - događaji promijenjeni od tada (updated_at – diže se i pri svakoj
+    promjeni dopisa, jer se tada preračuna stanje po zadnjem dopisu),
+  - rokovi koji su od zadnjeg datuma ušli u prozor od N dana ili prošli.
+Oba su rasponi po indeksu (dogadjaj_updated_idx, dogadjaj_rok_idx); ako se
+ništa nije promijenilo i dan je isti, to je jedan prazan upit.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from .models import Dogadjaj, PodsjetnikStanje
+
+
+@dataclass
+class Rezultat:
+    dogadjaji: list = field(default_factory=list)
+    poslano: bool = False
+
+
+def _kandidati(stanje, today, dana):
+    """ID-evi događaja koje treba provjeriti; None = prvo pokretanje (svi)."""
+    if stanje.zadnje_pokretanje is None or stanje.zadnji_datum is None:
+        return None
+    ids = set(
+        Dogadjaj.objects.filter(updated_at__gt=stanje.zadnje_pokretanje).values_list("id", flat=True)
+    )
+    prije = stanje.zadnji_datum
+    if prije < today:
+        rokovi = Dogadjaj.objects.filter(last_vrsta="incoming")
+        # ušli u prozor "za najviše N dana"
+        ids.update(
+            rokovi.filter(
+                effective_due__gt=prije + timedelta(days=dana),
+                effective_due__lte=today + timedelta(days=dana),
+            ).values_list("id", flat=True)
+        )
+        # rok prošao
+        ids.update(
+            rokovi.filter(effective_due__gte=prije, effective_due__lt=today).values_list("id", flat=True)
+        )
+    return ids
+
+
+def sazetak(dogadjaji, today):
+    """Tekst maila – po gradilištu, najhitnije prvo."""
+    redovi = []
+    zadnje = object()
+    for d in dogadjaji:
+        if d.gradiliste_id != zadnje:
+            zadnje = d.gradiliste_id
+            redovi.append(f"\n{d.gradiliste or 'Bez gradilišta'}")
+        dana = (d.effective_due - today).days
+        rok = f"kasnimo {-dana}d" if dana < 0 else f"rok za {dana}d"
+        dp = d.last_dopis
+        dopis = (dp.oznaka or dp.broj or f"#{dp.pk}") if dp else "—"
+        redovi.append(f"  [{rok}] {d.broj or '—'} – {d.naziv} (dopis {dopis}, rok {d.effective_due:%d.%m.%Y.})")
+    return "Rokovi na kojima smo na potezu:\n" + "\n".join(redovi) + "\n"
+
+
+def pokreni(dana=None, today=None, posalji=True):
+    """
+    Jedno pokretanje podsjetnika. Mail se šalje izvan transakcije (SMTP ne
+    smije držati SQLite write lock), a watermark se pomiče tek nakon
+    uspješnog slanja, zasebnim kratkim UPDATE-om – ako slanje pukne, idući
+    put se gleda isto. Bez slanja (posalji=False) watermark ostaje gdje je
+    bio, a bez primatelja se ništa ne pokreće (inače bi se podsjetnici
+    tiho izgubili).
+    """
+    if posalji and not settings.PODSJETNIK_PRIMATELJI:
+        raise ImproperlyConfigured("PODSJETNIK_PRIMATELJI je prazan – podsjetnik nema kome ići")
+    dana = settings.PODSJETNIK_DANA if dana is None else dana
+    today = today or timezone.localdate()
+    sad = timezone.now()
+    rezultat = Rezultat()
+    stanje, _ = PodsjetnikStanje.objects.get_or_create(pk=1)
+    ids = _kandidati(stanje, today, dana)
+    if ids is None or ids:
+        qs = (
+            # samo "otvoreno" – isto pravilo kao kasnjenja i gradiliste_list
+            Dogadjaj.objects.filter(
+                status="otvoreno", last_vrsta="incoming", effective_due__lte=today + timedelta(days=dana)
+            )
+            .select_related("gradiliste", "last_dopis")
+            .order_by("gradiliste__naziv", "gradiliste_id", "effective_due", "id")
+        )
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        rezultat.dogadjaji = list(qs)
+    if not posalji:
+        return rezultat
+
+    if rezultat.dogadjaji:
+        send_mail(
+            f"Podsjetnik na rokove ({len(rezultat.dogadjaji)})",
+            sazetak(rezultat.dogadjaji, today),
+            None,
+            settings.PODSJETNIK_PRIMATELJI,
+        )
+        rezultat.poslano = True
+    # jedan UPDATE, i samo ako ga paralelno pokretanje nije već pomaknulo
+    PodsjetnikStanje.objects.filter(
+        pk=1, zadnje_pokretanje=stanje.zadnje_pokretanje, zadnji_datum=stanje.zadnji_datum
+    ).update(zadnje_pokretanje=sad, zadnji_datum=today)
+    return rezultat
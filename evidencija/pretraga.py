@@ -0,0 +1,172 @@
+"""
+Pretraga teksta dopisa i događaja (SQLite FTS5).
+
+Jedna FTS5 tablica za oba modela; rowid kodira izvor:
+    dopis    -> 2 * id
+    događaj  -> 2 * id + 1
+pa triggeri brišu/upisuju red po rowidu (bez skeniranja FTS tablice).
+Triggeri su u bazi, ne u signalima, jer se dosta toga radi s
+bulk_create / update() koji ne okidaju signale.
+
+Stupci: gradiliste_id, naslov (oznaka / naziv), tekst (sadrzaj / opis).
+gradiliste_id je indeksiran (a ne UNINDEXED) da filtar po gradilištu bude
+dio MATCH-a – FTS5 tada presijeca posting liste i rangira samo pogotke tog
+gradilišta, umjesto da rangira sve pa filtrira (~4x brže na 30k dopisa).
+Korisnički pojmovi traže se samo u naslovu i tekstu. Tokenizer skida
+dijakritike (cesta == česta).
+
+Pazi: SQLite kod većine promjena stupaca (AddField s defaultom, AlterField)
+napravi tablicu ispočetka, a s time nestanu i njeni triggeri – takva
+migracija na dopisu/događaju mora ih vratiti (vidi 0021). Migracije nose
+vlastitu kopiju SQL-a odavde, ne importaju ovaj modul: izmjena STVORI mora
+ići s novom migracijom, a stare migracije ostaju kakve su bile.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+TABLICA = "evidencija_pretraga"
+
+# markeri za highlight/snippet – tekst se escapea pa se tek onda zamijene s <mark>
+_POCETAK, _KRAJ = "\x02", "\x03"
+
+STVORI = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLICA} USING fts5(
+        gradiliste_id, naslov, tekst,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # dopisi
+    f"""
+    CREATE TRIGGER {TABLICA}_dopis_ai AFTER INSERT ON evidencija_dopis BEGIN
+        INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLICA}_dopis_au
+    AFTER UPDATE OF oznaka, sadrzaj, gradiliste_id ON evidencija_dopis BEGIN
+        DELETE FROM {TABLICA} WHERE rowid = 2 * old.id;
+        INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id, new.gradiliste_id, new.oznaka, new.sadrzaj);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLICA}_dopis_ad AFTER DELETE ON evidencija_dopis BEGIN
+        DELETE FROM {TABLICA} WHERE rowid = 2 * old.id;
+    END
+    """,
+    # događaji
+    f"""
+    CREATE TRIGGER {TABLICA}_dogadjaj_ai AFTER INSERT ON evidencija_dogadjaj BEGIN
+        INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLICA}_dogadjaj_au
+    AFTER UPDATE OF naziv, opis, gradiliste_id ON evidencija_dogadjaj BEGIN
+        DELETE FROM {TABLICA} WHERE rowid = 2 * old.id + 1;
+        INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+        VALUES (2 * new.id + 1, new.gradiliste_id, new.naziv, new.opis);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLICA}_dogadjaj_ad AFTER DELETE ON evidencija_dogadjaj BEGIN
+        DELETE FROM {TABLICA} WHERE rowid = 2 * old.id + 1;
+    END
+    """,
+]
+
+OBRISI = [
+    f"DROP TRIGGER IF EXISTS {TABLICA}_{ime}"
+    for ime in ("dopis_ai", "dopis_au", "dopis_ad", "dogadjaj_ai", "dogadjaj_au", "dogadjaj_ad")
+] + [f"DROP TABLE IF EXISTS {TABLICA}"]
+
+PUNI = [
+    f"DELETE FROM {TABLICA}",
+    f"""
+    INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+    SELECT 2 * id, gradiliste_id, oznaka, sadrzaj FROM evidencija_dopis
+    """,
+    f"""
+    INSERT INTO {TABLICA}(rowid, gradiliste_id, naslov, tekst)
+    SELECT 2 * id + 1, gradiliste_id, naziv, opis FROM evidencija_dogadjaj
+    """,
+    f"INSERT INTO {TABLICA}({TABLICA}) VALUES ('optimize')",
+]
+
+
+def podrzano(conn=connection):
+    return conn.vendor == "sqlite"
+
+
+def rebuild_pretragu(conn=connection):
+    """Puni FTS tablicu ispočetka iz dopisa i događaja. Vraća broj redova."""
+    with conn.cursor() as cursor:
+        for sql in PUNI:
+            cursor.execute(sql)
+        cursor.execute(f"SELECT count(*) FROM {TABLICA}")
+        return cursor.fetchone()[0]
+
+
+_RIJEC_RE = re.compile(r"\w+")
+
+
+def fts_upit(tekst):
+    """
+    Korisnički unos -> FTS5 upit: svaka riječ mora postojati, zadnja i kao
+    prefiks ("zzi zidn" -> "zzi" "zidn"*). Navodnici/operatori se ignoriraju,
+    pa upit nikad nije sintaksno neispravan. Prazan unos -> None.
+    """
+    rijeci = _RIJEC_RE.findall(tekst or "")
+    if not rijeci:
+        return None
+    dijelovi = [f'"{r}"' for r in rijeci]
+    dijelovi[-1] += "*"
+    return " ".join(dijelovi)
+
+
+def _oznaci(tekst):
+    """Escape + markeri -> <mark>."""
+    return mark_safe(
+        escape(tekst or "").replace(_POCETAK, "<mark>").replace(_KRAJ, "</mark>")
+    )
+
+
+def trazi(gradiliste_id, tekst, limit=50):
+    """
+    Rangirani pogoci za gradilište: lista dictova
+    {"tip": "dopis"|"dogadjaj", "id", "naslov", "isjecak", "rang"}
+    – naslov i isječak su HTML s <mark> oko pogodaka.
+    """
+    upit = fts_upit(tekst)
+    if upit is None:
+        return []
+    upit = f'gradiliste_id : "{int(gradiliste_id)}" AND {{naslov tekst}} : ({upit})'
+    sql = f"""
+        SELECT rowid,
+               highlight({TABLICA}, 1, %s, %s),
+               snippet({TABLICA}, 2, %s, %s, '…', 16),
+               bm25({TABLICA}, 0.0, 5.0, 1.0) AS rang
+        FROM {TABLICA}
+        WHERE {TABLICA} MATCH %s
+        ORDER BY rang
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_POCETAK, _KRAJ, _POCETAK, _KRAJ, upit, limit])
+        redovi = cursor.fetchall()
+    return [
+        {
+            "tip": "dogadjaj" if rowid % 2 else "dopis",
+            "id": rowid // 2,
+            "naslov": _oznaci(naslov),
+            "isjecak": _oznaci(isjecak),
+            "rang": rang,
+        }
+        for rowid, naslov, isjecak, rang in redovi
+    ]
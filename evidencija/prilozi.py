@@ -0,0 +1,443 @@
+"""
+Spremište priloga adresirano sadržajem (SHA-256).
+
+Svaki upload se pri spremanju čita u komadima (content.chunks()), usput
+hashira i piše u privremenu datoteku; ime je zatim prilozi/ab/<sha256>.ext.
+Ako takav blob već postoji, privremena se datoteka samo obriše – isti PDF
+priložen na 30 dopisa na disku je jednom.
+
+Za svaki blob postoji red u Datoteka s brojem referenci (Prilog redova koji
+ga koriste) – održava se signalima (signals.py). Blob bez referenci briše
+pocisti() (manage.py pocisti_priloge, i noću kroz CRONJOBS), ali tek kad
+je dulje od PRAG_SATI nekorišten – upload koji je upravo spremio blob, a još
+nije spremio Prilog, ne smije ostati bez datoteke.
+
+Stari prilozi (prilozi/<ime>) se prebace u ovaj raspored naredbom
+manage.py dedupliciraj_priloge.
+
+Ovdje su i nastavljivi upload u komadima (Upload) i parsiranje Range
+zaglavlja za preuzimanje – viewovi su u views.py (prilog_upload*, prilog_preuzmi).
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+PREFIKS = "prilozi"
+PRAG_SATI = 24
+CHUNK_SIZE = 1024 * 1024
+
+
+def ime_bloba(sha256, ext=""):
+    return f"{PREFIKS}/{sha256[:2]}/{sha256}{ext}"
+
+
+def je_blob(ime):
+    dijelovi = (ime or "").split("/")
+    return (
+        len(dijelovi) == 3
+        and dijelovi[0] == PREFIKS
+        and len(os.path.splitext(dijelovi[2])[0]) == 64
+    )
+
+
+def _ext(ime):
+    # ekstenzija ostaje zbog content-typea pri posluživanju
+    return os.path.splitext(ime or "")[1].lower()[:10]
+
+
+class HashStorage(FileSystemStorage):
+    """FileSystemStorage koji ime datoteke određuje po SHA-256 sadržaja."""
+
+    def _save(self, name, content):
+        from .models import Datoteka
+
+        tmp_dir = self.path(f"{PREFIKS}/.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+        h, velicina = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    h.update(chunk)
+                    f.write(chunk)
+                    velicina += len(chunk)
+            sha256 = h.hexdigest()
+            ime = ime_bloba(sha256, _ext(name))
+            # red prije datoteke: zadnje_koristeno štiti blob od pocisti() dok
+            # se Prilog ne spremi, a ako je pocisti() upravo obrisao blob,
+            # datoteka se ispod jednostavno ponovno zapiše
+            Datoteka.objects.update_or_create(
+                ime=ime,
+                defaults={"zadnje_koristeno": timezone.now()},
+                create_defaults={"sha256": sha256, "velicina": velicina},
+            )
+            put = self.path(ime)
+            if os.path.exists(put):
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(put), exist_ok=True)
+                os.replace(tmp, put)
+                if self.file_permissions_mode is not None:
+                    os.chmod(put, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return ime
+
+    def get_available_name(self, name, max_length=None):
+        # isti sadržaj = isto ime; postojeća datoteka se ne dira (vidi _save)
+        return name
+
+
+def storage():
+    """Callable za FileField(storage=...) – u migraciji ostaje samo referenca."""
+    return HashStorage()
+
+
+def promijeni_reference(ime, za):
+    """Reference bloba +za (samo ako je ime blob – stari prilozi nemaju Datoteka red)."""
+    from .models import Datoteka
+
+    if ime and je_blob(ime):
+        Datoteka.objects.filter(ime=ime).update(
+            reference=F("reference") + za, zadnje_koristeno=timezone.now()
+        )
+
+
+@dataclass
+class RezultatCiscenja:
+    obrisano: list = field(default_factory=list)
+    oslobodeno: int = 0
+    uploada: int = 0  # obrisanih nedovršenih uploada
+
+
+def pocisti(prag_sati=PRAG_SATI, dry_run=False):
+    """Briše blobove bez referenci i nedovršene uploade, nekorištene dulje od prag_sati."""
+    from .models import Datoteka
+
+    st = storage()
+    rezultat = RezultatCiscenja()
+    granica = timezone.now() - timedelta(hours=prag_sati)
+    kandidati = list(
+        Datoteka.objects.filter(reference__lte=0, zadnje_koristeno__lt=granica)
+        .values_list("pk", "ime", "velicina")
+    )
+    for pk, ime, velicina in kandidati:
+        if not dry_run:
+            # uvjetno brisanje – ako je u međuvremenu dobio referencu ili ga je
+            # upload upravo koristio, ostaje; datoteka se briše u istoj transakciji
+            with transaction.atomic():
+                obrisano, _ = Datoteka.objects.filter(
+                    pk=pk, reference__lte=0, zadnje_koristeno__lt=granica
+                ).delete()
+                if not obrisano:
+                    continue
+                st.delete(ime)
+        rezultat.obrisano.append(ime)
+        rezultat.oslobodeno += velicina
+    if not dry_run:
+        rezultat.uploada = pocisti_uploade(prag_sati)
+    return rezultat
+
+
+def prebroji_reference():
+    """Broj referenci ispočetka iz Prilog tablice (popravak nakon raw/bulk promjena)."""
+    from .models import Datoteka, Prilog
+
+    with transaction.atomic():
+        Datoteka.objects.update(reference=0)
+        broj = {}
+        for ime in Prilog.objects.values_list("file", flat=True).iterator():
+            broj[ime] = broj.get(ime, 0) + 1
+        for ime, n in broj.items():
+            Datoteka.objects.filter(ime=ime).update(reference=n)
+
+
+@dataclass
+class RezultatDeduplikacije:
+    datoteka: int = 0
+    duplikata: int = 0
+    oslobodeno: int = 0
+    nedostaje: list = field(default_factory=list)
+
+
+def dedupliciraj(dry_run=False):
+    """Stare priloge (prilozi/<ime>) prebacuje u blobove; duplikati se brišu."""
+    from .models import Datoteka, Prilog
+
+    st = storage()
+    rezultat = RezultatDeduplikacije()
+    vidjeni = set()  # za dry-run: blobovi koje bi ovaj prolaz već napravio
+    stara_imena = list(
+        Prilog.objects.exclude(file="").order_by("file").values_list("file", flat=True).distinct()
+    )
+    for staro in stara_imena:
+        if je_blob(staro):
+            continue
+        if not st.exists(staro):
+            rezultat.nedostaje.append(staro)
+            continue
+        h, velicina = hashlib.sha256(), 0
+        with st.open(staro, "rb") as f:
+            for chunk in f.chunks(CHUNK_SIZE):
+                h.update(chunk)
+                velicina += len(chunk)
+        novo = ime_bloba(h.hexdigest(), _ext(staro))
+        rezultat.datoteka += 1
+        postoji = novo in vidjeni or st.exists(novo)
+        vidjeni.add(novo)
+        if postoji:
+            rezultat.duplikata += 1
+            rezultat.oslobodeno += velicina
+        if dry_run:
+            continue
+
+        if not postoji:
+            os.makedirs(os.path.dirname(st.path(novo)), exist_ok=True)
+            os.replace(st.path(staro), st.path(novo))
+        try:
+            with transaction.atomic():
+                Datoteka.objects.get_or_create(
+                    ime=novo, defaults={"sha256": h.hexdigest(), "velicina": velicina}
+                )
+                # update() bez signala – reference se dodaju ovdje; izvorno ime
+                # ostaje za preuzimanje (stari prilozi ga nemaju zapisano)
+                prilozi_staro = Prilog.objects.filter(file=staro)
+                n = prilozi_staro.filter(ime="").update(file=novo, ime=os.path.basename(staro)[:255])
+                n += prilozi_staro.update(file=novo)
+                Datoteka.objects.filter(ime=novo).update(
+                    reference=F("reference") + n, zadnje_koristeno=timezone.now()
+                )
+        except BaseException:
+            if not postoji:  # vrati datoteku gdje je bila
+                os.replace(st.path(novo), st.path(staro))
+            raise
+        if postoji:
+            st.delete(staro)
+    return rezultat
+
+
+# --- nastavljivi upload u komadima ---
+# Klijent otvori upload (ime, ukupna veličina), pa šalje komade redom s
+# Content-Range; svaki se dopisuje na .part datoteku. Nakon prekida pita
+# koliko je primljeno i nastavlja od tamo. Kad je sve stiglo, .part se
+# preimenuje u .zavrsava (samo jedan od istovremenih zadnjih komada u tome
+# uspije) i ide kroz HashStorage kao svaki drugi prilog.
+
+UPLOAD_DIR = f"{PREFIKS}/.upload"
+MAX_VELICINA = 1024 * 1024 * 1024
+MAX_KOMAD = 16 * 1024 * 1024
+_RASPON_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class GreskaUploada(ValueError):
+    def __init__(self, poruka, status=400):
+        super().__init__(poruka)
+        self.status = status
+
+
+def content_range(zaglavlje):
+    """'bytes 0-99/1000' -> (0, 100, 1000) – početak, kraj (isključivo), ukupno."""
+    m = _RASPON_RE.match((zaglavlje or "").strip())
+    if not m:
+        raise GreskaUploada("nedostaje ili neispravan Content-Range (bytes a-b/ukupno)")
+    pocetak, zadnji, ukupno = map(int, m.groups())
+    if zadnji < pocetak or zadnji >= ukupno:
+        raise GreskaUploada("neispravan Content-Range")
+    return pocetak, zadnji + 1, ukupno
+
+
+class Upload:
+    def __init__(self, id, meta):
+        self.id = id
+        self.meta = meta
+        self.st = storage()
+        self.part = self.st.path(f"{UPLOAD_DIR}/{id}.part")
+        self.zavrsava = self.st.path(f"{UPLOAD_DIR}/{id}.zavrsava")
+
+    @staticmethod
+    def _meta_put(st, id):
+        return st.path(f"{UPLOAD_DIR}/{id}.json")
+
+    @classmethod
+    def zapocni(cls, dopis, ime, velicina, opis=""):
+        if not 0 < velicina <= MAX_VELICINA:
+            raise GreskaUploada(f"veličina mora biti između 1 i {MAX_VELICINA} B")
+        ime = os.path.basename((ime or "").replace("\\", "/")).strip()
+        if not ime:
+            raise GreskaUploada("nedostaje ime datoteke")
+        st = storage()
+        os.makedirs(st.path(UPLOAD_DIR), exist_ok=True)
+        id = uuid.uuid4().hex
+        meta = {
+            "dopis_id": dopis.pk,
+            "gradiliste_id": dopis.gradiliste_id,
+            "ime": ime[:255],
+            "opis": (opis or "")[:255],
+            "velicina": velicina,
+        }
+        with open(cls._meta_put(st, id), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        upload = cls(id, meta)
+        open(upload.part, "wb").close()
+        return upload
+
+    @classmethod
+    def ucitaj(cls, id):
+        """Postojeći upload ili None (nepoznat, završen ili očišćen)."""
+        if not re.fullmatch(r"[0-9a-f]{32}", id or ""):
+            return None
+        try:
+            with open(cls._meta_put(storage(), id), encoding="utf-8") as f:
+                return cls(id, json.load(f))
+        except FileNotFoundError:
+            return None
+
+    @property
+    def primljeno(self):
+        for put in (self.part, self.zavrsava):
+            try:
+                return os.path.getsize(put)
+            except FileNotFoundError:
+                pass
+        return 0  # završen ili očišćen u međuvremenu
+
+    @property
+    def gotov(self):
+        return self.primljeno == self.meta["velicina"]
+
+    def dodaj(self, tok, pocetak, kraj, ukupno):
+        """Dopisuje komad [pocetak, kraj) iz `tok` (request) – samo nastavak na primljeno."""
+        if ukupno != self.meta["velicina"]:
+            raise GreskaUploada("ukupna veličina ne odgovara uploadu")
+        if kraj - pocetak > MAX_KOMAD:
+            raise GreskaUploada(f"komad je veći od {MAX_KOMAD} B", status=413)
+        primljeno = self.primljeno
+        if pocetak != primljeno:
+            # klijent je izgubio odgovor ili šalje preskočeno – neka nastavi odavde
+            raise GreskaUploada(f"očekuje se komad od {primljeno}", status=409)
+        try:
+            f = open(self.part, "r+b")
+        except FileNotFoundError:
+            raise GreskaUploada("upload se već završava", status=409)
+        with f:
+            f.seek(pocetak)
+            ostalo = kraj - pocetak
+            while ostalo:
+                dio = tok.read(min(ostalo, CHUNK_SIZE))
+                if not dio:
+                    break
+                f.write(dio)
+                ostalo -= len(dio)
+            if ostalo:  # prekinuta veza – ne ostavljamo pola komada
+                f.truncate(pocetak)
+                raise GreskaUploada("komad nije stigao cijeli")
+        return self.primljeno
+
+    def zavrsi(self):
+        """
+        Sprema prilog (kroz HashStorage) i briše privremene datoteke. Dva
+        istovremena zadnja komada oba vide gotov upload – prilog sprema samo
+        onaj koji preimenuje .part, drugi dobiva GreskaUploada (409).
+        """
+        from django.core.files import File
+
+        from .models import Prilog
+
+        try:
+            os.rename(self.part, self.zavrsava)
+        except FileNotFoundError:
+            raise GreskaUploada("upload se već završava", status=409)
+        try:
+            with open(self.zavrsava, "rb") as f:
+                prilog = Prilog(
+                    dopis_id=self.meta["dopis_id"], ime=self.meta["ime"], opis=self.meta["opis"]
+                )
+                prilog.file.save(self.meta["ime"], File(f), save=False)
+                prilog.save()
+        except BaseException:
+            os.replace(self.zavrsava, self.part)  # klijent može ponoviti zadnji komad
+            raise
+        self.obrisi()
+        return prilog
+
+    def obrisi(self):
+        for put in (self.part, self.zavrsava, self._meta_put(self.st, self.id)):
+            if os.path.exists(put):
+                os.remove(put)
+
+
+def pocisti_uploade(prag_sati=PRAG_SATI):
+    """Briše nedovršene uploade koje nitko nije nastavio prag_sati. Vraća broj."""
+    st = storage()
+    direktorij = st.path(UPLOAD_DIR)
+    if not os.path.isdir(direktorij):
+        return 0
+    granica = time.time() - prag_sati * 3600
+    obrisano = 0
+    for ime in os.listdir(direktorij):
+        put = os.path.join(direktorij, ime)
+        id, ext = os.path.splitext(ime)
+        if ext in (".part", ".zavrsava") and os.path.getmtime(put) < granica:
+            Upload(id, {}).obrisi()
+            obrisano += 1
+    return obrisano
+
+
+# --- Range za preuzimanje ---
+
+class NedostupanRaspon(ValueError):
+    pass
+
+
+def raspon(zaglavlje, velicina):
+    """
+    Range: bytes=a-b | a- | -n -> (pocetak, kraj) uključivo, ili None (cijela
+    datoteka: nema zaglavlja, neispravno ili više raspona). NedostupanRaspon -> 416.
+    """
+    m = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", zaglavlje or "")
+    if not m or m.group(1) == m.group(2) == "":
+        return None
+    a, b = m.groups()
+    if a == "":  # zadnjih n bajtova
+        n = int(b)
+        if n == 0 or velicina == 0:
+            raise NedostupanRaspon
+        return max(velicina - n, 0), velicina - 1
+    pocetak = int(a)
+    kraj = min(int(b), velicina - 1) if b else velicina - 1
+    if pocetak >= velicina:
+        raise NedostupanRaspon
+    if kraj < pocetak:
+        return None
+    return pocetak, kraj
+
+
+class Isjecak:
+    """Čita najviše `duljina` bajtova iz otvorene datoteke (za FileResponse s 206)."""
+
+    def __init__(self, f, pocetak, duljina):
+        f.seek(pocetak)
+        self.f = f
+        self.ostalo = duljina
+
+    def read(self, n=-1):
+        n = self.ostalo if n < 0 else min(n, self.ostalo)
+        dio = self.f.read(n)
+        self.ostalo -= len(dio)
+        return dio
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,149 @@
+"""
+Mjerenje cijene requesta: broj SQL upita, ukupno SQL vrijeme, 5 najsporijih
+upita, duplikati, vrijeme renderiranja templatea i ukupno vrijeme.
+
+ProfilMiddleware mjeri samo uzorak requestova (settings.PROFIL_UZORAK,
+0–1); za ostale je trošak jedan random(). Izmjereni request dobiva
+Server-Timing zaglavlje (vidi se u DevTools -> Network -> Timing), a u log
+"evidencija.profil" ide jedan JSON redak (s najsporijim upitima).
+
+SQL se hvata kroz connection.execute_wrapper, a templatei kroz omotač oko
+Template.render Django backenda (render(), render_to_string) koji se
+postavlja u EvidencijaConfig.ready(), i to samo kad je ProfilMiddleware
+u MIDDLEWARE – uključeni
+templatei ({% include %}) se ne broje posebno. Za streaming odgovore
+(export) mjeri se samo vrijeme do prvog bajta.
+"""
+import contextvars
+import functools
+import heapq
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger("evidencija.profil")
+
+NAJSPORIJIH = 5
+SQL_DULJINA = 300
+
+_trenutni = contextvars.ContextVar("profil", default=None)
+
+
+class Profil:
+    def __init__(self):
+        self.upita = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.najsporiji = []  # min-heap (ms, redni broj, sql) – zadržava NAJSPORIJIH
+        self.isti = Counter()  # (sql, params) -> broj – pravi duplikati
+        self._dubina = 0
+
+    def sql(self, execute, sql, params, many, context):
+        pocetak = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - pocetak) * 1000
+            self.upita += 1
+            self.sql_ms += ms
+            stavka = (ms, self.upita, sql[:SQL_DULJINA])
+            if len(self.najsporiji) < NAJSPORIJIH:
+                heapq.heappush(self.najsporiji, stavka)
+            elif ms > self.najsporiji[0][0]:
+                heapq.heapreplace(self.najsporiji, stavka)
+            try:
+                self.isti[(sql, repr(params))] += 1
+            except Exception:  # params bez repr-a – ne smije srušiti upit
+                pass
+
+    @property
+    def duplikata(self):
+        return sum(n - 1 for n in self.isti.values() if n > 1)
+
+    def slicni(self):
+        """Isti SQL s različitim parametrima (tipično N+1) – (sql, broj) najčešćeg."""
+        po_sqlu = Counter()
+        for (sql, _), n in self.isti.items():
+            po_sqlu[sql] += n
+        if not po_sqlu:
+            return None
+        sql, n = po_sqlu.most_common(1)[0]
+        return (sql[:SQL_DULJINA], n) if n > 1 else None
+
+
+def _render(original):
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        profil = _trenutni.get()
+        if profil is None or profil._dubina:
+            return original(self, context, request)
+        profil._dubina += 1
+        pocetak = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            profil._dubina -= 1
+            profil.template_ms += (time.perf_counter() - pocetak) * 1000
+
+    render._profil = True
+    return render
+
+
+def mjeri_templatee():
+    """Omata Template.render Django backenda (jednom, ponovni poziv ne radi ništa)."""
+    if not getattr(django_backend.Template.render, "_profil", False):
+        django_backend.Template.render = _render(django_backend.Template.render)
+
+
+class ProfilMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        uzorak = settings.PROFIL_UZORAK
+        if uzorak <= 0 or (uzorak < 1 and random.random() >= uzorak):
+            return self.get_response(request)
+
+        profil = Profil()
+        token = _trenutni.set(profil)
+        pocetak = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                # wrapper se veže na objekt konekcije, ne na otvorenu vezu
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(profil.sql))
+                response = self.get_response(request)
+        finally:
+            _trenutni.reset(token)
+        ukupno_ms = (time.perf_counter() - pocetak) * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={profil.sql_ms:.1f};desc="{profil.upita} upita, {profil.duplikata} dupl."',
+            f"tpl;dur={profil.template_ms:.1f}",
+            f"total;dur={ukupno_ms:.1f}",
+        ])
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "view": match.view_name if match else None,
+            "metoda": request.method,
+            "put": request.path,
+            "status": response.status_code,
+            "ukupno_ms": round(ukupno_ms, 1),
+            "sql_ms": round(profil.sql_ms, 1),
+            "upita": profil.upita,
+            "duplikata": profil.duplikata,
+            "slicni": profil.slicni(),
+            "template_ms": round(profil.template_ms, 1),
+            "najsporiji": [
+                {"ms": round(ms, 2), "sql": sql}
+                for ms, _, sql in sorted(profil.najsporiji, reverse=True)
+            ],
+        }, ensure_ascii=False))
+        return response
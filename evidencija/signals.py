@@ -0,0 +1,85 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Dogadjaj, Dopis, Gradiliste, Prilog, doprinos_dogadjaja, oznaci_promjenu, pomakni_sazetak, razlika,
+)
+from .prilozi import promijeni_reference
+
+
+def _brise_se_gradiliste(origin):
+    # kaskadno brisanje cijelog gradilišta – sažetak bi se ponovno stvorio
+    # za gradilište koje upravo nestaje
+    return isinstance(origin, Gradiliste) or (isinstance(origin, QuerySet) and origin.model is Gradiliste)
+
+
+def _osvjezi(dogadjaj_ids):
+    gradilista = set()
+    for d in Dogadjaj.objects.filter(pk__in=[i for i in dogadjaj_ids if i]):
+        d.refresh_ball_state()
+        gradilista.add(d.gradiliste_id)
+    oznaci_promjenu(gradilista)
+
+
+@receiver(post_save, sender=Dopis)
+def dopis_spremljen(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    stari = getattr(instance, "_loaded_dogadjaj_id", None)
+    _osvjezi({instance.dogadjaj_id, stari})
+    instance._loaded_dogadjaj_id = instance.dogadjaj_id
+
+
+@receiver(post_delete, sender=Dopis)
+def dopis_obrisan(sender, instance, origin=None, **kwargs):
+    if _brise_se_gradiliste(origin):
+        return
+    pomakni_sazetak(instance.gradiliste_id, kategorije={instance.kategorija: -1})
+    # briše se cijeli događaj – nema se što osvježavati (verziju diže dogadjaj_obrisan)
+    if isinstance(origin, Dogadjaj) and origin.pk == instance.dogadjaj_id:
+        return
+    _osvjezi({instance.dogadjaj_id})
+
+
+@receiver(post_save, sender=Dogadjaj)
+def dogadjaj_spremljen(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # _loaded_gradiliste_id je još staro gradilište (Dogadjaj.save ga osvježi tek poslije)
+    oznaci_promjenu({instance.gradiliste_id, getattr(instance, "_loaded_gradiliste_id", None)})
+
+
+@receiver(post_delete, sender=Dogadjaj)
+def dogadjaj_obrisan(sender, instance, origin=None, **kwargs):
+    if _brise_se_gradiliste(origin):
+        return
+    oznaci_promjenu({instance.gradiliste_id})
+    pomakni_sazetak(instance.gradiliste_id, razlika(doprinos_dogadjaja(instance.status, instance.last_vrsta), {}))
+
+
+@receiver(post_save, sender=Prilog)
+@receiver(post_delete, sender=Prilog)
+def prilog_promijenjen(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _brise_se_gradiliste(origin):
+        return
+    oznaci_promjenu(
+        Dopis.objects.filter(pk=instance.dopis_id).values_list("gradiliste_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Prilog)
+def prilog_reference(sender, instance, raw=False, **kwargs):
+    # broj referenci bloba (prilozi.py); raw/fixture -> prilozi.prebroji_reference()
+    if raw:
+        return
+    novo, staro = instance.file.name, getattr(instance, "_loaded_file", None)
+    if novo != staro:
+        promijeni_reference(novo, 1)
+        promijeni_reference(staro, -1)
+        instance._loaded_file = novo
+
+
+@receiver(post_delete, sender=Prilog)
+def prilog_obrisan(sender, instance, **kwargs):
+    promijeni_reference(instance.file.name, -1)
@@ -0,0 +1,190 @@
+"""
+Sintetički podaci za mjerenje (manage.py generiraj_podatke, benchmark_viewova).
+
+Skala = gradilišta × događaji po gradilištu × dopisi po događaju × bilješke
+i prilozi po dopisu (prosjeci – stvarni broj po retku varira). Isti seed daje
+iste podatke, pa su mjerenja usporediva između commitova.
+
+Raspodjele grubo prate pravi registar: većina dopisa su ZZI i obavijesti,
+ulazni i izlazni se uglavnom izmjenjuju, dio događaja je zatvoren. Prilozi
+dijele mali skup blobova (kao stvarni duplikati ugovora i nacrta).
+
+Sve ide kroz bulk_create u komadima (kao uvoz.py), pa se na kraju jednom
+usklade brojači, stanje po zadnjem dopisu i reference priloga.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import prilozi
+from .brojaci import uskladi_brojac
+from .models import Biljeska, Dogadjaj, Dopis, Gradiliste, Prilog, normaliziraj_oznaku, rebuild_ball_state
+
+KOMAD = 500  # događaja po transakciji
+
+KATEGORIJE = {
+    "zzi": 40,
+    "obavijest": 20,
+    "dopis": 15,
+    "potrazivanje": 8,
+    "obavijest_o_potrazivanju": 5,
+    "uputa_inzenjera": 5,
+    "prijedlog": 3,
+    "poboljsanje": 2,
+    "": 2,
+}
+RADNJE = [k for k, _ in Dogadjaj.RADNJA_CHOICES]
+STATUSI = {"otvoreno": 70, "odgovoreno": 20, "zatvoreno": 10}
+RIJECI = (
+    "armatura beton oplata zid ploča temelj stup greda izolacija hidroizolacija "
+    "kašnjenje isporuka nacrt revizija očitovanje zahtjev rok troškovnik stavka "
+    "izvođač investitor nadzor inženjer gradilište dozvola ispitivanje uzorak "
+    "kanalizacija vodovod elektroinstalacije fasada krov stolarija skela dizalica"
+).split()
+
+
+@dataclass
+class Skala:
+    gradilista: int = 1
+    dogadjaja: int = 100  # po gradilištu
+    dopisa: float = 4  # prosječno po događaju
+    biljeski: float = 0.5  # prosječno po dopisu
+    priloga: float = 0.2  # prosječno po dopisu
+    blobova: int = 20  # različitih sadržaja priloga
+
+
+@dataclass
+class Rezultat:
+    gradilista: int = 0
+    dogadjaja: int = 0
+    dopisa: int = 0
+    biljeski: int = 0
+    priloga: int = 0
+
+
+def _koliko(rnd, prosjek):
+    """Slučajan broj >= 0 s očekivanjem `prosjek` (jednoliko 0..2×prosjek)."""
+    return int(rnd.uniform(0, 2 * prosjek) + 0.5) if prosjek > 0 else 0
+
+
+def _izaberi(rnd, tezine):
+    return rnd.choices(list(tezine), weights=list(tezine.values()))[0]
+
+
+def _tekst(rnd, od, do):
+    return " ".join(rnd.choices(RIJECI, k=rnd.randint(od, do)))
+
+
+def _blobovi(rnd, n):
+    """n različitih datoteka u spremištu priloga -> imena blobova."""
+    st = prilozi.storage()
+    imena = []
+    for i in range(n):
+        sadrzaj = rnd.randbytes(rnd.randint(2, 32) * 1024)
+        imena.append(st.save(f"prilozi/sinteticki_{i}.pdf", ContentFile(sadrzaj)))
+    return imena
+
+
+def generiraj(skala, seed=0, today=None, autor=None):
+    """Dodaje podatke u bazu (postojeće ne dira). Vraća Rezultat s brojevima."""
+    rnd = random.Random(seed)
+    today = today or timezone.localdate()
+    rezultat = Rezultat()
+    blobovi = _blobovi(rnd, skala.blobova) if skala.priloga > 0 and skala.blobova > 0 else []
+
+    gradilista = []
+    for gi in range(skala.gradilista):
+        g = Gradiliste.objects.create(
+            naziv=f"Sintetičko gradilište {seed}-{gi + 1}",
+            lokacija=rnd.choice(["Zagreb", "Split", "Rijeka", "Osijek"]),
+        )
+        gradilista.append(g)
+        rezultat.gradilista += 1
+        # oznake po kategoriji idu redom kroz cijelo gradilište
+        brojevi = dict.fromkeys(KATEGORIJE, 0)
+        for pocetak in range(0, skala.dogadjaja, KOMAD):
+            n = min(KOMAD, skala.dogadjaja - pocetak)
+            with transaction.atomic():
+                _komad(rnd, g, n, skala, brojevi, blobovi, today, autor, rezultat)
+
+    for g in gradilista:
+        najveci = (
+            Dopis.objects.filter(gradiliste=g).exclude(kategorija="")
+            .values("kategorija").annotate(najveci=Max("broj_int"))
+        )
+        for red in najveci:
+            uskladi_brojac(g.pk, red["kategorija"], red["najveci"])
+    rebuild_ball_state(Dogadjaj.objects.filter(gradiliste__in=gradilista))
+    if blobovi:
+        prilozi.prebroji_reference()
+    return rezultat
+
+
+def _komad(rnd, g, n, skala, brojevi, blobovi, today, autor, rezultat):
+    dogadjaji = Dogadjaj.objects.bulk_create_numbered(
+        [
+            Dogadjaj(
+                gradiliste=g,
+                naziv=_tekst(rnd, 2, 5).capitalize(),
+                opis=_tekst(rnd, 5, 30),
+                datum=today - timedelta(days=rnd.randint(0, 730)),
+                preporucena_radnja=rnd.choice(RADNJE),
+                status=_izaberi(rnd, STATUSI),
+            )
+            for _ in range(n)
+        ],
+        batch_size=KOMAD,
+    )
+
+    dopisi = []
+    for d in dogadjaji:
+        poslano = d.datum
+        vrsta = rnd.choice(["incoming", "outgoing"])
+        for _ in range(_koliko(rnd, skala.dopisa)):
+            poslano = min(poslano + timedelta(days=rnd.randint(0, 20)), today)
+            kategorija = _izaberi(rnd, KATEGORIJE)
+            broj_int, oznaka = None, ""
+            if kategorija:
+                brojevi[kategorija] += 1
+                broj_int = brojevi[kategorija]
+                oznaka = f"{kategorija.upper()} {broj_int}"
+            dopisi.append(Dopis(
+                dogadjaj=d,
+                gradiliste=g,
+                kategorija=kategorija,
+                oznaka=oznaka,
+                oznaka_norm=normaliziraj_oznaku(kategorija, oznaka),
+                broj_int=broj_int,
+                vrsta=vrsta,
+                poslano=poslano,
+                razuman_rok=poslano + timedelta(days=rnd.choice([7, 8, 14, 15, 28, 30])),
+                sadrzaj=_tekst(rnd, 10, 80),
+            ))
+            # uglavnom se izmjenjuju, ponekad dva zaredom
+            if rnd.random() < 0.8:
+                vrsta = "outgoing" if vrsta == "incoming" else "incoming"
+    Dopis.objects.bulk_create(dopisi, batch_size=KOMAD)
+
+    biljeske, novi_prilozi = [], []
+    for dp in dopisi:
+        biljeske.extend(
+            Biljeska(dopis=dp, autor=autor, tekst=_tekst(rnd, 3, 20))
+            for _ in range(_koliko(rnd, skala.biljeski))
+        )
+        if blobovi:
+            novi_prilozi.extend(
+                Prilog(dopis=dp, file=rnd.choice(blobovi), ime=f"{dp.oznaka or 'dopis'} prilog {i + 1}.pdf")
+                for i in range(_koliko(rnd, skala.priloga))
+            )
+    Biljeska.objects.bulk_create(biljeske, batch_size=KOMAD)
+    Prilog.objects.bulk_create(novi_prilozi, batch_size=KOMAD)
+
+    rezultat.dogadjaja += len(dogadjaji)
+    rezultat.dopisa += len(dopisi)
+    rezultat.biljeski += len(biljeske)
+    rezultat.priloga += len(novi_prilozi)
@@ -1,3 +1,1660 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest import mock
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth.models import User
+
+from django.core.exceptions import ValidationError
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import kes
+from .admin import ProcijenjeniPaginator
+from .benchmark import mjeri, scenariji, usporedi
+from . import odziv
+from .brojaci import rezerviraj_broj, sljedeci_broj
+from .models import Biljeska, BrojacDopisa, Datoteka, Gradiliste, GradilisteSazetak, Dogadjaj, Dopis, PodsjetnikStanje, Prilog, rebuild_ball_state
+from .pagination import PAGE_SIZE, encode_cursor
+from .podsjetnik import pokreni as pokreni_podsjetnik
+from .prilozi import UPLOAD_DIR, GreskaUploada, HashStorage, Upload, ime_bloba, pocisti
+from .pretraga import trazi
+from .sinteticki import Skala, generiraj
+from .tijek import stavke as stavke_tijeka
+from .views import KASNJENJA_PO_GRADILISTU, due_badge
+
+
+def napravi_dogadjaje(gradiliste, broj_dogadjaja, dopisa_po_dogadjaju=2):
+    """Brzo puni bazu (bulk_create) – broj događaja se zadaje ručno."""
+    danas = timezone.localdate()
+    dogadjaji = Dogadjaj.objects.bulk_create_numbered(
+        Dogadjaj(
+            gradiliste=gradiliste,
+            broj=i,
+            naziv=f"Događaj {i}",
+            preporucena_radnja="zzi",
+        )
+        for i in range(1, broj_dogadjaja + 1)
+    )
+    Dopis.objects.bulk_create(
+        Dopis(
+            dogadjaj=d,
+            gradiliste=gradiliste,
+            vrsta="incoming" if j % 2 == 0 else "outgoing",
+            poslano=danas - timedelta(days=j),
+            razuman_rok=danas + timedelta(days=j),
+        )
+        for d in dogadjaji
+        for j in range(dopisa_po_dogadjaju)
+    )
+    # bulk_create ne okida signale
+    rebuild_ball_state(Dogadjaj.objects.filter(gradiliste=gradiliste))
+    return dogadjaji
+
+
+class DogadjajListUpitiTest(TestCase):
+    def broj_upita(self, broj_dogadjaja, **params):
+        g = Gradiliste.objects.create(naziv=f"Gradilište {broj_dogadjaja}")
+        napravi_dogadjaje(g, broj_dogadjaja)
+        url = reverse("dogadjaj_list", args=[g.id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["rows"]), min(broj_dogadjaja, PAGE_SIZE))
+        return len(ctx.captured_queries)
+
+    def test_broj_upita_ne_ovisi_o_broju_dogadjaja(self):
+        self.assertEqual(self.broj_upita(10), self.broj_upita(1000))
+
+    def test_broj_upita_ne_ovisi_o_sortiranju_dopisa(self):
+        self.assertEqual(
+            self.broj_upita(10, d_sort="rok_desc"),
+            self.broj_upita(1000, d_sort="rok_desc"),
+        )
+
+    def test_zadnji_dopis_i_poredak_dopisa(self):
+        g = Gradiliste.objects.create(naziv="G")
+        (d,) = napravi_dogadjaje(g, 1, dopisa_po_dogadjaju=3)
+        response = self.client.get(
+            reverse("dogadjaj_list", args=[g.id]), {"d_sort": "poslano_desc"}
+        )
+        _, dopisi, ball_on_us, last, _ = response.context["rows"][0]
+        self.assertEqual(last, d.dopisi.order_by("-poslano", "-id").first())
+        self.assertTrue(ball_on_us)  # zadnji (j=0) je ulazni
+        self.assertEqual(
+            [dp for dp, _, _ in dopisi], list(d.dopisi.order_by("-poslano", "id"))
+        )
+
+
+class BallStateTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+        self.danas = timezone.localdate()
+
+    def dopis(self, dogadjaj=None, **kwargs):
+        kwargs.setdefault("poslano", self.danas)
+        return Dopis.objects.create(dogadjaj=dogadjaj or self.d, **kwargs)
+
+    def test_spremanje_dopisa(self):
+        self.dopis(vrsta="outgoing", poslano=self.danas - timedelta(days=3))
+        zadnji = self.dopis(vrsta="incoming", razuman_rok=self.danas + timedelta(days=5))
+        self.d.refresh_from_db()
+        self.assertEqual(self.d.last_dopis, zadnji)
+        self.assertEqual(self.d.last_vrsta, "incoming")
+        self.assertEqual(self.d.last_poslano, self.danas)
+        self.assertEqual(self.d.effective_due, self.danas + timedelta(days=5))
+        self.assertTrue(self.d.ball_on_us)
+
+    def test_uredjivanje_i_brisanje(self):
+        prvi = self.dopis(vrsta="outgoing", poslano=self.danas - timedelta(days=3))
+        drugi = self.dopis(vrsta="incoming")
+        drugi.vrsta = "outgoing"
+        drugi.save()
+        self.d.refresh_from_db()
+        self.assertEqual(self.d.last_vrsta, "outgoing")
+
+        drugi.delete()
+        self.d.refresh_from_db()
+        self.assertEqual(self.d.last_dopis, prvi)
+
+        prvi.delete()
+        self.d.refresh_from_db()
+        self.assertIsNone(self.d.last_dopis)
+        self.assertIsNone(self.d.last_vrsta)
+        self.assertIsNone(self.d.effective_due)
+
+    def test_premjestanje_dopisa_osvjezava_oba_dogadjaja(self):
+        drugi = Dogadjaj.objects.create(gradiliste=self.g, naziv="D2", preporucena_radnja="zzi")
+        dp = self.dopis(vrsta="incoming")
+        dp = Dopis.objects.get(pk=dp.pk)
+        dp.dogadjaj = drugi
+        dp.save()
+        self.d.refresh_from_db()
+        drugi.refresh_from_db()
+        self.assertIsNone(self.d.last_dopis)
+        self.assertEqual(drugi.last_dopis, dp)
+
+    def test_rebuild_ball_state(self):
+        dp = self.dopis(vrsta="incoming", razuman_rok=self.danas + timedelta(days=2))
+        Dogadjaj.objects.update(last_dopis=None, last_vrsta=None, last_poslano=None, effective_due=None)
+        call_command("rebuild_ball_state", stdout=StringIO())
+        self.d.refresh_from_db()
+        self.assertEqual(self.d.last_dopis, dp)
+        self.assertEqual(self.d.effective_due, self.danas + timedelta(days=2))
+
+    def test_sortiranje_po_hitnosti(self):
+        kod_njih = Dogadjaj.objects.create(gradiliste=self.g, naziv="kod njih", preporucena_radnja="zzi")
+        bez_dopisa = Dogadjaj.objects.create(gradiliste=self.g, naziv="prazno", preporucena_radnja="zzi")
+        hitno = Dogadjaj.objects.create(gradiliste=self.g, naziv="hitno", preporucena_radnja="zzi")
+        self.dopis(vrsta="incoming", razuman_rok=self.danas + timedelta(days=10))
+        self.dopis(kod_njih, vrsta="outgoing")
+        self.dopis(hitno, vrsta="incoming", razuman_rok=self.danas + timedelta(days=1))
+        response = self.client.get(reverse("dogadjaj_list", args=[self.g.id]), {"sort": "hitnost"})
+        poredak = [row[0] for row in response.context["rows"]]
+        self.assertEqual(poredak, [hitno, self.d, kod_njih, bez_dopisa])
+
+
+# testovi gledaju context["rows"], koji postoji samo kad se redovi računaju (promašaj keša)
+BEZ_KESA = override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+
+
+@BEZ_KESA
+class KeysetPaginacijaTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.g = Gradiliste.objects.create(naziv="G")
+        napravi_dogadjaje(cls.g, 2 * PAGE_SIZE + 7, dopisa_po_dogadjaju=2)
+        # nekoliko događaja bez broja i bez dopisa (NULL u sortirnim stupcima)
+        for i in range(3):
+            Dogadjaj.objects.create(gradiliste=cls.g, broj=None, naziv=f"X{i}", preporucena_radnja="zzi")
+        Dogadjaj.objects.filter(broj__in=[3, 4, 5]).update(broj=None)
+        Dogadjaj.objects.filter(broj__lte=20).update(datum=timezone.localdate())
+
+    def prodji(self, url, params, kljuc, izvuci):
+        """Prolazi naprijed do kraja pa natrag do početka; vraća oba redoslijeda."""
+        naprijed, stranice = [], []
+        response = self.client.get(url, params)
+        while True:
+            naprijed += [izvuci(r) for r in response.context[kljuc]]
+            stranica = response.context["stranica"]
+            stranice.append(stranica)
+            if not stranica.next_cursor:
+                break
+            response = self.client.get(url, {**params, "nakon": stranica.next_cursor})
+        natrag = [izvuci(r) for r in response.context[kljuc]][::-1]
+        while stranica.prev_cursor:
+            response = self.client.get(url, {**params, "prije": stranica.prev_cursor})
+            stranica = response.context["stranica"]
+            natrag += [izvuci(r) for r in response.context[kljuc]][::-1]
+        return naprijed, natrag[::-1], stranice
+
+    def test_dogadjaj_list_svi_sortovi(self):
+        url = reverse("dogadjaj_list", args=[self.g.id])
+        ocekivano_broj = list(Dogadjaj.objects.filter(gradiliste=self.g).order_by("broj", "id"))
+        for sort in ["broj_asc", "broj_desc", "datum_asc", "datum_desc", "hitnost"]:
+            with self.subTest(sort=sort):
+                naprijed, natrag, stranice = self.prodji(url, {"sort": sort}, "rows", lambda r: r[0])
+                self.assertEqual(len(naprijed), len(ocekivano_broj))
+                self.assertEqual(set(naprijed), set(ocekivano_broj))
+                self.assertEqual(naprijed, natrag)
+                self.assertTrue(all(len(s) <= PAGE_SIZE for s in stranice))
+        naprijed, _, _ = self.prodji(url, {"sort": "broj_asc"}, "rows", lambda r: r[0])
+        self.assertEqual(naprijed, ocekivano_broj)
+
+    def test_dopisi_po_kategoriji_svi_sortovi(self):
+        url = reverse("dopisi_po_kategoriji", args=[self.g.id])
+        svi = set(Dopis.objects.filter(dogadjaj__gradiliste=self.g))
+        for sort in ["poslano_asc", "poslano_desc", "rok_asc", "rok_desc", "broj_asc", "broj_desc", "dogadjaj_asc", "dogadjaj_desc"]:
+            with self.subTest(sort=sort):
+                naprijed, natrag, _ = self.prodji(url, {"sort": sort}, "dopisi", lambda r: r)
+                self.assertEqual(len(naprijed), len(svi))
+                self.assertEqual(set(naprijed), svi)
+                self.assertEqual(naprijed, natrag)
+
+    def test_neispravan_kursor_vraca_prvu_stranicu(self):
+        url = reverse("dogadjaj_list", args=[self.g.id])
+        prva = self.client.get(url).context["rows"]
+        losa = self.client.get(url, {"nakon": "nije-kursor"}).context["rows"]
+        self.assertEqual([r[0] for r in prva], [r[0] for r in losa])
+
+    def test_kursor_s_krivim_tipovima_vraca_prvu_stranicu(self):
+        for url, kljuc, prvi in [
+            (reverse("dogadjaj_list", args=[self.g.id]), "rows", lambda r: r[0].pk),
+            (reverse("dopisi_po_kategoriji", args=[self.g.id]), "dopisi", lambda r: r.pk),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                # ispravan base64/JSON prave duljine, ali tekst umjesto datuma/broja
+                kursor = response.context["stranica"].next_cursor
+                n = len(json.loads(base64.urlsafe_b64decode(kursor + "=" * (-len(kursor) % 4))))
+                los = encode_cursor(["x"] * n)
+                for param in ("nakon", "prije"):
+                    losa = self.client.get(url, {param: los})
+                    self.assertEqual(losa.status_code, 200)
+                    self.assertEqual(
+                        [prvi(r) for r in losa.context[kljuc]], [prvi(r) for r in response.context[kljuc]]
+                    )
+
+
+class BrojacDopisaTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+
+    def test_spremanje_dodjeljuje_broj(self):
+        prvi = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi")
+        drugi = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi")
+        ostalo = Dopis.objects.create(dogadjaj=self.d, kategorija="dopis")
+        bez_kategorije = Dopis.objects.create(dogadjaj=self.d)
+        self.assertEqual((prvi.broj_int, drugi.broj_int, ostalo.broj_int), (1, 2, 1))
+        self.assertIsNone(bez_kategorije.broj_int)
+
+    def test_rucni_broj_pomice_brojac(self):
+        Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", oznaka="ZZI 14")
+        self.assertEqual(sljedeci_broj(self.g.id, "zzi"), 15)
+        Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", broj_int=3)
+        self.assertEqual(sljedeci_broj(self.g.id, "zzi"), 15)
+
+    def test_endpoint_ne_trosi_brojeve(self):
+        user = User.objects.create_user("u", password="p")
+        self.client.force_login(user)
+        url = reverse("next_broj_for_kategorija", args=[self.g.id])
+        for _ in range(3):
+            data = self.client.get(url, {"kategorija": "zzi"}).json()
+        self.assertEqual(data, {"next": "ZZI 1", "broj": 1})
+        self.assertEqual(Dopis.objects.create(dogadjaj=self.d, kategorija="zzi").broj_int, 1)
+
+
+class BrojacDopisaKonkurentnostTest(TransactionTestCase):
+    DRETVE = 8
+    PO_DRETVI = 25
+
+    def test_paralelne_rezervacije_bez_duplikata_i_rupa(self):
+        g = Gradiliste.objects.create(naziv="G")
+        dobiveni, greske = [], []
+        start = threading.Barrier(self.DRETVE)
+
+        def radnik():
+            try:
+                start.wait()
+                for _ in range(self.PO_DRETVI):
+                    dobiveni.append(rezerviraj_broj(g.id, "zzi"))
+            except Exception as e:  # pragma: no cover - ispisuje se u assertu
+                greske.append(e)
+            finally:
+                connection.close()
+
+        dretve = [threading.Thread(target=radnik) for _ in range(self.DRETVE)]
+        for t in dretve:
+            t.start()
+        for t in dretve:
+            t.join()
+
+        self.assertEqual(greske, [])
+        ukupno = self.DRETVE * self.PO_DRETVI
+        self.assertEqual(sorted(dobiveni), list(range(1, ukupno + 1)))
+        self.assertEqual(BrojacDopisa.objects.get(gradiliste=g, kategorija="zzi").zadnji, ukupno)
+
+    def test_neuspjelo_spremanje_ne_trosi_broj(self):
+        # bez okolne transakcije – kao u requestu (autocommit)
+        d = Dogadjaj.objects.create(gradiliste=Gradiliste.objects.create(naziv="G"), naziv="D", preporucena_radnja="zzi")
+        Dopis.objects.create(dogadjaj=d, kategorija="zzi", oznaka="ZZI 7")
+        with self.assertRaises(IntegrityError):
+            Dopis.objects.create(dogadjaj=d, kategorija="zzi", oznaka="zzi 7")
+        self.assertEqual(sljedeci_broj(d.gradiliste_id, "zzi"), 8)
+
+
+class BrojDogadjajaTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+
+    def novi(self, **kwargs):
+        return Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi", **kwargs)
+
+    def test_uzastopni_brojevi_i_rucni_broj(self):
+        self.assertEqual([self.novi().broj for _ in range(3)], [1, 2, 3])
+        self.assertEqual(self.novi(broj=10).broj, 10)
+        self.assertEqual(self.novi().broj, 11)
+        drugo = Gradiliste.objects.create(naziv="G2")
+        self.assertEqual(Dogadjaj.objects.create(gradiliste=drugo, naziv="D", preporucena_radnja="zzi").broj, 1)
+
+    def test_bulk_create_numbered(self):
+        self.novi()
+        novi = Dogadjaj.objects.bulk_create_numbered(
+            Dogadjaj(gradiliste=self.g, naziv=f"D{i}", preporucena_radnja="zzi") for i in range(5)
+        )
+        self.assertEqual([d.broj for d in novi], [2, 3, 4, 5, 6])
+        self.assertEqual(self.novi().broj, 7)
+
+    def test_spremanje_stare_instance_ne_vraca_brojace(self):
+        stara = Gradiliste.objects.get(pk=self.g.pk)
+        self.novi()
+        self.novi()
+        stara.lokacija = "Split"
+        stara.save()
+        g = Gradiliste.objects.get(pk=self.g.pk)
+        self.assertEqual((g.lokacija, g.zadnji_broj_dogadjaja), ("Split", 2))
+        self.assertGreater(g.verzija, stara.verzija)
+        self.assertEqual(self.novi().broj, 3)
+
+
+class BrojDogadjajaKonkurentnostTest(TransactionTestCase):
+    def test_paralelno_stvaranje_dogadjaja(self):
+        g = Gradiliste.objects.create(naziv="G")
+        greske = []
+
+        def radnik():
+            try:
+                for _ in range(10):
+                    Dogadjaj.objects.create(gradiliste_id=g.id, naziv="D", preporucena_radnja="zzi")
+            except Exception as e:  # pragma: no cover - ispisuje se u assertu
+                greske.append(e)
+            finally:
+                connection.close()
+
+        dretve = [threading.Thread(target=radnik) for _ in range(6)]
+        for t in dretve:
+            t.start()
+        for t in dretve:
+            t.join()
+
+        self.assertEqual(greske, [])
+        brojevi = sorted(Dogadjaj.objects.filter(gradiliste=g).values_list("broj", flat=True))
+        self.assertEqual(brojevi, list(range(1, 61)))
+
+
+class OznakaJedinstvenostTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+
+    def test_normalizirana_oznaka_i_gradiliste(self):
+        dp = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", oznaka="  ZZI   7 ")
+        self.assertEqual(dp.gradiliste_id, self.g.id)
+        self.assertEqual(dp.oznaka_norm, "zzi 7")
+        self.assertIsNone(Dopis.objects.create(dogadjaj=self.d, oznaka="ZZI 7").oznaka_norm)
+
+    def test_baza_odbija_duplikat_i_izvan_forme(self):
+        Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", oznaka="ZZI 7")
+        drugi = Dogadjaj.objects.create(gradiliste=self.g, naziv="D2", preporucena_radnja="zzi")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Dopis.objects.create(dogadjaj=drugi, kategorija="zzi", oznaka="zzi  7")
+        # druga kategorija ili drugo gradilište – dopušteno
+        Dopis.objects.create(dogadjaj=drugi, kategorija="dopis", oznaka="ZZI 7")
+        g2 = Gradiliste.objects.create(naziv="G2")
+        d2 = Dogadjaj.objects.create(gradiliste=g2, naziv="D", preporucena_radnja="zzi")
+        Dopis.objects.create(dogadjaj=d2, kategorija="zzi", oznaka="ZZI 7")
+
+    def test_clean_javlja_gresku_na_formi(self):
+        Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", oznaka="ZZI 7")
+        with self.assertRaises(ValidationError):
+            Dopis(dogadjaj=self.d, kategorija="zzi", oznaka="zzi 7").clean()
+
+    def test_premjestanje_dogadjaja_prenosi_gradiliste(self):
+        dp = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", oznaka="ZZI 7")
+        g2 = Gradiliste.objects.create(naziv="G2")
+        d = Dogadjaj.objects.get(pk=self.d.pk)
+        d.gradiliste = g2
+        d.save()
+        dp.refresh_from_db()
+        self.assertEqual(dp.gradiliste_id, g2.id)
+
+
+class UpitniPlanoviTest(TestCase):
+    """
+    EXPLAIN QUERY PLAN za svaki upit registara: nema full scana tablica
+    iz evidencije ni sortiranja cijelog rezultata u TEMP B-TREE.
+    (Sort po događaju smije sortirati dopise unutar jednog događaja –
+    "RIGHT PART OF ORDER BY" – to je nekoliko redova po koraku.)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.g = Gradiliste.objects.create(naziv="G")
+        cls.dogadjaji = napravi_dogadjaje(cls.g, 60, dopisa_po_dogadjaju=3)
+        napravi_dogadjaje(Gradiliste.objects.create(naziv="G2"), 60, dopisa_po_dogadjaju=3)
+        Dopis.objects.filter(dogadjaj__in=cls.dogadjaji[:20]).update(kategorija="zzi")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+
+    def losi_planovi(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+            stranica = response.context.get("stranica") if response.context else None
+            if stranica is not None and stranica.next_cursor:
+                self.client.get(url, {**params, "nakon": stranica.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        losi = []
+        with connection.cursor() as cursor:
+            for upit in ctx.captured_queries:
+                if not upit["sql"].startswith("SELECT"):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + upit["sql"])
+                for red in cursor.fetchall():
+                    detalj = red[-1]
+                    if "TEMP B-TREE FOR ORDER BY" in detalj or (
+                        detalj.startswith("SCAN") and "evidencija_" in detalj
+                    ):
+                        losi.append((upit["sql"], detalj))
+        return losi
+
+    def test_dogadjaj_list(self):
+        url = reverse("dogadjaj_list", args=[self.g.id])
+        for sort in ["broj_asc", "broj_desc", "datum_asc", "datum_desc", "hitnost"]:
+            with self.subTest(sort=sort):
+                self.assertEqual(self.losi_planovi(url, {"sort": sort}), [])
+        for d_sort in ["broj_asc", "broj_desc", "poslano_asc", "poslano_desc", "rok_asc", "rok_desc"]:
+            with self.subTest(d_sort=d_sort):
+                self.assertEqual(self.losi_planovi(url, {"d_sort": d_sort}), [])
+
+    def test_dogadjaj_detail(self):
+        url = reverse("dogadjaj_detail", args=[self.g.id, self.dogadjaji[0].id])
+        self.assertEqual(self.losi_planovi(url, {}), [])
+
+    def test_dopisi_po_kategoriji(self):
+        url = reverse("dopisi_po_kategoriji", args=[self.g.id])
+        for sort in [
+            "poslano_asc", "poslano_desc", "rok_asc", "rok_desc",
+            "broj_asc", "broj_desc", "dogadjaj_asc", "dogadjaj_desc",
+        ]:
+            for kategorija in ["", "zzi"]:
+                with self.subTest(sort=sort, kategorija=kategorija):
+                    params = {"sort": sort, "kategorija": kategorija}
+                    self.assertEqual(self.losi_planovi(url, params), [])
+
+    def test_admin_dopisi(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:evidencija_dopis_changelist")
+        losi = self.losi_planovi(url, {"gradiliste__id__exact": self.g.id})
+        # popis gradilišta za filter, COUNT (ograničen, ProcijenjeniPaginator) i
+        # brojevi po gradilištu za filter (keširani, GradilisteFilter)
+        losi = [
+            (sql, detalj) for sql, detalj in losi
+            if detalj != "SCAN evidencija_gradiliste"
+            and not sql.startswith("SELECT COUNT(*)")
+            and not (sql.endswith('FROM "evidencija_dopis" GROUP BY 1') and "COVERING INDEX" in detalj)
+        ]
+        self.assertEqual(losi, [])
+
+
+class SqliteProfilTest(TestCase):
+    def test_pragme_na_konekciji(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+class PretragaTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(
+            gradiliste=self.g, naziv="Zidni elementi", opis="Kašnjenje isporuke", preporucena_radnja="zzi"
+        )
+        self.dp = Dopis.objects.create(
+            dogadjaj=self.d, kategorija="zzi", oznaka="ZZI 3",
+            sadrzaj="Tražimo očitovanje o <b>čeličnoj</b> armaturi.",
+        )
+
+    def pogoci(self, q, gradiliste=None):
+        return [(p["tip"], p["id"]) for p in trazi((gradiliste or self.g).id, q)]
+
+    def test_triggeri_prate_promjene(self):
+        self.assertEqual(self.pogoci("armatur"), [("dopis", self.dp.id)])
+        self.assertEqual(self.pogoci("zidni"), [("dogadjaj", self.d.id)])
+        # bez dijakritika i velikih slova
+        self.assertEqual(self.pogoci("CELICNOJ"), [("dopis", self.dp.id)])
+
+        Dopis.objects.filter(pk=self.dp.pk).update(sadrzaj="Nešto sasvim drugo")
+        self.assertEqual(self.pogoci("armatur"), [])
+        self.dp.delete()
+        self.assertEqual(self.pogoci("drugo"), [])
+
+    def test_samo_zadano_gradiliste(self):
+        g2 = Gradiliste.objects.create(naziv="G2")
+        self.assertEqual(self.pogoci("armatur", g2), [])
+        # ID gradilišta je u indeksu, ali korisnički pojmovi ga ne pogađaju
+        self.assertEqual(self.pogoci(str(self.g.id)), [])
+        # premještanje događaja nosi i dopise (Dopis.gradiliste preko update())
+        self.d.gradiliste = g2
+        self.d.save()
+        self.assertEqual(self.pogoci("armatur", g2), [("dopis", self.dp.id)])
+
+    def test_neispravan_upit_ne_puca(self):
+        self.assertEqual(self.pogoci('"zidni ('), [("dogadjaj", self.d.id)])
+        self.assertEqual(self.pogoci("  ***  "), [])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM evidencija_pretraga")
+        self.assertEqual(self.pogoci("armatur"), [])
+        out = StringIO()
+        call_command("rebuild_pretraga", stdout=out)
+        self.assertIn("2", out.getvalue())
+        self.assertEqual(self.pogoci("armatur"), [("dopis", self.dp.id)])
+
+    def test_view_oznacava_i_escapea(self):
+        response = self.client.get(reverse("pretraga", args=[self.g.id]), {"q": "čeličnoj"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<mark>čeličnoj</mark>")
+        self.assertContains(response, "&lt;b&gt;")
+        self.assertNotContains(response, "<b>čeličnoj")
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.dogadjaji = napravi_dogadjaje(self.g, 3, dopisa_po_dogadjaju=2)
+        Dopis.objects.filter(dogadjaj=self.dogadjaji[0]).update(
+            kategorija="zzi", sadrzaj="Očitovanje; \"navodnici\" & <znakovi>\x01"
+        )
+        napravi_dogadjaje(Gradiliste.objects.create(naziv="G2"), 2)
+        self.url = reverse("dopisi_export", args=[self.g.id])
+
+    def test_csv(self):
+        response = self.client.get(self.url, {"sort": "dogadjaj_asc"})
+        self.assertTrue(response.streaming)
+        sadrzaj = b"".join(response.streaming_content).decode("utf-8-sig")
+        redovi = list(csv.reader(StringIO(sadrzaj), delimiter=";"))
+        self.assertEqual(redovi[0][0], "Događaj")
+        self.assertEqual(len(redovi), 1 + 6)
+        self.assertEqual([r[0] for r in redovi[1:]], ["1", "1", "2", "2", "3", "3"])
+        self.assertEqual(redovi[1][2], "ZZI")
+        self.assertEqual(redovi[1][5], "Izlazno")  # unutar događaja kronološki
+
+    def test_csv_filtar_kategorije(self):
+        response = self.client.get(self.url, {"kategorija": "zzi"})
+        sadrzaj = b"".join(response.streaming_content).decode("utf-8-sig")
+        self.assertEqual(len(sadrzaj.splitlines()), 1 + 2)
+        self.assertIn('filename="dopisi-', response["Content-Disposition"])
+        self.assertIn('-zzi-', response["Content-Disposition"])
+
+    def test_nepoznata_kategorija(self):
+        response = self.client.get(self.url, {"kategorija": 'x"\r\nSet-Cookie: a=b'})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("Content-Disposition", response)
+
+    def test_xlsx(self):
+        response = self.client.get(self.url, {"format": "xlsx", "sort": "dogadjaj_asc"})
+        self.assertTrue(response.streaming)
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zf:
+            self.assertIsNone(zf.testzip())
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode()
+        root = ElementTree.fromstring(sheet)  # ispravan XML unatoč & < > i kontrolnim znakovima
+        ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        self.assertEqual(len(root.findall(".//m:row", ns)), 1 + 6)
+        self.assertIn("&lt;znakovi&gt;", sheet)
+        # datumi su brojevi s datumskim stilom
+        self.assertIn('<c s="1"><v>', sheet)
+
+
+class ImportRegisterTest(TestCase):
+    CSV = (
+        "dogadjaj_broj;dogadjaj_naziv;preporucena_radnja;kategorija;oznaka;vrsta;poslano;razuman_rok;sadrzaj\n"
+        "5;Zidni elementi;zzi;ZZI;ZZI 3;Ulazno;2024-03-01;;Prvi dopis\n"
+        "5;;;zzi;ZZI 4;outgoing;2.3.2024.;10.3.2024;Odgovor\n"
+        "6;Armatura;claim;;;;;;\n"
+        "7;;;zzi;ZZI 9;incoming;2024-03-05;;Nema naziva događaja\n"
+        "5;;;zzi;zzi  3;incoming;2024-03-06;;Duplikat oznake\n"
+        "5;;;nepostojeca;X 1;incoming;2024-03-06;;\n"
+        "6;;;dopis;D 1;incoming;31.02.2024;;Loš datum\n"
+    )
+
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+
+    def uvezi(self, *args, csv_tekst=None):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as f:
+            f.write(csv_tekst or self.CSV)
+        self.addCleanup(os.unlink, f.name)
+        out, err = StringIO(), StringIO()
+        call_command("import_register", f.name, "--gradiliste", str(self.g.id), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_uvoz_i_greske(self):
+        out, err = self.uvezi()
+        self.assertIn("novih događaja: 2, dopisa: 2, grešaka: 4", out)
+        for redak in ("redak 5:", "redak 6:", "redak 7:", "redak 8:"):
+            self.assertIn(redak, err)
+
+        d = Dogadjaj.objects.get(gradiliste=self.g, broj=5)
+        self.assertEqual(d.preporucena_radnja, "zzi")
+        dopisi = list(d.dopisi.order_by("poslano"))
+        self.assertEqual([dp.oznaka_norm for dp in dopisi], ["zzi 3", "zzi 4"])
+        self.assertEqual(dopisi[0].razuman_rok, dopisi[0].poslano + timedelta(days=7))
+        # brojači i stanje po zadnjem dopisu usklađeni nakon bulk_create
+        self.assertEqual(sljedeci_broj(self.g.id, "zzi"), 5)
+        self.assertEqual(d.last_dopis_id, dopisi[1].id)
+        self.assertEqual(d.last_vrsta, "outgoing")
+        self.g.refresh_from_db()
+        self.assertEqual(self.g.zadnji_broj_dogadjaja, 6)
+        self.assertEqual(trazi(self.g.id, "odgovor")[0]["id"], dopisi[1].id)
+
+    def test_dopis_bez_broja_dobiva_sljedeci(self):
+        Dogadjaj.objects.create(gradiliste=self.g, broj=1, naziv="D", preporucena_radnja="zzi")
+        Dopis.objects.create(dogadjaj=Dogadjaj.objects.get(gradiliste=self.g, broj=1), kategorija="zzi")
+        self.uvezi(csv_tekst=(
+            "dogadjaj_broj;kategorija;oznaka;poslano\n"
+            "1;zzi;;2024-03-01\n"
+            "1;zzi;ZZI 7;2024-03-02\n"
+            "1;zzi;bez broja;2024-03-03\n"
+            "1;;;2024-03-04\n"
+        ))
+        brojevi = list(Dopis.objects.filter(gradiliste=self.g).order_by("id").values_list("broj_int", flat=True))
+        self.assertEqual(brojevi, [1, 2, 7, 8, None])
+        self.assertEqual(Dopis.objects.create(dogadjaj_id=Dopis.objects.first().dogadjaj_id, kategorija="zzi").broj_int, 9)
+
+    def test_dry_run_ne_sprema(self):
+        out, _ = self.uvezi("--dry-run")
+        self.assertIn("[dry-run]", out)
+        self.assertFalse(Dogadjaj.objects.exists())
+        self.assertFalse(Dopis.objects.exists())
+        self.assertEqual(sljedeci_broj(self.g.id, "zzi"), 1)
+
+    def test_postojeci_dogadjaj_i_izvjestaj_gresaka(self):
+        Dogadjaj.objects.create(gradiliste=self.g, broj=7, naziv="Postoji", preporucena_radnja="zzi")
+        greske = tempfile.NamedTemporaryFile(suffix=".csv", delete=False).name
+        self.addCleanup(os.unlink, greske)
+        self.uvezi("--greske", greske, "--chunk", "2")
+        with open(greske, encoding="utf-8") as f:
+            redovi = list(csv.reader(f))
+        self.assertEqual(redovi[0], ["redak", "greska"])
+        self.assertEqual([r[0] for r in redovi[1:]], ["6", "7", "8"])
+        self.assertEqual(Dopis.objects.filter(dogadjaj__broj=7).count(), 1)
+
+    def test_export_se_moze_uvesti(self):
+        izvor = Gradiliste.objects.create(naziv="Izvor")
+        napravi_dogadjaje(izvor, 3)
+        Dogadjaj.objects.filter(gradiliste=izvor).update(naziv="Događaj")
+        response = self.client.get(reverse("dopisi_export", args=[izvor.id]))
+        sadrzaj = b"".join(response.streaming_content).decode("utf-8-sig")
+        out, err = self.uvezi(csv_tekst=sadrzaj)
+        self.assertEqual(err, "")
+        self.assertEqual(Dopis.objects.filter(gradiliste=self.g).count(), 6)
+
+
+class KasnjenjaTest(TestCase):
+    def napravi(self, gradiliste, naziv, vrsta, rok, status="otvoreno"):
+        d = Dogadjaj.objects.create(
+            gradiliste=gradiliste, naziv=naziv, preporucena_radnja="zzi", status=status
+        )
+        Dopis.objects.create(
+            dogadjaj=d, vrsta=vrsta, poslano=rok - timedelta(days=7), razuman_rok=rok
+        )
+        return d
+
+    def test_sva_gradilista_jednim_upitom(self):
+        danas = timezone.localdate()
+        a = Gradiliste.objects.create(naziv="A")
+        b = Gradiliste.objects.create(naziv="B")
+        a_kasni_5 = self.napravi(a, "a5", "incoming", danas - timedelta(days=5))
+        a_kasni_1 = self.napravi(a, "a1", "incoming", danas - timedelta(days=1))
+        a_ima_3 = self.napravi(a, "a+3", "incoming", danas + timedelta(days=3))
+        self.napravi(a, "kod njih", "outgoing", danas - timedelta(days=9))
+        self.napravi(a, "zatvoreno", "incoming", danas - timedelta(days=9), status="zatvoreno")
+        self.napravi(a, "odgovoreno", "incoming", danas - timedelta(days=9), status="odgovoreno")
+        b_kasni_2 = self.napravi(b, "b2", "incoming", danas - timedelta(days=2))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("kasnjenja"))
+            dogadjaji = list(response.context["dogadjaji"])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            [d.id for d in dogadjaji], [a_kasni_5.id, a_kasni_1.id, a_ima_3.id, b_kasni_2.id]
+        )
+        self.assertEqual([d.do_roka.days for d in dogadjaji], [-5, -1, 3, -2])
+        self.assertEqual(
+            [(d.ukupno_na_gradilistu, d.kasni_na_gradilistu) for d in dogadjaji],
+            [(3, 2), (3, 2), (3, 2), (1, 1)],
+        )
+        self.assertContains(response, "Kasnimo 5d")
+        # isti broj kašnjenja kao na popisu gradilišta
+        kasni = dict(self.client.get(reverse("gradiliste_list")).context["gradilista"].values_list("naziv", "kasni"))
+        self.assertEqual(kasni, {"A": 2, "B": 1})
+
+    def test_najhitnijih_n_po_gradilistu(self):
+        g = Gradiliste.objects.create(naziv="G")
+        napravi_dogadjaje(g, KASNJENJA_PO_GRADILISTU + 5)
+        response = self.client.get(reverse("kasnjenja"))
+        dogadjaji = list(response.context["dogadjaji"])
+        self.assertEqual(len(dogadjaji), KASNJENJA_PO_GRADILISTU)
+        self.assertEqual(dogadjaji[0].ukupno_na_gradilistu, KASNJENJA_PO_GRADILISTU + 5)
+        response = self.client.get(reverse("kasnjenja"), {"sve": 1})
+        self.assertEqual(len(response.context["dogadjaji"]), KASNJENJA_PO_GRADILISTU + 5)
+
+
+class StanjeAnotacijeTest(TestCase):
+    def setUp(self):
+        self.danas = timezone.localdate()
+        self.g = Gradiliste.objects.create(naziv="G")
+
+    def dogadjaj(self, vrsta, rok_za_dana, status="otvoreno"):
+        d = Dogadjaj.objects.create(
+            gradiliste=self.g, naziv="D", preporucena_radnja="zzi", status=status
+        )
+        Dopis.objects.create(
+            dogadjaj=d, vrsta=vrsta, poslano=self.danas - timedelta(days=20),
+            razuman_rok=self.danas + timedelta(days=rok_za_dana),
+        )
+        return d
+
+    def test_badge_dopisa(self):
+        slucajevi = [
+            (("incoming", -3), "text-bg-danger", "Kasnimo 3d"),
+            (("incoming", 2), "text-bg-warning", "Rok 2d"),
+            (("incoming", 0), "text-bg-warning", "Rok 0d"),
+            (("incoming", 3), "text-bg-success", "Ima 3d"),
+            (("outgoing", -3), "text-bg-secondary", "Kod njih je potez"),
+            (("incoming", -3, "zatvoreno"), "text-bg-secondary", "Zatvoreno"),
+        ]
+        for args, cls, label in slucajevi:
+            with self.subTest(args=args):
+                d = self.dogadjaj(*args)
+                dp = d.dopisi.s_rokom(self.danas).get()
+                self.assertEqual(dp.rok, dp.razuman_rok)
+                self.assertEqual(due_badge(dp), (cls, label))
+
+    def test_stanje_dogadjaja_filtar_i_brojanje(self):
+        kasni = self.dogadjaj("incoming", -1)
+        uskoro = self.dogadjaj("incoming", 14)
+        self.dogadjaj("incoming", 15)
+        self.dogadjaj("outgoing", -1)
+        self.dogadjaj("incoming", -1, status="zatvoreno")
+        self.dogadjaj("incoming", -1, status="odgovoreno")
+        qs = Dogadjaj.objects.filter(gradiliste=self.g)
+
+        self.assertEqual(
+            qs.broj_po_stanju(self.danas),
+            {"kasni": 1, "uskoro": 1, "ok": 2, "zatvoreno": 1, "odgovoreno": 1},
+        )
+        self.assertEqual(list(qs.s_stanjem(self.danas).filter(stanje="kasni")), [kasni])
+        self.assertEqual(qs.s_stanjem(self.danas).get(pk=uskoro.pk).do_roka, timedelta(days=14))
+
+        response = self.client.get(reverse("dogadjaj_list", args=[self.g.id]), {"stanje": "kasni"})
+        rows = response.context["rows"]
+        self.assertEqual([d for d, *_ in rows], [kasni])
+        self.assertEqual(rows[0][4], "table-danger")
+        self.assertEqual(response.context["po_stanju"]["kasni"], 1)
+
+
+class KesDogadjajListTest(TestCase):
+    def setUp(self):
+        kes.cache.clear()
+        kes.resetiraj_statistiku()
+        self.g = Gradiliste.objects.create(naziv="G")
+        napravi_dogadjaje(self.g, 5)
+        self.url = reverse("dogadjaj_list", args=[self.g.id])
+
+    def test_drugi_zahtjev_iz_kesa(self):
+        with CaptureQueriesContext(connection) as prvi_upiti:
+            prvi = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as drugi_upiti:
+            drugi = self.client.get(self.url)
+        self.assertEqual(prvi["X-Cache"], "MISS")
+        self.assertEqual(drugi["X-Cache"], "HIT")
+        self.assertEqual(prvi.content, drugi.content)
+        self.assertLess(len(drugi_upiti), len(prvi_upiti))
+        self.assertEqual(kes.statistika(), {"hit": 1, "miss": 1})
+        # drugi parametri prikaza = drugi ključ
+        self.assertEqual(self.client.get(self.url, {"sort": "broj_desc"})["X-Cache"], "MISS")
+
+    def test_promjene_invalidiraju(self):
+        d = Dogadjaj.objects.filter(gradiliste=self.g).first()
+        dp = d.dopisi.first()
+        with self.settings(MEDIA_ROOT=tempfile.mkdtemp()):
+            promjene = [
+                ("dopis", lambda: Dopis.objects.create(dogadjaj=d, vrsta="incoming")),
+                ("dopis izmjena", lambda: Dopis.objects.filter(pk=dp.pk).get().save()),
+                ("događaj", lambda: Dogadjaj.objects.create(gradiliste=self.g, naziv="Novi", preporucena_radnja="zzi")),
+                ("prilog", lambda: Prilog.objects.create(dopis=dp, file=SimpleUploadedFile("a.txt", b"a"))),
+                ("brisanje", lambda: Dopis.objects.filter(pk=dp.pk).get().delete()),
+            ]
+            for ime, promjena in promjene:
+                with self.subTest(ime):
+                    self.client.get(self.url)
+                    self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+                    promjena()
+                    self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+
+    def test_drugo_gradiliste_i_novi_dan(self):
+        drugo = Gradiliste.objects.create(naziv="Drugo")
+        self.client.get(self.url)
+        Dogadjaj.objects.create(gradiliste=drugo, naziv="D", preporucena_radnja="zzi")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+        sutra = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(kes.timezone, "localdate", return_value=sutra):
+            self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+
+    def test_statistika_bez_pisanja_po_requestu(self):
+        with mock.patch.object(kes.cache, "incr") as incr, mock.patch.object(kes.cache, "add") as add:
+            for _ in range(kes.ZAPISI_SVAKIH - 1):
+                kes.dohvati("nema")
+            self.assertEqual((incr.call_count, add.call_count), (0, 0))
+            kes.dohvati("nema")
+            self.assertEqual(add.call_count, 1)
+        self.assertEqual(kes.statistika()["miss"], 0)  # add je bio mock – u kešu nema ničega
+        kes.dohvati("nema")
+        self.assertEqual(kes.statistika(), {"hit": 0, "miss": 1})
+
+    def test_statistika_iz_procesa(self):
+        # locmem: brojke postoje samo u procesu koji poslužuje, i prije prvog paketa
+        self.client.get(self.url)
+        self.client.get(self.url)
+        url = reverse("kes_statistika")
+        self.client.force_login(User.objects.create_user("obican"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        r = self.client.get(url).json()
+        self.assertEqual((r["hit"], r["miss"], r["omjer"], r["zajednicki"]), (1, 1, 0.5, False))
+        with self.assertRaisesMessage(CommandError, "/kes/statistika/"):
+            call_command("kes_statistika", stdout=StringIO())
+
+    def test_filebased_i_statistika(self):
+        with tempfile.TemporaryDirectory() as tmp, self.settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp}
+        }):
+            self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+            self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+            out = StringIO()
+            call_command("kes_statistika", "--reset", stdout=out)
+            self.assertIn("omjer pogodaka: 50.0 %", out.getvalue())
+            self.assertEqual(kes.statistika(), {"hit": 0, "miss": 0})
+
+
+class UvjetniGetTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = napravi_dogadjaje(self.g, 3)[0]
+        self.urlovi = [
+            reverse("dogadjaj_list", args=[self.g.id]),
+            reverse("dogadjaj_detail", args=[self.g.id, self.d.id]),
+            reverse("dopisi_po_kategoriji", args=[self.g.id]),
+        ]
+
+    def test_304_jednim_upitom(self):
+        for url in self.urlovi:
+            with self.subTest(url=url):
+                prvi = self.client.get(url)
+                self.assertEqual(prvi.status_code, 200)
+                with self.assertNumQueries(1):
+                    drugi = self.client.get(url, HTTP_IF_NONE_MATCH=prvi["ETag"])
+                self.assertEqual(drugi.status_code, 304)
+                self.assertEqual(drugi.content, b"")
+                treci = self.client.get(url, HTTP_IF_MODIFIED_SINCE=prvi["Last-Modified"])
+                self.assertEqual(treci.status_code, 304)
+
+    def test_promjena_i_novi_dan_daju_200(self):
+        url = self.urlovi[0]
+        etag = self.client.get(url)["ETag"]
+        Dopis.objects.create(dogadjaj=self.d, vrsta="outgoing")
+        self.g.refresh_from_db()
+        self.assertGreater(self.g.updated_at, Dopis.objects.earliest("updated_at").updated_at)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        sutra = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(timezone, "localdate", return_value=sutra):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_nepostojece_gradiliste(self):
+        url = reverse("dogadjaj_list", args=[self.g.id + 100])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH="*").status_code, 404)
+
+
+@override_settings(PODSJETNIK_DANA=2, PODSJETNIK_PRIMATELJI=["ured@example.com"])
+class PodsjetnikTest(TestCase):
+    def setUp(self):
+        self.danas = timezone.localdate()
+        self.g = Gradiliste.objects.create(naziv="G")
+
+    def dogadjaj(self, naziv, vrsta, rok_za_dana, status="otvoreno"):
+        d = Dogadjaj.objects.create(gradiliste=self.g, naziv=naziv, preporucena_radnja="zzi", status=status)
+        Dopis.objects.create(
+            dogadjaj=d, vrsta=vrsta, poslano=self.danas - timedelta(days=20),
+            razuman_rok=self.danas + timedelta(days=rok_za_dana),
+        )
+        return d
+
+    def test_inkrementalno(self):
+        kasni = self.dogadjaj("Kasni", "incoming", -3)
+        uskoro = self.dogadjaj("Uskoro", "incoming", 2)
+        za_tri = self.dogadjaj("Za tri dana", "incoming", 3)
+        self.dogadjaj("Kod njih", "outgoing", -3)
+        self.dogadjaj("Zatvoren", "incoming", -3, status="zatvoreno")
+        self.dogadjaj("Odgovoren", "incoming", -3, status="odgovoreno")
+
+        r = pokreni_podsjetnik()
+        self.assertEqual(r.dogadjaji, [kasni, uskoro])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("[kasnimo 3d] ", mail.outbox[0].body)
+        self.assertIn("Uskoro", mail.outbox[0].body)
+
+        # ništa se nije promijenilo – bez maila i bez čitanja događaja
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(pokreni_podsjetnik().dogadjaji, [])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(sum("evidencija_dogadjaj" in q["sql"] for q in ctx.captured_queries), 1)
+
+        # novi ulazni dopis na događaju koji je bio kod njih
+        novi = Dopis.objects.create(
+            dogadjaj=za_tri, vrsta="incoming", razuman_rok=self.danas + timedelta(days=1)
+        )
+        self.assertEqual(pokreni_podsjetnik().dogadjaji, [za_tri])
+        self.assertIn(f"#{novi.pk}", mail.outbox[-1].body)
+
+        # sutra se prozor pomakne – ulazi samo rok za 3 dana
+        za_tri_2 = self.dogadjaj("Drugi za tri", "incoming", 3)
+        pokreni_podsjetnik()  # pokupi promjenu (rok još izvan prozora)
+        sutra = self.danas + timedelta(days=1)
+        self.assertEqual(pokreni_podsjetnik(today=sutra).dogadjaji, [za_tri_2])
+        # za još dva dana: prošli su rokovi za_tri (sutra) i "Uskoro" (prekosutra)
+        self.assertEqual(
+            pokreni_podsjetnik(today=self.danas + timedelta(days=3)).dogadjaji,
+            [za_tri, uskoro],
+        )
+
+    def test_dry_run_ne_mice_watermark(self):
+        self.dogadjaj("Kasni", "incoming", -1)
+        out = StringIO()
+        call_command("podsjetnik", "--dry-run", stdout=out)
+        self.assertIn("Kasni", out.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(pokreni_podsjetnik().dogadjaji), 1)
+
+    def test_slanje_izvan_transakcije_i_neuspjeh(self):
+        self.dogadjaj("Kasni", "incoming", -1)
+        dubina = []
+
+        def send_mail(*args):
+            dubina.append(len(connection.atomic_blocks))
+            raise ConnectionRefusedError
+
+        with mock.patch("evidencija.podsjetnik.send_mail", side_effect=send_mail):
+            with self.assertRaises(ConnectionRefusedError):
+                pokreni_podsjetnik()
+        # TestCase već drži svoje transakcije – slanje ne smije biti dublje od njih
+        self.assertEqual(dubina, [len(connection.atomic_blocks)])
+        # slanje puklo – watermark stoji, idući put ide isti sadržaj
+        self.assertEqual([d.naziv for d in pokreni_podsjetnik().dogadjaji], ["Kasni"])
+
+    @override_settings(PODSJETNIK_PRIMATELJI=[])
+    def test_bez_primatelja_ne_gubi_podsjetnike(self):
+        self.dogadjaj("Kasni", "incoming", -1)
+        with self.assertRaises(CommandError):
+            call_command("podsjetnik", stdout=StringIO())
+        self.assertFalse(PodsjetnikStanje.objects.exclude(zadnje_pokretanje=None).exists())
+        with self.settings(PODSJETNIK_PRIMATELJI=["ured@example.com"]):
+            self.assertEqual(len(pokreni_podsjetnik().dogadjaji), 1)
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("u", password="p")
+        cls.g = Gradiliste.objects.create(naziv="G")
+        cls.drugo = Gradiliste.objects.create(naziv="Drugo")
+        napravi_dogadjaje(cls.g, 3, dopisa_po_dogadjaju=3)
+        napravi_dogadjaje(cls.drugo, 1, dopisa_po_dogadjaju=1)
+        Dogadjaj.objects.filter(gradiliste=cls.g, broj=1).update(status="zatvoreno")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def povuci(self, url, params):
+        redovi, stranica = [], self.client.get(url, params).json()
+        while True:
+            redovi += stranica["results"]
+            if not stranica["next"]:
+                return redovi
+            stranica = self.client.get(stranica["next"]).json()
+
+    def test_prijava_obavezna(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_dopisi")).status_code, 302)
+
+    def test_sparse_fields_i_kursor(self):
+        redovi = self.povuci(reverse("api_dopisi"), {"gradiliste": self.g.id, "fields": "oznaka,dogadjaj_broj", "limit": 2})
+        self.assertEqual(len(redovi), 9)
+        self.assertEqual(set(redovi[0]), {"oznaka", "dogadjaj_broj"})
+        self.assertEqual(sorted(r["dogadjaj_broj"] for r in redovi), [1, 1, 1, 2, 2, 2, 3, 3, 3])
+        # stranica je jedan upit (uz sesiju i korisnika), neovisno o limitu
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("api_dopisi"), {"limit": 500})
+        self.assertEqual(sum("evidencija_dopis" in q["sql"] for q in ctx.captured_queries), 1)
+
+    def test_filtri(self):
+        url = reverse("api_dogadjaji")
+        self.assertEqual(len(self.povuci(url, {"gradiliste": self.g.id})), 3)
+        zatvoreni = self.povuci(url, {"status": "zatvoreno", "fields": "broj,status"})
+        self.assertEqual(zatvoreni, [{"broj": 1, "status": "zatvoreno"}])
+        dopisi = self.povuci(reverse("api_dopisi"), {"status": "zatvoreno"})
+        self.assertEqual(len(dopisi), 3)
+        self.assertEqual(len(self.povuci(reverse("api_dopisi"), {"kategorija": ""})), 10)
+        self.assertEqual(len(self.povuci(reverse("api_gradilista"), {})), 2)
+
+    def test_promijenjeno_od(self):
+        granica = timezone.now()
+        dp = Dopis.objects.filter(gradiliste=self.drugo).get()
+        dp.sadrzaj = "izmjena"
+        dp.save()
+        redovi = self.povuci(reverse("api_dopisi"), {"promijenjeno_od": granica.isoformat(), "fields": "id,sadrzaj"})
+        self.assertEqual(redovi, [{"id": dp.id, "sadrzaj": "izmjena"}])
+        # promjena dopisa osvježi i stanje događaja
+        dogadjaji = self.povuci(reverse("api_dogadjaji"), {"promijenjeno_od": granica.isoformat(), "fields": "id"})
+        self.assertEqual(dogadjaji, [{"id": dp.dogadjaj_id}])
+
+    def test_promijenjeno_od_kursor_do_kraja(self):
+        # svi u istoj milisekundi – kursor mora nositi mikrosekunde
+        kad = timezone.now().replace(microsecond=123456)
+        Dopis.objects.filter(gradiliste=self.g).update(updated_at=kad)
+        params = {"promijenjeno_od": (kad - timedelta(seconds=1)).isoformat(), "gradiliste": self.g.id, "fields": "id", "limit": 2}
+        stranica, ids = self.client.get(reverse("api_dopisi"), params).json(), []
+        for _ in range(10):
+            ids += [r["id"] for r in stranica["results"]]
+            if not stranica["next"]:
+                break
+            stranica = self.client.get(stranica["next"]).json()
+        self.assertIsNone(stranica["next"])
+        self.assertEqual(ids, sorted(Dopis.objects.filter(gradiliste=self.g).values_list("id", flat=True)))
+
+    def test_neispravni_parametri(self):
+        for params in [
+            {"fields": "id,lozinka"}, {"gradiliste": "x"}, {"promijenjeno_od": "jucer"}, {"limit": "sve"},
+            {"nakon": "nije-kursor"}, {"nakon": encode_cursor(["x"])},
+            {"promijenjeno_od": "2020-01-01", "nakon": encode_cursor(["jucer", 1])},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(reverse("api_dopisi"), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("greska", response.json())
+
+
+class PrilogSpremisteTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        postavke = self.settings(MEDIA_ROOT=self.media.name)
+        postavke.enable()
+        self.addCleanup(postavke.disable)
+        g = Gradiliste.objects.create(naziv="G")
+        d = Dogadjaj.objects.create(gradiliste=g, naziv="D", preporucena_radnja="zzi")
+        self.dopisi = [Dopis.objects.create(dogadjaj=d) for _ in range(3)]
+
+    def datoteke(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, f), self.media.name).replace(os.sep, "/")
+            for root, _, files in os.walk(self.media.name)
+            for f in files
+        )
+
+    def test_isti_sadrzaj_jednom_na_disku(self):
+        ugovor = b"%PDF ugovor" * 1000
+        prilozi = [
+            Prilog.objects.create(dopis=dp, file=SimpleUploadedFile(f"Ugovor {i}.PDF", ugovor))
+            for i, dp in enumerate(self.dopisi)
+        ]
+        blob = ime_bloba(hashlib.sha256(ugovor).hexdigest(), ".pdf")
+        self.assertEqual({p.file.name for p in prilozi}, {blob})
+        self.assertEqual([p.ime for p in prilozi], ["Ugovor 0.PDF", "Ugovor 1.PDF", "Ugovor 2.PDF"])
+        self.assertEqual(self.datoteke(), [blob])
+        self.assertEqual(Datoteka.objects.get().reference, 3)
+
+        # zamjena datoteke prebacuje referencu
+        p = Prilog.objects.get(pk=prilozi[0].pk)
+        p.file = SimpleUploadedFile("drugo.txt", b"drugo")
+        p.save()
+        self.assertEqual(Datoteka.objects.get(ime=blob).reference, 2)
+
+        # brisanje (i kaskadno kroz dopis) spušta reference, pocisti briše blob
+        Prilog.objects.filter(pk=prilozi[1].pk).delete()
+        self.dopisi[2].delete()
+        self.assertEqual(Datoteka.objects.get(ime=blob).reference, 0)
+        self.assertEqual(pocisti().obrisano, [])  # još unutar praga
+        self.assertEqual(pocisti(prag_sati=0).obrisano, [blob])
+        self.assertEqual(self.datoteke(), [p.file.name])
+        self.assertFalse(Datoteka.objects.filter(ime=blob).exists())
+
+    def test_deduplikacija_starih_priloga(self):
+        os.makedirs(os.path.join(self.media.name, "prilozi"))
+        for ime, sadrzaj in [("a.pdf", b"isto"), ("a_x1.pdf", b"isto"), ("b.txt", b"drukcije")]:
+            with open(os.path.join(self.media.name, "prilozi", ime), "wb") as f:
+                f.write(sadrzaj)
+        for dp, ime in zip(self.dopisi, ["a.pdf", "a_x1.pdf", "b.txt"]):
+            Prilog.objects.bulk_create([Prilog(dopis=dp, file=f"prilozi/{ime}")])
+
+        out = StringIO()
+        call_command("dedupliciraj_priloge", "--dry-run", stdout=out)
+        self.assertIn("Datoteka: 3, duplikata: 1", out.getvalue())
+        self.assertEqual(len(self.datoteke()), 3)
+
+        call_command("dedupliciraj_priloge", stdout=StringIO())
+        isto = ime_bloba(hashlib.sha256(b"isto").hexdigest(), ".pdf")
+        drukcije = ime_bloba(hashlib.sha256(b"drukcije").hexdigest(), ".txt")
+        self.assertEqual(self.datoteke(), sorted([isto, drukcije]))
+        self.assertEqual(
+            dict(Datoteka.objects.values_list("ime", "reference")), {isto: 2, drukcije: 1}
+        )
+        self.assertEqual(Prilog.objects.get(dopis=self.dopisi[1]).file.read(), b"isto")
+        self.assertEqual(
+            list(Prilog.objects.order_by("dopis_id").values_list("ime", flat=True)),
+            ["a.pdf", "a_x1.pdf", "b.txt"],
+        )
+
+
+class PrilogPrijenosTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        postavke = self.settings(MEDIA_ROOT=self.media.name, PRILOZI_SENDFILE="")
+        postavke.enable()
+        self.addCleanup(postavke.disable)
+        self.client.force_login(User.objects.create_user("u", password="p"))
+        self.g = Gradiliste.objects.create(naziv="G")
+        d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+        self.dp = Dopis.objects.create(dogadjaj=d)
+        self.sadrzaj = bytes(range(256)) * 10
+
+    def komad(self, url, pocetak, kraj):
+        return self.client.put(
+            url, self.sadrzaj[pocetak:kraj], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {pocetak}-{kraj - 1}/{len(self.sadrzaj)}",
+        )
+
+    def test_upload_u_komadima_s_nastavkom(self):
+        r = self.client.post(
+            reverse("prilog_upload", args=[self.g.id, self.dp.id]),
+            {"ime": "sken.pdf", "velicina": len(self.sadrzaj), "opis": "Sken"},
+        )
+        self.assertEqual(r.status_code, 201)
+        url = r.json()["url"]
+        self.assertEqual(self.komad(url, 0, 1000).json()["primljeno"], 1000)
+        # preskočen komad (npr. izgubljen odgovor) -> 409 s mjestom nastavka
+        r = self.komad(url, 2000, 2560)
+        self.assertEqual((r.status_code, r.json()["primljeno"]), (409, 1000))
+        self.assertEqual(self.client.get(url).json(), {"primljeno": 1000, "velicina": 2560})
+        self.komad(url, 1000, 2000)
+        r = self.komad(url, 2000, 2560)
+        self.assertEqual(r.status_code, 201)
+
+        prilog = Prilog.objects.get(pk=r.json()["prilog"])
+        self.assertEqual((prilog.ime, prilog.opis, prilog.dopis), ("sken.pdf", "Sken", self.dp))
+        with prilog.file.open("rb") as f:
+            self.assertEqual(f.read(), self.sadrzaj)
+        self.assertEqual(self.client.get(url).status_code, 404)  # upload je zatvoren
+
+    def test_istovremeni_zadnji_komad(self):
+        # dva PUT-a zadnjeg komada su oba prošla provjeru gotov; drugi stiže
+        # dok prvi sprema blob
+        upload = Upload.zapocni(self.dp, "sken.pdf", len(self.sadrzaj))
+        upload.dodaj(BytesIO(self.sadrzaj), 0, len(self.sadrzaj), len(self.sadrzaj))
+        drugi = Upload.ucitaj(upload.id)
+        greske = []
+        original = HashStorage._save
+
+        def _save(st, name, content):
+            if not greske:
+                greske.append(None)
+                try:
+                    drugi.zavrsi()
+                except GreskaUploada as e:
+                    greske[0] = e.status
+            return original(st, name, content)
+
+        with mock.patch.object(HashStorage, "_save", _save):
+            prilog = upload.zavrsi()
+        self.assertEqual(greske, [409])
+        self.assertEqual(list(Prilog.objects.values_list("pk", flat=True)), [prilog.pk])
+        self.assertEqual(Datoteka.objects.get(ime=prilog.file.name).reference, 1)
+        self.assertEqual(os.listdir(upload.st.path(UPLOAD_DIR)), [])
+
+    def test_preuzimanje_range_i_uvjetni_get(self):
+        prilog = Prilog.objects.create(dopis=self.dp, file=SimpleUploadedFile("plan.pdf", self.sadrzaj))
+        url = reverse("prilog_preuzmi", args=[self.g.id, prilog.pk])
+
+        r = self.client.get(url)
+        self.assertEqual((r.status_code, r["Content-Type"], r["Accept-Ranges"]), (200, "application/pdf", "bytes"))
+        self.assertIn('filename="plan.pdf"', r["Content-Disposition"])
+        self.assertEqual(b"".join(r.streaming_content), self.sadrzaj)
+        etag = r["ETag"]
+
+        r = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual((r.status_code, r["Content-Range"], r["Content-Length"]), (206, "bytes 10-19/2560", "10"))
+        self.assertEqual(b"".join(r.streaming_content), self.sadrzaj[10:20])
+        r = self.client.get(url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(r.streaming_content), self.sadrzaj[-5:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=5000-").status_code, 416)
+        # If-Range s drugom verzijom -> cijela datoteka
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"staro"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.settings(PRILOZI_SENDFILE="X-Accel-Redirect", PRILOZI_SENDFILE_PREFIKS="/zasticeno/"):
+            r = self.client.get(url)
+        self.assertEqual(r["X-Accel-Redirect"], "/zasticeno/" + prilog.file.name)
+        self.assertEqual(r.content, b"")
+
+
+class ProfilMiddlewareTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        napravi_dogadjaje(self.g, 3)
+
+    @override_settings(PROFIL_UZORAK=1)
+    def test_server_timing_i_log(self):
+        url = reverse("dogadjaj_detail", args=[self.g.id, Dogadjaj.objects.first().id])
+        with self.assertLogs("evidencija.profil", "INFO") as logovi:
+            response = self.client.get(url)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ upita, \d+ dupl\.", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        zapis = json.loads(logovi.records[0].getMessage())
+        self.assertEqual(zapis["view"], "dogadjaj_detail")
+        self.assertEqual(zapis["status"], 200)
+        self.assertGreater(zapis["upita"], 0)
+        self.assertGreater(zapis["template_ms"], 0)
+        self.assertLessEqual(len(zapis["najsporiji"]), 5)
+        self.assertEqual(
+            [q["ms"] for q in zapis["najsporiji"]], sorted((q["ms"] for q in zapis["najsporiji"]), reverse=True)
+        )
+
+    def test_duplikati(self):
+        from .profiliranje import Profil
+
+        profil = Profil()
+        with connection.execute_wrapper(profil.sql):
+            for pk in [1, 1, 1, 2]:
+                list(Dogadjaj.objects.filter(pk=pk))
+        self.assertEqual((profil.upita, profil.duplikata), (4, 2))
+        self.assertEqual(profil.slicni()[1], 4)
+
+    def test_bez_uzorka_nema_zaglavlja(self):
+        # zadano isključeno (PROFIL_UZORAK iz okoline, inače 0)
+        response = self.client.get(reverse("dogadjaj_list", args=[self.g.id]))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_template_render_omotan_samo_s_middlewareom(self):
+        from django.apps import apps
+        from django.conf import settings
+        from django.template.backends import django as django_backend
+
+        from .profiliranje import mjeri_templatee
+
+        original = django_backend.Template.render
+        self.addCleanup(setattr, django_backend.Template, "render", original)
+        django_backend.Template.render = getattr(original, "__wrapped__", original)
+        app = apps.get_app_config("evidencija")  # signals je već uvezen, ready() ih ne spaja ponovno
+        with self.settings(MIDDLEWARE=[m for m in settings.MIDDLEWARE if "Profil" not in m]):
+            app.ready()
+        self.assertFalse(getattr(django_backend.Template.render, "_profil", False))
+        mjeri_templatee()
+        omotan = django_backend.Template.render
+        mjeri_templatee()
+        self.assertIs(django_backend.Template.render, omotan)
+
+
+class SintetickiPodaciTest(TestCase):
+    SKALA = Skala(gradilista=2, dogadjaja=15, dopisa=3, biljeski=1, priloga=0.5, blobova=3)
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        postavke = self.settings(MEDIA_ROOT=self.media.name)
+        postavke.enable()
+        self.addCleanup(postavke.disable)
+
+    def snimka(self):
+        return list(
+            Dopis.objects.order_by("gradiliste__naziv", "dogadjaj__broj", "id")
+            .values_list("dogadjaj__broj", "kategorija", "oznaka", "vrsta", "poslano", "sadrzaj")
+        )
+
+    def test_isti_seed_isti_podaci(self):
+        today = timezone.localdate()
+        r = generiraj(self.SKALA, seed=7, today=today)
+        self.assertEqual((r.gradilista, r.dogadjaja), (2, 30))
+        self.assertEqual(Dopis.objects.count(), r.dopisa)
+        self.assertEqual(Prilog.objects.count(), r.priloga)
+        prvi = self.snimka()
+
+        Gradiliste.objects.all().delete()
+        generiraj(self.SKALA, seed=7, today=today)
+        self.assertEqual(self.snimka(), prvi)
+
+    def test_brojaci_stanje_i_reference(self):
+        r = generiraj(self.SKALA, seed=1)
+        g = Gradiliste.objects.order_by("id").first()
+        najveci = max(Dopis.objects.filter(gradiliste=g, kategorija="zzi").values_list("broj_int", flat=True))
+        self.assertEqual(sljedeci_broj(g.id, "zzi"), najveci + 1)
+        s_dopisima = Dogadjaj.objects.filter(dopisi__isnull=False).distinct()
+        self.assertFalse(s_dopisima.filter(last_dopis__isnull=True).exists())
+        self.assertEqual(sum(Datoteka.objects.values_list("reference", flat=True)), r.priloga)
+
+    def test_nepostojeci_autor(self):
+        with self.assertRaisesMessage(CommandError, "nema korisnika 'nitko'"):
+            call_command("generiraj_podatke", "--autor", "nitko", stdout=StringIO())
+        self.assertFalse(Gradiliste.objects.exists())
+
+
+class BenchmarkTest(TestCase):
+    def test_mjeri_scenarije(self):
+        g = Gradiliste.objects.create(naziv="G")
+        napravi_dogadjaje(g, 3)
+        self.client.force_login(User.objects.create_user("u"))
+        for ime, url in scenariji(g).items():
+            m = mjeri(self.client, url, 3)
+            self.assertGreater(m["upita"], 0, ime)
+            self.assertLessEqual(m["p50_ms"], m["p95_ms"])
+            self.assertGreater(m["memorija_kb"], 0)
+
+    def test_usporedi(self):
+        prije = {"skale": {"100": {"lista": {"p50_ms": 10, "p95_ms": 20, "upita": 5, "memorija_kb": 500}}}}
+
+        def sad(**promjene):
+            return {"skale": {"100": {"lista": {**prije["skale"]["100"]["lista"], **promjene}}}}
+
+        self.assertEqual(usporedi(sad(p95_ms=24), prije), [])  # unutar tolerancije
+        self.assertEqual(usporedi(sad(p95_ms=20.5), prije, tolerancija=0), [])  # ispod praga ms
+        self.assertEqual(len(usporedi(sad(p95_ms=30), prije)), 1)
+        self.assertEqual(usporedi(sad(upita=6), prije), ["[100] lista: upita 5 -> 6"])
+        self.assertEqual(len(usporedi(sad(memorija_kb=800), prije)), 1)
+        # nove skale/scenariji bez baselinea se ne uspoređuju
+        self.assertEqual(usporedi({"skale": {"1000": {}}}, prije), [])
+
+
+class TijekTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        postavke = self.settings(MEDIA_ROOT=self.media.name)
+        postavke.enable()
+        self.addCleanup(postavke.disable)
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+        self.autor = User.objects.create_user("ana", first_name="Ana", last_name="Anić")
+        self.url = reverse("dogadjaj_tijek", args=[self.g.id, self.d.id])
+
+    def u(self, dan, sat):
+        return timezone.make_aware(datetime(2025, 3, dan, sat))
+
+    def test_kronoloski_redoslijed(self):
+        prvi = Dopis.objects.create(dogadjaj=self.d, poslano=date(2025, 3, 1), vrsta="incoming")
+        drugi = Dopis.objects.create(dogadjaj=self.d, poslano=date(2025, 3, 3), vrsta="outgoing")
+        b1 = Biljeska.objects.create(dopis=prvi, autor=self.autor, tekst="kasnije")
+        b2 = Biljeska.objects.create(dopis=prvi, autor=self.autor, tekst="ranije")
+        p = Prilog.objects.create(dopis=drugi, file=SimpleUploadedFile("nacrt.pdf", b"%PDF"))
+        Biljeska.objects.filter(pk=b1.pk).update(created_at=self.u(4, 9))
+        Biljeska.objects.filter(pk=b2.pk).update(created_at=self.u(2, 9))
+        Prilog.objects.filter(pk=p.pk).update(uploaded_at=self.u(3, 8))
+
+        self.assertEqual(
+            [(s.vrsta, s.objekt.pk) for s in stavke_tijeka(self.d)],
+            [("dopis", prvi.pk), ("biljeska", b2.pk), ("dopis", drugi.pk), ("prilog", p.pk), ("biljeska", b1.pk)],
+        )
+        response = self.client.get(self.url)
+        self.assertContains(response, "Ana Anić")
+        self.assertContains(response, "nacrt.pdf")
+
+    def test_fiksan_broj_upita(self):
+        for i in range(20):
+            dp = Dopis.objects.create(dogadjaj=self.d, poslano=date(2025, 1, 1) + timedelta(days=i))
+            Biljeska.objects.create(dopis=dp, autor=self.autor, tekst=f"b{i}")
+            Biljeska.objects.create(dopis=dp, autor=User.objects.create_user(f"u{i}"), tekst=f"c{i}")
+        # događaj+gradilište, dopisi, bilješke s autorom, prilozi
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertContains(response, "list-group-item", count=60)
+
+
+class AdminVelikeTabliceTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = napravi_dogadjaje(self.g, 1, dopisa_po_dogadjaju=30)[0]
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+
+    def test_procijenjeni_paginator(self):
+        with mock.patch.object(ProcijenjeniPaginator, "PRAG", 10):
+            # nefiltrirano preko praga -> procjena (MAX(id) bez ANALYZE-a)
+            self.assertEqual(ProcijenjeniPaginator(Dopis.objects.all(), 5).count, Dopis.objects.latest("id").id)
+            # filtrirano preko praga -> prag
+            self.assertEqual(ProcijenjeniPaginator(Dopis.objects.filter(vrsta="incoming"), 5).count, 10)
+            self.assertEqual(ProcijenjeniPaginator(Dopis.objects.filter(pk__lte=Dopis.objects.earliest("id").id + 2), 5).count, 3)
+
+    def test_changelist_bez_n_plus_1_i_kesirani_filter(self):
+        url = reverse("admin:evidencija_dopis_changelist")
+        with CaptureQueriesContext(connection) as prvi:
+            self.assertContains(self.client.get(url), "G (30)")
+        napravi_dogadjaje(Gradiliste.objects.create(naziv="G2"), 20, dopisa_po_dogadjaju=1)
+        with CaptureQueriesContext(connection) as drugi:
+            self.client.get(url)
+        # broj upita ne raste s brojem događaja; izbori filtra (gradilišta i
+        # brojevi po gradilištu) idu iz keša
+        self.assertEqual(len(drugi), len(prvi) - 2)
+        self.assertFalse(any("GROUP BY" in q["sql"] for q in drugi.captured_queries))
+
+    def podaci_forme(self, response):
+        data = {}
+        form = response.context["adminform"].form
+        fs = response.context["inline_admin_formsets"][0].formset
+        for f in [form, *fs.forms]:
+            for ime in f.fields:
+                vrijednost = f[ime].value()
+                if vrijednost is not None:
+                    data[f.add_prefix(ime)] = vrijednost
+        data.update({
+            f"{fs.prefix}-TOTAL_FORMS": len(fs.forms),
+            f"{fs.prefix}-INITIAL_FORMS": fs.initial_form_count(),
+            f"{fs.prefix}-MIN_NUM_FORMS": 0,
+            f"{fs.prefix}-MAX_NUM_FORMS": 1000,
+        })
+        return data, fs
+
+    def test_inline_po_stranicama(self):
+        url = reverse("admin:evidencija_dogadjaj_change", args=[self.d.id])
+        response = self.client.get(url)
+        fs = response.context["inline_admin_formsets"][0].formset
+        self.assertEqual((len(fs.forms), fs.ukupno, fs.sljedeca), (25, 30, 2))
+        self.assertContains(response, "?dopisi=2")
+
+        response = self.client.get(url, {"dopisi": 2})
+        data, fs = self.podaci_forme(response)
+        self.assertEqual(len(fs.forms), 5)
+        zadnji = fs.forms[-1].instance
+        data[fs.forms[-1].add_prefix("vrsta")] = "outgoing" if zadnji.vrsta == "incoming" else "incoming"
+        response = self.client.post(f"{url}?dopisi=2", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(Dopis.objects.get(pk=zadnji.pk).vrsta, zadnji.vrsta)
+        self.assertEqual(self.d.dopisi.count(), 30)
+
+
+class SazetakGradilistaTest(TestCase):
+    def setUp(self):
+        self.g = Gradiliste.objects.create(naziv="G")
+        self.d = Dogadjaj.objects.create(gradiliste=self.g, naziv="D", preporucena_radnja="zzi")
+
+    def sazetak(self, g=None):
+        s = GradilisteSazetak.objects.get(gradiliste=g or self.g)
+        return (s.otvoreno, s.odgovoreno, s.zatvoreno, s.na_nama, s.dopisa, s.po_kategoriji)
+
+    def test_prati_promjene(self):
+        danas = timezone.localdate()
+        Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", vrsta="incoming", poslano=danas)
+        dp = Dopis.objects.create(dogadjaj=self.d, vrsta="incoming", poslano=danas)
+        self.assertEqual(self.sazetak(), (1, 0, 0, 1, 2, {"zzi": 1, "": 1}))
+
+        dp.kategorija, dp.vrsta = "obavijest", "outgoing"
+        dp.poslano = danas + timedelta(days=1)
+        dp.save()
+        self.assertEqual(self.sazetak(), (1, 0, 0, 0, 2, {"zzi": 1, "obavijest": 1}))
+
+        self.d.status = "zatvoreno"
+        self.d.save()
+        dp.delete()
+        self.assertEqual(self.sazetak(), (0, 0, 1, 0, 1, {"zzi": 1}))
+
+        # premještanje događaja prebacuje i dopise
+        g2 = Gradiliste.objects.create(naziv="G2")
+        self.d.gradiliste = g2
+        self.d.save()
+        self.assertEqual(self.sazetak(), (0, 0, 0, 0, 0, {}))
+        self.assertEqual(self.sazetak(g2), (0, 0, 1, 0, 1, {"zzi": 1}))
+
+        g2.delete()
+        self.assertFalse(GradilisteSazetak.objects.filter(gradiliste_id=g2.pk).exists())
+
+    def test_pomaci_jednaki_punom_izracunu(self):
+        danas = timezone.localdate()
+        g2 = Gradiliste.objects.create(naziv="G2")
+        d2 = Dogadjaj.objects.create(gradiliste=g2, naziv="D2", preporucena_radnja="zzi", status="odgovoreno")
+        a = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", vrsta="incoming", poslano=danas)
+        b = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", vrsta="outgoing", poslano=danas)
+        Dopis.objects.create(dogadjaj=d2, kategorija="", vrsta="incoming", poslano=danas)
+        # dopis prelazi u drugu kategoriju i na događaj drugog gradilišta
+        b.dogadjaj, b.kategorija = d2, "obavijest"
+        b.save()
+        # zastarjela instanca događaja vraća status – razlika se računa prema bazi
+        stari = Dogadjaj.objects.get(pk=self.d.pk)
+        novi = Dogadjaj.objects.get(pk=self.d.pk)
+        novi.status = "zatvoreno"
+        novi.save()
+        stari.save()
+        a.delete()
+        d2.status = "otvoreno"
+        d2.save()
+        Dogadjaj.objects.create(gradiliste=g2, naziv="D3", preporucena_radnja="zzi").delete()
+
+        pomaci = {g.pk: self.sazetak(g) for g in (self.g, g2)}
+        from .models import osvjezi_sazetke
+        osvjezi_sazetke({self.g.pk, g2.pk})
+        self.assertEqual(pomaci, {g.pk: self.sazetak(g) for g in (self.g, g2)})
+        self.assertEqual(pomaci[g2.pk], (1, 0, 0, 0, 2, {"": 1, "obavijest": 1}))
+
+    def test_spremanje_ne_ovisi_o_velicini_gradilista(self):
+        def upiti():
+            with CaptureQueriesContext(connection) as ctx:
+                Dopis.objects.create(dogadjaj=self.d, kategorija="zzi", vrsta="incoming")
+            return [q["sql"] for q in ctx.captured_queries]
+
+        upiti()  # prvi stvara brojač i mijenja lopticu
+        prije = upiti()
+        dogadjaji = Dogadjaj.objects.bulk_create_numbered(
+            Dogadjaj(gradiliste=self.g, naziv=f"D{i}", preporucena_radnja="zzi") for i in range(30)
+        )
+        Dopis.objects.bulk_create(Dopis(dogadjaj=d, gradiliste=self.g, kategorija="zzi") for d in dogadjaji for _ in range(3))
+        poslije = upiti()
+        self.assertEqual(len(prije), len(poslije))
+        # nema grupiranih upita po cijelom gradilištu
+        self.assertFalse([q for q in poslije if "GROUP BY" in q])
+
+    def test_prilog_ne_dira_sazetak(self):
+        dp = Dopis.objects.create(dogadjaj=self.d, kategorija="zzi")
+        with CaptureQueriesContext(connection) as ctx:
+            Prilog.objects.bulk_create([Prilog(dopis=dp, file="prilozi/x.pdf")])[0].save()
+        self.assertFalse([q for q in ctx.captured_queries if "gradilistesazetak" in q["sql"]])
+
+    def test_bulk_uvoz_preko_rebuild_ball_state(self):
+        g = Gradiliste.objects.create(naziv="Uvoz")
+        napravi_dogadjaje(g, 5, dopisa_po_dogadjaju=2)
+        self.assertEqual(self.sazetak(g)[:5], (5, 0, 0, 5, 10))
+
+    def test_pocetna_jednim_upitom(self):
+        Dopis.objects.create(
+            dogadjaj=self.d, kategorija="zzi", vrsta="incoming",
+            poslano=timezone.localdate() - timedelta(days=30), razuman_rok=timezone.localdate() - timedelta(days=1),
+        )
+        Gradiliste.objects.create(naziv="Bez sažetka")
+        GradilisteSazetak.objects.filter(gradiliste__naziv="Bez sažetka").delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("gradiliste_list"))
+        self.assertContains(response, "Kasnimo 1")
+        self.assertContains(response, "Na nama 1")
+        self.assertContains(response, "ZZI 1")
+        self.assertContains(response, "Bez sažetka")
+
+
+class OdziviTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.g = Gradiliste.objects.create(naziv="G")
+
+        def dogadjaj(g, *dopisi):
+            d = Dogadjaj.objects.create(gradiliste=g, naziv="D", preporucena_radnja="claim")
+            for poslano, vrsta, kategorija in dopisi:
+                Dopis.objects.create(dogadjaj=d, poslano=date.fromisoformat(poslano), vrsta=vrsta, kategorija=kategorija)
+            return d
+
+        cls.d1 = dogadjaj(
+            cls.g,
+            ("2025-01-01", "incoming", "zzi"),
+            ("2025-01-03", "incoming", "zzi"),  # isti potez – čeka se od prvog
+            ("2025-01-11", "outgoing", "dopis"),  # mi: 10 dana
+            ("2025-01-15", "incoming", "obavijest"),  # oni: 4 dana
+            ("2025-01-16", "outgoing", "dopis"),  # mi: 1 dan
+        )
+        dogadjaj(
+            cls.g,
+            ("2025-02-01", "incoming", "zzi"),
+            ("2025-02-05", "outgoing", "dopis"),  # mi: 4 dana, oni: 5 dana
+            ("2025-02-10", "incoming", "zzi"),  # bez odgovora – ne ulazi
+        )
+        cls.d3 = dogadjaj(cls.g, ("2025-03-01", "incoming", "zzi"), ("2025-03-31", "outgoing", "dopis"))
+        dogadjaj(Gradiliste.objects.create(naziv="Drugo"), ("2025-01-01", "incoming", "zzi"), ("2025-06-01", "outgoing", ""))
+
+    def red(self, redovi, grupa, smjer):
+        return next(r for r in redovi if r["grupa"] == grupa and r["smjer"] == smjer)
+
+    def test_po_kategoriji_jednim_upitom(self):
+        with self.assertNumQueries(1):
+            redovi = odziv.statistika(self.g.id)
+        zzi = self.red(redovi, "zzi", "mi")
+        self.assertEqual(
+            (zzi["naziv"], zzi["broj"], zzi["medijan"], zzi["p90"], zzi["najdulje"], zzi["prosjek"]),
+            ("ZZI", 3, 10, 30, 30, 14.7),
+        )
+        oni = self.red(redovi, "dopis", "oni")
+        self.assertEqual((oni["broj"], oni["medijan"], oni["p90"]), (2, 4, 5))
+        self.assertEqual(self.red(redovi, "obavijest", "mi")["medijan"], 1)
+        self.assertEqual(len(redovi), 3)
+
+    def test_po_mjesecu_i_razdoblje(self):
+        sijecanj = self.red(odziv.statistika(self.g.id, "mjesec"), "2025-01", "mi")
+        self.assertEqual((sijecanj["broj"], sijecanj["medijan"], sijecanj["p90"]), (2, 1, 10))
+        zzi = self.red(odziv.statistika(self.g.id, od=date(2025, 2, 1)), "zzi", "mi")
+        self.assertEqual((zzi["broj"], zzi["medijan"]), (2, 4))
+        self.assertEqual(self.red(odziv.statistika(self.g.id, "dogadjaj"), self.d1.id, "mi")["broj"], 2)
+
+    def test_najsporiji(self):
+        mi = odziv.najsporiji(self.g.id, "mi", limit=2)
+        self.assertEqual([(r["dogadjaj_id"], r["dana"]) for r in mi], [(self.d3.id, 30), (self.d1.id, 10)])
+        self.assertEqual(mi[0]["odgovor_poslano"], date(2025, 3, 31))
+
+    def test_view_i_api(self):
+        response = self.client.get(reverse("odzivi", args=[self.g.id]), {"grupiraj": "mjesec"})
+        self.assertContains(response, "2025-01")
+        self.assertEqual(self.client.get(reverse("odzivi", args=[self.g.id]), {"od": "x"}).status_code, 400)
+
+        url = reverse("api_odzivi")
+        self.assertEqual(self.client.get(url, {"gradiliste": self.g.id}).status_code, 302)  # login
+        self.client.force_login(User.objects.create_user("u"))
+        podaci = self.client.get(url, {"gradiliste": self.g.id, "najsporijih": 1}).json()
+        self.assertEqual(self.red(podaci["results"], "zzi", "mi")["p90"], 30)
+        self.assertEqual(podaci["najsporiji"]["oni"][0]["dana"], 5)
+        self.assertEqual(podaci["najsporiji"]["mi"][0]["poslano"], "2025-03-01")
+        self.assertEqual(self.client.get(url).json(), {"greska": "nedostaje gradiliste"})
+        self.assertEqual(self.client.get(url, {"gradiliste": self.g.id, "grupiraj": "x"}).status_code, 400)
@@ -0,0 +1,58 @@
+"""
+Kronološki tijek događaja: dopisi, njihove bilješke (s autorom) i prilozi
+izmiješani u jedan popis.
+
+Broj upita je fiksan (dopisi + prefetch bilješki s autorom + prefetch
+priloga), koliko god stavki bilo. Svaki popis iz baze već stiže sortiran
+(dopisi po poslano, a bilješke i prilozi svakog dopisa po vremenu), pa ih
+heapq.merge samo lijeno spaja – O(n log k), bez skupljanja svega u jednu
+listu i sortiranja.
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Any
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Biljeska, Prilog
+
+# unutar istog trenutka: dopis, pa njegovi prilozi, pa bilješke
+REDOSLIJED = {"dopis": 0, "prilog": 1, "biljeska": 2}
+
+
+@dataclass
+class Stavka:
+    kad: datetime
+    vrsta: str  # "dopis" / "prilog" / "biljeska"
+    objekt: Any
+    dopis: Any  # dopis kojem stavka pripada (za dopis – on sam)
+
+    @property
+    def kljuc(self):
+        return (self.kad, REDOSLIJED[self.vrsta], self.objekt.pk)
+
+
+def _pocetak_dana(datum):
+    # poslano je samo datum – dopis ide na početak dana, prije bilješki tog dana
+    return timezone.make_aware(datetime.combine(datum, time.min))
+
+
+def dopisi_za_tijek(dogadjaj):
+    return dogadjaj.dopisi.order_by("poslano", "id").prefetch_related(
+        Prefetch("biljeske", queryset=Biljeska.objects.select_related("autor").order_by("created_at", "id")),
+        Prefetch("prilozi", queryset=Prilog.objects.order_by("uploaded_at", "id")),
+    )
+
+
+def stavke(dogadjaj):
+    """Generator Stavki po vremenu (upiti se izvrše odmah, spajanje je lijeno)."""
+    dopisi = list(dopisi_za_tijek(dogadjaj))
+    tokovi = [(Stavka(_pocetak_dana(dp.poslano), "dopis", dp, dp) for dp in dopisi)]
+    for dp in dopisi:
+        if dp.prilozi.all():
+            tokovi.append([Stavka(p.uploaded_at, "prilog", p, dp) for p in dp.prilozi.all()])
+        if dp.biljeske.all():
+            tokovi.append([Stavka(b.created_at, "biljeska", b, dp) for b in dp.biljeske.all()])
+    return heapq.merge(*tokovi, key=lambda s: s.kljuc)
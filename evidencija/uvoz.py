@@ -0,0 +1,262 @@
+"""
+Uvoz povijesnog registra (CSV) za jedno gradilište – vidi manage.py import_register.
+
+Jedan redak = jedan dopis + broj događaja kojem pripada. Događaj se traži
+po (gradiliste, broj); ako ne postoji, stvara se iz stupaca dogadjaj_* tog
+retka (prvi redak s tim brojem). Redak bez ijednog stupca dopisa samo
+stvara događaj.
+
+CSV se čita u komadima (chunk); svaki komad se validira u Pythonu, pa ide
+bulk_create događaja i dopisa u jednoj transakciji. Neispravni redovi se
+preskaču i vraćaju u listi grešaka (broj retka, poruka).
+
+bulk_create ne okida ni Dopis.save ni signale, pa se brojevi dopisa
+dodjeljuju ovdje, u transakciji komada i istim pravilom kao Dopis.save:
+dopis s kategorijom bez broja u oznaci dobiva sljedeći broj, a upisani
+broj pomiče brojač. Stanje po zadnjem dopisu se preračuna jednom na kraju.
+"""
+import csv
+import re
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+
+from .brojaci import broj_iz_oznake, uskladi_brojac
+from .models import BrojacDopisa, Dogadjaj, Dopis, normaliziraj_oznaku, rebuild_ball_state
+
+CHUNK_SIZE = 5000
+
+# naslov stupca (casefold) -> ključ; prihvaća i zaglavlje iz exporta (export.STUPCI)
+STUPCI = {
+    "dogadjaj_broj": "dogadjaj_broj",
+    "događaj": "dogadjaj_broj",
+    "dogadjaj_naziv": "dogadjaj_naziv",
+    "naziv događaja": "dogadjaj_naziv",
+    "dogadjaj_opis": "dogadjaj_opis",
+    "dogadjaj_datum": "dogadjaj_datum",
+    "preporucena_radnja": "preporucena_radnja",
+    "kategorija": "kategorija",
+    "oznaka": "oznaka",
+    "broj": "broj",
+    "vrsta": "vrsta",
+    "poslano": "poslano",
+    "razuman_rok": "razuman_rok",
+    "razuman rok": "razuman_rok",
+    "sadrzaj": "sadrzaj",
+    "sadržaj": "sadrzaj",
+}
+STUPCI_DOPISA = ("kategorija", "oznaka", "broj", "vrsta", "poslano", "razuman_rok", "sadrzaj")
+
+
+def _choices(choices):
+    """Prihvaća i ključ i labelu (bez obzira na velika/mala slova)."""
+    mapa = {}
+    for kljuc, labela in choices:
+        mapa[kljuc.casefold()] = kljuc
+        mapa[str(labela).casefold()] = kljuc
+    return mapa
+
+
+KATEGORIJE = _choices(Dopis.KATEGORIJA_CHOICES)
+VRSTE = _choices(Dopis.VRSTA_CHOICES)
+RADNJE = _choices(Dogadjaj.RADNJA_CHOICES)
+
+_DATUM_HR_RE = re.compile(r"^(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})\.?$")
+
+
+def parse_datum(tekst):
+    """'2024-03-01', '1.3.2024' ili '1. 3. 2024.' -> date; prazno -> None."""
+    tekst = (tekst or "").strip()
+    if not tekst:
+        return None
+    m = _DATUM_HR_RE.match(tekst)
+    if m:
+        d, mj, g = map(int, m.groups())
+        return date(g, mj, d)
+    return datetime.strptime(tekst[:10], "%Y-%m-%d").date()
+
+
+class GreskaRetka(ValueError):
+    pass
+
+
+@dataclass
+class Rezultat:
+    redova: int = 0
+    dogadjaja: int = 0
+    dopisa: int = 0
+    greske: list = field(default_factory=list)  # [(broj retka, poruka)]
+
+
+class Uvoz:
+    def __init__(self, gradiliste, chunk_size=CHUNK_SIZE):
+        self.gradiliste = gradiliste
+        self.chunk_size = chunk_size
+        self.rezultat = Rezultat()
+        # stanje iz baze, učitano jednom pa održavano kroz uvoz
+        self.dogadjaji = dict(
+            Dogadjaj.objects.filter(gradiliste=gradiliste).values_list("broj", "id")
+        )
+        self.oznake = set(
+            Dopis.objects.filter(gradiliste=gradiliste, oznaka_norm__isnull=False)
+            .values_list("kategorija", "oznaka_norm")
+        )
+
+    # --- validacija ---
+
+    def _dopis(self, red):
+        kategorija = (red.get("kategorija") or "").strip()
+        if kategorija:
+            if kategorija.casefold() not in KATEGORIJE:
+                raise GreskaRetka(f"nepoznata kategorija '{kategorija}'")
+            kategorija = KATEGORIJE[kategorija.casefold()]
+
+        vrsta = (red.get("vrsta") or "").strip()
+        if vrsta and vrsta.casefold() not in VRSTE:
+            raise GreskaRetka(f"nepoznata vrsta '{vrsta}'")
+        vrsta = VRSTE.get(vrsta.casefold(), "incoming")
+
+        try:
+            poslano = parse_datum(red.get("poslano"))
+            razuman_rok = parse_datum(red.get("razuman_rok"))
+        except ValueError as e:
+            raise GreskaRetka(f"neispravan datum ({e})")
+        if poslano is None:
+            raise GreskaRetka("nedostaje datum 'poslano'")
+
+        oznaka = (red.get("oznaka") or "").strip()
+        broj = (red.get("broj") or "").strip()
+        oznaka_norm = normaliziraj_oznaku(kategorija, oznaka)
+        if oznaka_norm is not None and (kategorija, oznaka_norm) in self.oznake:
+            raise GreskaRetka(f"oznaka '{oznaka}' već postoji za kategoriju {kategorija}")
+
+        return Dopis(
+            gradiliste=self.gradiliste,
+            kategorija=kategorija,
+            oznaka=oznaka,
+            oznaka_norm=oznaka_norm,
+            broj=broj,
+            broj_int=(broj_iz_oznake(oznaka) or broj_iz_oznake(broj)) if kategorija else None,
+            vrsta=vrsta,
+            poslano=poslano,
+            # kao rok_dopisa: bez roka -> poslano + 7 dana
+            razuman_rok=razuman_rok or poslano + timedelta(days=7),
+            sadrzaj=red.get("sadrzaj") or "",
+        )
+
+    def _dogadjaj(self, red, novi):
+        """(broj, novi Dogadjaj ili None ako već postoji)."""
+        try:
+            broj = int((red.get("dogadjaj_broj") or "").strip())
+        except ValueError:
+            broj = 0
+        if broj < 1:
+            raise GreskaRetka("nedostaje ili neispravan broj događaja")
+        if broj in self.dogadjaji or broj in novi:
+            return broj, None
+
+        naziv = (red.get("dogadjaj_naziv") or "").strip()
+        if not naziv:
+            raise GreskaRetka(f"događaj {broj} ne postoji, a redak nema naziv događaja")
+        radnja = (red.get("preporucena_radnja") or "").strip()
+        if radnja and radnja.casefold() not in RADNJE:
+            raise GreskaRetka(f"nepoznata preporučena radnja '{radnja}'")
+        try:
+            datum = parse_datum(red.get("dogadjaj_datum"))
+        except ValueError as e:
+            raise GreskaRetka(f"neispravan datum događaja ({e})")
+
+        return broj, Dogadjaj(
+            gradiliste=self.gradiliste,
+            broj=broj,
+            naziv=naziv,
+            opis=red.get("dogadjaj_opis") or "",
+            preporucena_radnja=RADNJE.get(radnja.casefold(), "other"),
+            **({"datum": datum} if datum else {}),
+        )
+
+    # --- uvoz ---
+
+    def _komad(self, redovi):
+        novi, dopisi = {}, []
+        for broj_retka, red in redovi:
+            self.rezultat.redova += 1
+            try:
+                broj, dogadjaj = self._dogadjaj(red, novi)
+                dp = None
+                if any((red.get(s) or "").strip() for s in STUPCI_DOPISA):
+                    dp = self._dopis(red)
+            except GreskaRetka as e:
+                self.rezultat.greske.append((broj_retka, str(e)))
+                continue
+            # tek kad je cijeli redak ispravan
+            if dogadjaj is not None:
+                novi[broj] = dogadjaj
+            if dp is not None:
+                if dp.oznaka_norm is not None:
+                    self.oznake.add((dp.kategorija, dp.oznaka_norm))
+                dopisi.append((broj, dp))
+
+        with transaction.atomic():
+            if novi:
+                Dogadjaj.objects.bulk_create_numbered(novi.values(), batch_size=500)
+                self.dogadjaji.update((broj, d.id) for broj, d in novi.items())
+                self.rezultat.dogadjaja += len(novi)
+            for broj, dp in dopisi:
+                dp.dogadjaj_id = self.dogadjaji[broj]
+            self._numeriraj([dp for _, dp in dopisi])
+            Dopis.objects.bulk_create([dp for _, dp in dopisi], batch_size=500)
+            self.rezultat.dopisa += len(dopisi)
+
+    def _numeriraj(self, dopisi):
+        """
+        broj_int redom kao da je svaki dopis spremljen kroz Dopis.save; brojač
+        se čita i pomiče u transakciji komada (isti lock kao rezerviraj_broj).
+        """
+        zadnji = dict(
+            BrojacDopisa.objects.filter(gradiliste=self.gradiliste).values_list("kategorija", "zadnji")
+        )
+        pomaknuti = set()
+        for dp in dopisi:
+            if not dp.kategorija:
+                continue
+            if dp.broj_int is None:
+                dp.broj_int = zadnji.get(dp.kategorija, 0) + 1
+            zadnji[dp.kategorija] = max(zadnji.get(dp.kategorija, 0), dp.broj_int)
+            pomaknuti.add(dp.kategorija)
+        for kategorija in pomaknuti:
+            uskladi_brojac(self.gradiliste.id, kategorija, zadnji[kategorija])
+
+    def _zavrsi(self):
+        """Stanje po zadnjem dopisu (i sažetak gradilišta), jednom za cijeli uvoz."""
+        rebuild_ball_state(Dogadjaj.objects.filter(gradiliste=self.gradiliste))
+
+    def pokreni(self, datoteka, delimiter=None, dry_run=False):
+        """`datoteka` je otvoreni tekstualni fajl. Vraća Rezultat."""
+        if delimiter is None:
+            prvi = datoteka.readline()
+            delimiter = ";" if prvi.count(";") > prvi.count(",") else ","
+            datoteka.seek(0)
+        reader = csv.DictReader(datoteka, delimiter=delimiter)
+        nepoznati = [s for s in reader.fieldnames or [] if s.strip().casefold() not in STUPCI]
+        if nepoznati:
+            raise ValueError(f"Nepoznati stupci: {', '.join(nepoznati)}")
+        kljucevi = {s: STUPCI[s.strip().casefold()] for s in reader.fieldnames}
+
+        # redak 1 je zaglavlje; line_num prati i višeredne ćelije
+        redovi = (
+            (reader.line_num, {kljucevi[k]: v for k, v in red.items() if k in kljucevi})
+            for red in reader
+        )
+        # svaki komad je svoja transakcija; dry-run sve omota u jednu
+        # pa je na kraju poništi (validira se i ono što provjerava baza)
+        with transaction.atomic() if dry_run else nullcontext():
+            while komad := list(islice(redovi, self.chunk_size)):
+                self._komad(komad)
+            self._zavrsi()
+            if dry_run:
+                transaction.set_rollback(True)
+        return self.rezultat
@@ -1,60 +1,161 @@
-import re
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET
+import mimetypes
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST, require_safe
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.urls import reverse
 from django.utils import timezone
 from django.http import HttpRequest
-from .models import Gradiliste, Dogadjaj, Dopis
+from . import api, export, kes, odziv, prilozi, tijek
+from .models import Gradiliste, Dogadjaj, Dopis, Prilog
 from .forms import DogadjajForm, DopisForm, GradilisteForm
+from .brojaci import sljedeci_broj
+from .pagination import KeysetPage, keyset_page
+from .pretraga import podrzano as pretraga_podrzana, trazi
 from datetime import date, datetime, timedelta
-from django.db.models import Min, Max, Prefetch
+from django.db.models import Case, Count, F, Max, Min, OuterRef, Prefetch, Subquery, Sum, When, Window
+from django.db.models.functions import Coalesce, RowNumber
 from django.utils import timezone
 
 
-def due_badge(dp, ball_on_us: bool, dogadjaj_status: str):
+# rok_stanje (DopisQuerySet.s_rokom) -> (klasa badgea, tekst)
+ROK_BADGE = {
+    "zatvoreno": ("text-bg-secondary", "Zatvoreno"),
+    "kod_njih": ("text-bg-secondary", "Kod njih je potez"),
+    "bez_roka": ("text-bg-secondary", "Bez roka"),
+    "kasni": ("text-bg-danger", "Kasnimo {dana}d"),
+    "uskoro": ("text-bg-warning", "Rok {dana}d"),
+    "ok": ("text-bg-success", "Ima {dana}d"),
+}
+
+# stanje (DogadjajQuerySet.s_stanjem) -> klasa reda događaja
+DOGADJAJ_KLASA = {
+    "zatvoreno": "table-success",
+    "odgovoreno": "",
+    "kasni": "table-danger",  # rok prošao
+    "uskoro": "table-warning",  # ≤ 14 dana do roka
+    "ok": "",
+}
+
+
+def due_badge(dp):
     """
-    Vraća (cls, label) za badge u tablici dopisa.
-    Bojanje je relevantno samo ako je loptica na nama (zadnji dopis ulazni),
-    i ako događaj nije zatvoren.
+    Vraća (cls, label) za badge u tablici dopisa – iz anotacija s_rokom()
+    (bojanje je relevantno samo ako je loptica kod nas i događaj nije zatvoren).
     """
-    # Ako je događaj zatvoren, ništa ne forsiramo
-    if dogadjaj_status == "zatvoreno":
-        return ("text-bg-secondary", "Zatvoreno")
+    cls, label = ROK_BADGE[dp.rok_stanje]
+    dana = abs(dp.do_roka.days) if dp.do_roka is not None else None
+    return cls, label.format(dana=dana)
 
-    # Ako loptica nije na nama, rok nije hitan
-    if not ball_on_us:
-        return ("text-bg-secondary", "Kod njih je potez")
 
-    today = timezone.localdate()
+# --- uvjetni GET (304) za stranice gradilišta ---
+# Sve što se na njima vidi mijenja se kroz oznaci_promjenu (verzija +
+# updated_at gradilišta), a rokovi/badgeovi još i s datumom. Zato je za
+# odluku dovoljan jedan upit po PK-u gradilišta, bez ijednog reda.
 
-    # Ako dopis ima razuman_rok, koristi njega
-    if dp.razuman_rok:
-        due = dp.razuman_rok
-    else:
-        # fallback: 7 dana od 'poslano' ako postoji
-        if dp.poslano:
-            due = dp.poslano + timedelta(days=7)
-        else:
-            return ("text-bg-secondary", "Bez roka")
+def _promjena_gradilista(request, gradiliste_id, **kwargs):
+    """(verzija, updated_at) gradilišta – jedan upit po requestu (ETag i Last-Modified)."""
+    if not hasattr(request, "_promjena_gradilista"):
+        request._promjena_gradilista = (
+            Gradiliste.objects.filter(pk=gradiliste_id)
+            .values_list("verzija", "updated_at")
+            .first()
+        )
+    return request._promjena_gradilista
+
+
+def _etag_gradilista(request, gradiliste_id, **kwargs):
+    promjena = _promjena_gradilista(request, gradiliste_id)
+    if promjena is None:  # nema gradilišta – view vraća 404
+        return None
+    verzija, updated_at = promjena
+    return f'"{gradiliste_id}-{verzija}-{updated_at.timestamp():.6f}-{timezone.localdate()}"'
+
+
+def _zadnja_promjena_gradilista(request, gradiliste_id, **kwargs):
+    promjena = _promjena_gradilista(request, gradiliste_id)
+    if promjena is None:
+        return None
+    # u ponoć se mijenjaju rokovi, pa stranica nije starija od početka dana
+    ponoc = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+    return max(promjena[1], ponoc)
 
-    days_left = (due - today).days
 
-    if days_left < 0:
-        return ("text-bg-danger", f"Kasnimo {abs(days_left)}d")
-    if days_left <= 2:
-        return ("text-bg-warning", f"Rok {days_left}d")
-    return ("text-bg-success", f"Ima {days_left}d")
+uvjetni_get = condition(etag_func=_etag_gradilista, last_modified_func=_zadnja_promjena_gradilista)
 
 
 def gradiliste_list(request):
-    gradilista = Gradiliste.objects.all()
+    """
+    Gradilišta s brojevima iz GradilisteSazetak (održavaju ga spremanja, vidi pomakni_sazetak).
+    Jedan upit: kašnjenja ovise o današnjem datumu pa se broje podupitom po
+    događajima (dogadjaj_rok_idx) – tablica dopisa se ne čita.
+    """
+    today = timezone.localdate()
+    kasni = (
+        Dogadjaj.objects.filter(
+            gradiliste=OuterRef("pk"), status="otvoreno", last_vrsta="incoming", effective_due__lt=today
+        )
+        .order_by().values("gradiliste").annotate(n=Count("id")).values("n")
+    )
+    gradilista = Gradiliste.objects.select_related("sazetak").annotate(kasni=Coalesce(Subquery(kasni), 0))
     return render(
         request, "evidencija/gradiliste_list.html", {"gradilista": gradilista}
     )
 
 
+KASNJENJA_PO_GRADILISTU = 25
+
+
+def kasnjenja(request):
+    """
+    Pregled za sva gradilišta: otvoreni događaji gdje je zadnji dopis ulazni
+    (loptica kod nas), po gradilištu, najveće kašnjenje prvo.
+
+    Jedan upit: zadnji dopis po događaju je već zapisan na događaju
+    (last_vrsta, effective_due – održava ga signals.py), kašnjenje i stanje su
+    anotacije iz DogadjajQuerySet.s_stanjem, a brojevi po gradilištu su window funkcije (bez GROUP BY
+    upita po gradilištu).
+    """
+    today = timezone.localdate()
+    po_gradilistu = {"partition_by": F("gradiliste_id")}
+    dogadjaji = (
+        # samo "otvoreno" – isto pravilo kao brojač na gradiliste_list
+        Dogadjaj.objects.filter(last_vrsta="incoming", gradiliste__isnull=False, status="otvoreno")
+        .select_related("gradiliste", "last_dopis")
+        .only(
+            "broj", "naziv", "gradiliste__naziv", "last_poslano", "effective_due",
+            "last_dopis__oznaka", "last_dopis__broj",
+        )
+        .s_stanjem(today)
+        .annotate(
+            ukupno_na_gradilistu=Window(Count("id"), **po_gradilistu),
+            kasni_na_gradilistu=Window(
+                Sum(Case(When(stanje="kasni", then=1), default=0)), **po_gradilistu
+            ),
+            redni=Window(RowNumber(), order_by=("effective_due", "id"), **po_gradilistu),
+        )
+        .order_by("gradiliste__naziv", "gradiliste_id", "effective_due", "id")
+    )
+    # po gradilištu samo najhitnijih N (ostatak je u dogadjaj_list?sort=hitnost);
+    # filtar na window se radi izvan podupita, pa brojevi iznad ostaju ukupni
+    sve = bool(request.GET.get("sve"))
+    if not sve:
+        dogadjaji = dogadjaji.filter(redni__lte=KASNJENJA_PO_GRADILISTU)
+    return render(
+        request,
+        "evidencija/kasnjenja.html",
+        {"dogadjaji": dogadjaji, "today": today, "sve": sve, "po_gradilistu": KASNJENJA_PO_GRADILISTU},
+    )
+
+
 def gradiliste_create(request):
     if request.method == "POST":
         form = GradilisteForm(request.POST)
@@ -71,6 +172,7 @@ def gradiliste_create(request):
 from datetime import datetime  # ako već nije uvezeno
 
 
+@uvjetni_get
 def dogadjaj_list(request, gradiliste_id):
     g = get_object_or_404(Gradiliste, pk=gradiliste_id)
 
@@ -79,94 +181,134 @@ def dogadjaj_list(request, gradiliste_id):
     d_sort = request.GET.get("d_sort", "poslano_asc")  # za dopise
 
     # mapiranja tipki -> order_by klauzule
+    # (tie-breaker "id" ide u istom smjeru kao glavni ključ, da poredak može
+    # čitati ravno iz indeksa – vidi Meta.indexes u models.py)
     SORT_MAP = {
         "broj_asc": ("broj", "id"),
-        "broj_desc": ("-broj", "id"),
+        "broj_desc": ("-broj", "-id"),
         "datum_asc": ("datum", "id"),
-        "datum_desc": ("-datum", "id"),
+        "datum_desc": ("-datum", "-id"),
+        # najhitnije prvo: loptica kod nas, pa po roku (čita stupce iz Dogadjaj)
+        "hitnost": (
+            F("last_vrsta").asc(nulls_last=True),
+            "effective_due",  # NULL je samo kad nema dopisa (a tada je i last_vrsta NULL)
+            "id",
+        ),
     }
     D_SORT_MAP = {
         "broj_asc": ("broj", "id"),
-        "broj_desc": ("-broj", "id"),
+        "broj_desc": ("-broj", "-id"),
         "poslano_asc": ("poslano", "id"),
-        "poslano_desc": ("-poslano", "id"),
+        "poslano_desc": ("-poslano", "-id"),
         "rok_asc": ("razuman_rok", "id"),
-        "rok_desc": ("-razuman_rok", "id"),
+        "rok_desc": ("-razuman_rok", "-id"),
     }
 
     order = SORT_MAP.get(sort, ("broj", "id"))
     dopisi_order = D_SORT_MAP.get(d_sort, ("poslano", "id"))
 
-    # --- dohvati događaje s traženim sortiranjem ---
-    dogadjaji = Dogadjaj.objects.filter(gradiliste=g).order_by(*order)
-
-    rows = []
-    for d in dogadjaji:
-        # zadnji dopis i tko je na potezu
-        last = d.dopisi.order_by("-poslano", "-id").first()
-        ball_on_us = bool(last and getattr(last, "vrsta", None) == "incoming")
-        d_status = getattr(d, "status", "open")
-
-        # dopisi u traženom poretku
-        dopisi = []
-        for dp in d.dopisi.all().order_by(*dopisi_order):
-            cls, label = due_badge(dp, ball_on_us, d_status)
-            dopisi.append((dp, cls, label))
-
-        # BOJANJE GLAVNOG REDA DOGAĐAJA — SAMO PO ZADNJEM DOPISU
-        event_cls = ""
-
-        # 1) Ako je događaj zatvoren -> zeleno
-        if d_status in "zatvoreno":
-            event_cls = "table-success"
-
-        # 2) Ako je odgovoreno -> bez boje
-        elif d_status == "odgovoreno":
-            event_cls = ""
-
-        # 3) Inače (otvoreno) bojamo po zadnjem dopisu
-        else:
-            if last and getattr(last, "vrsta", None) == "incoming":
-                due = getattr(last, "razuman_rok", None)
-                if not due and getattr(last, "poslano", None):
-                    due = last.poslano + timedelta(days=7)
-
-                if due:
-                    days = (due - timezone.localdate()).days
-                    if days < 0:
-                        event_cls = "table-danger"  # rok prošao
-                    elif days <= 14:
-                        event_cls = "table-warning"  # ≤ 14 dana do roka
-
-        rows.append((d, dopisi, ball_on_us, last, event_cls))
-
-    return render(
+    # filtar po stanju (npr. samo crveni) – računa se u bazi (s_stanjem)
+    stanje = request.GET.get("stanje", "")
+    if stanje not in DOGADJAJ_KLASA:
+        stanje = ""
+    today = timezone.localdate()
+    after, before = request.GET.get("nakon"), request.GET.get("prije")
+
+    # redovi tablice (i brojevi po stanju) iz keša – ključ sadrži verziju
+    # gradilišta, pa svaka promjena događaja/dopisa/priloga daje novi ključ
+    kljuc = kes.kljuc(g, sort, d_sort, stanje, after, before)
+    spremljeno = kes.dohvati(kljuc)
+    context = {}
+    if spremljeno is None:
+        stranica, rows = _redovi_dogadjaja(g, order, dopisi_order, stanje, today, after, before)
+        spremljeno = {
+            "redovi": render_to_string(
+                "evidencija/_dogadjaj_redovi.html", {"gradiliste": g, "rows": rows}
+            ),
+            # bez objekata – samo kursori za navigaciju
+            "stranica": KeysetPage([], stranica.next_cursor, stranica.prev_cursor),
+            "po_stanju": Dogadjaj.objects.filter(gradiliste=g).broj_po_stanju(today),
+        }
+        kes.spremi(kljuc, spremljeno)
+        context["rows"] = rows
+
+    response = render(
         request,
         "evidencija/dogadjaj_list.html",
         {
+            **context,
             "gradiliste": g,
-            "rows": rows,
-            "today": timezone.localdate(),
+            "redovi": mark_safe(spremljeno["redovi"]),
+            "stranica": spremljeno["stranica"],
+            "today": today,
             "sort": sort,
             "d_sort": d_sort,
+            "stanje": stanje,
+            "po_stanju": spremljeno["po_stanju"],
         },
     )
+    response["X-Cache"] = "MISS" if "rows" in context else "HIT"
+    return response
+
+
+def _redovi_dogadjaja(g, order, dopisi_order, stanje, today, after, before):
+    """Stranica događaja gradilišta + redovi za tablicu (d, dopisi, ball_on_us, last, event_cls)."""
+    # --- dohvati događaje s traženim sortiranjem ---
+    # zadnji dopis je zapisan na događaju (last_*), a svi dopisi dolaze jednim
+    # prefetchom, pa broj upita ne ovisi o broju događaja
+    dogadjaji = (
+        Dogadjaj.objects.filter(gradiliste=g)
+        .s_stanjem(today)
+        .prefetch_related(
+            Prefetch(
+                "dopisi",
+                # dogadjaj_id naprijed (u smjeru sorta): IN (...) se tada čita
+                # ravno iz (dogadjaj, ...) indeksa
+                queryset=Dopis.objects.s_rokom(today).order_by(
+                    "-dogadjaj_id" if dopisi_order[0].startswith("-") else "dogadjaj_id",
+                    *dopisi_order,
+                ),
+                to_attr="dopisi_sortirani",
+            )
+        )
+    )
+    if stanje:
+        dogadjaji = dogadjaji.filter(stanje=stanje)
+    # keyset paginacija po istom poretku (SORT_MAP), prefetch samo za stranicu
+    stranica = keyset_page(dogadjaji, order, after=after, before=before)
+
+    rows = []
+    for d in stranica:
+        # zadnji dopis i tko je na potezu (bez dodatnog upita – već je u prefetchu)
+        last = next(
+            (dp for dp in d.dopisi_sortirani if dp.id == d.last_dopis_id), None
+        )
+        ball_on_us = d.ball_on_us
+
+        # dopisi u traženom poretku, badge iz anotacija
+        dopisi = [(dp, *due_badge(dp)) for dp in d.dopisi_sortirani]
+
+        # BOJANJE GLAVNOG REDA DOGAĐAJA — po statusu i zadnjem dopisu (s_stanjem)
+        event_cls = DOGADJAJ_KLASA[d.stanje]
+
+        rows.append((d, dopisi, ball_on_us, last, event_cls))
+    return stranica, rows
 
 
+@uvjetni_get
 def dogadjaj_detail(request, gradiliste_id, pk):
     d = get_object_or_404(Dogadjaj, pk=pk, gradiliste_id=gradiliste_id)
-    d_status = getattr(d, "status", None)
 
-    # zadnji dopis i tko je na potezu
-    last = d.dopisi.order_by("-poslano", "-id").first()
-    ball_on_us = bool(last and last.get_vrsta_display() == "Ulazno")
-
-    d_status = getattr(d, "status", None)
+    # tko je na potezu – zapisano na događaju po zadnjem dopisu
+    ball_on_us = d.ball_on_us
 
     rows = []
-    for dp in d.dopisi.all().order_by("poslano", "id"):  # prilagodi ordering po želji
-        cls, label = due_badge(dp, ball_on_us, d_status)  # <-- pass status
+    last = None
+    for dp in d.dopisi.s_rokom().order_by("poslano", "id"):  # prilagodi ordering po želji
+        cls, label = due_badge(dp)
         rows.append((dp, cls, label))
+        if dp.id == d.last_dopis_id:
+            last = dp
 
     return render(
         request,
@@ -181,6 +323,16 @@ def dogadjaj_detail(request, gradiliste_id, pk):
     )
 
 
+def dogadjaj_tijek(request, gradiliste_id, pk):
+    """Dopisi, bilješke i prilozi događaja kronološki (vidi tijek.py)."""
+    d = get_object_or_404(Dogadjaj.objects.select_related("gradiliste"), pk=pk, gradiliste_id=gradiliste_id)
+    return render(
+        request,
+        "evidencija/dogadjaj_tijek.html",
+        {"dogadjaj": d, "gradiliste": d.gradiliste, "stavke": tijek.stavke(d)},
+    )
+
+
 # ---------- FORME (bez admina) ----------
 def dogadjaj_create(request, gradiliste_id):
     gradiliste = get_object_or_404(Gradiliste, pk=gradiliste_id)
@@ -252,7 +404,7 @@ def dopis_update(request, gradiliste_id, pk):
     gradiliste = get_object_or_404(Gradiliste, pk=gradiliste_id)
     dopis = get_object_or_404(Dopis, pk=pk)
     # sigurnosna provjera da dopis pripada gradilištu:
-    if dopis.dogadjaj.gradiliste_id != gradiliste.id:
+    if dopis.gradiliste_id != gradiliste.id:
         return redirect("dogadjaj_list", gradiliste_id=gradiliste.id)
     if request.method == "POST":
         form = DopisForm(request.POST, instance=dopis)
@@ -268,6 +420,42 @@ def dopis_update(request, gradiliste_id, pk):
     )
 
 
+# (tie-breaker u istom smjeru kao glavni ključ – čita se ravno iz indeksa)
+DOPISI_ORDERING_MAP = {
+    "poslano_desc": ("-poslano", "-id"),
+    "poslano_asc": ("poslano", "id"),
+    "rok_asc": ("razuman_rok", "id"),
+    "rok_desc": ("-razuman_rok", "-id"),
+    "broj_asc": ("broj", "id"),
+    "broj_desc": ("-broj", "-id"),
+    # po događaju, a unutar događaja kronološki
+    "dogadjaj_asc": ("dogadjaj__broj", "poslano", "id"),
+    "dogadjaj_desc": ("-dogadjaj__broj", "-poslano", "-id"),
+}
+
+
+def _dopisi_gradilista(gradiliste, kategorija, sort):
+    """
+    Dopisi gradilišta filtrirani po kategoriji + poredak za sort –
+    isto za dopisi_po_kategoriji i export, da export odgovara ekranu.
+    """
+    ordering = DOPISI_ORDERING_MAP.get(sort, ("poslano", "id"))
+
+    dopisi = Dopis.objects.all()
+    if sort.startswith("dogadjaj_"):
+        # filtar na događaju, da SQLite ide redom po događajima
+        # (uniq_broj_per_gradiliste) pa po dopisima (dopis_dog_poslano_idx)
+        # umjesto da sortira cijelo gradilište u privremenom stablu
+        dopisi = dopisi.filter(dogadjaj__gradiliste=gradiliste)
+    else:
+        dopisi = dopisi.filter(gradiliste=gradiliste)
+
+    if kategorija:
+        dopisi = dopisi.filter(kategorija=kategorija)
+    return dopisi, ordering
+
+
+@uvjetni_get
 def dopisi_po_kategoriji(request, gradiliste_id: int):
     """
     Izvlači dopise iz svih događaja za JEDNO gradilište (po ID-u),
@@ -276,28 +464,16 @@ def dopisi_po_kategoriji(request, gradiliste_id: int):
     gradiliste = get_object_or_404(Gradiliste, id=gradiliste_id)
 
     kategorija = (request.GET.get("kategorija") or "").strip()
-
-    dopisi = Dopis.objects.select_related("dogadjaj", "dogadjaj__gradiliste").filter(
-        dogadjaj__gradiliste=gradiliste
-    )
-
-    if kategorija:
-        dopisi = dopisi.filter(kategorija=kategorija)
-
-    # sortiranje
     sort = request.GET.get("sort", "poslano_asc")
-    ordering_map = {
-        "poslano_desc": "-poslano",
-        "poslano_asc": "poslano",
-        "rok_asc": "razuman_rok",
-        "rok_desc": "-razuman_rok",
-        "broj_asc": "broj",
-        "broj_desc": "-broj",
-        "dogadjaj_asc": "dogadjaj__broj",
-        "dogadjaj_desc": "-dogadjaj__broj",
-    }
-    ordering = ordering_map.get(sort, "poslano")
-    dopisi = dopisi.order_by(ordering, "-created_at")
+    dopisi, ordering = _dopisi_gradilista(gradiliste, kategorija, sort)
+    dopisi = dopisi.select_related("dogadjaj", "dogadjaj__gradiliste")
+
+    stranica = keyset_page(
+        dopisi,
+        ordering,
+        after=request.GET.get("nakon"),
+        before=request.GET.get("prije"),
+    )
 
     # dropdown za vrste (uzima choices iz modela)
     kategorija_field = Dopis._meta.get_field("kategorija")
@@ -308,7 +484,8 @@ def dopisi_po_kategoriji(request, gradiliste_id: int):
         "evidencija/dopisi_po_kategoriji.html",
         {
             "gradiliste": gradiliste,
-            "dopisi": dopisi,
+            "dopisi": stranica,
+            "stranica": stranica,
             "kategorija": kategorija,
             "kategorija_choices": kategorija_choices,
             "sort": sort,
@@ -316,6 +493,66 @@ def dopisi_po_kategoriji(request, gradiliste_id: int):
     )
 
 
+def dopisi_export(request, gradiliste_id: int):
+    """
+    Cijeli registar dopisa gradilišta (isti filtar i sort kao dopisi_po_kategoriji)
+    kao CSV ili XLSX (?format=xlsx), streamano red po red.
+    """
+    gradiliste = get_object_or_404(Gradiliste, id=gradiliste_id)
+
+    kategorija = (request.GET.get("kategorija") or "").strip()
+    # ide u ime datoteke (zaglavlje) – samo poznate kategorije
+    if kategorija not in dict(Dopis.KATEGORIJA_CHOICES):
+        return HttpResponse(f"nepoznata kategorija '{kategorija}'", status=400)
+    sort = request.GET.get("sort", "poslano_asc")
+    dopisi, ordering = _dopisi_gradilista(gradiliste, kategorija, sort)
+    rows = export.redovi(dopisi, ordering)
+
+    ime = f"dopisi-{gradiliste.id}{'-' + kategorija if kategorija else ''}-{timezone.localdate():%Y%m%d}"
+    if request.GET.get("format") == "xlsx":
+        response = StreamingHttpResponse(
+            export.xlsx_dijelovi(rows),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        ime += ".xlsx"
+    else:
+        response = StreamingHttpResponse(
+            export.csv_dijelovi(rows), content_type="text/csv; charset=utf-8"
+        )
+        ime += ".csv"
+    response["Content-Disposition"] = content_disposition_header(True, ime)
+    return response
+
+
+def pretraga(request, gradiliste_id: int):
+    """
+    Pretraga teksta dopisa i događaja jednog gradilišta (FTS5, vidi pretraga.py),
+    rangirano po bm25, s isječcima gdje su pogoci označeni.
+    """
+    gradiliste = get_object_or_404(Gradiliste, id=gradiliste_id)
+    q = (request.GET.get("q") or "").strip()
+
+    pogoci = trazi(gradiliste.id, q) if q and pretraga_podrzana() else []
+
+    # objekti za pogotke – dva upita, poredak ostaje po rangu
+    dopisi = Dopis.objects.select_related("dogadjaj").in_bulk(
+        [p["id"] for p in pogoci if p["tip"] == "dopis"]
+    )
+    dogadjaji = Dogadjaj.objects.in_bulk([p["id"] for p in pogoci if p["tip"] == "dogadjaj"])
+    for p in pogoci:
+        p["objekt"] = (dopisi if p["tip"] == "dopis" else dogadjaji).get(p["id"])
+
+    return render(
+        request,
+        "evidencija/pretraga.html",
+        {
+            "gradiliste": gradiliste,
+            "q": q,
+            "pogoci": [p for p in pogoci if p["objekt"] is not None],
+        },
+    )
+
+
 @require_GET
 @login_required
 def next_broj_for_kategorija(request, gradiliste_id):
@@ -323,21 +560,254 @@ def next_broj_for_kategorija(request, gradiliste_id):
     if not kategorija:
         return JsonResponse({"next": ""})
 
-    # svi dopisi za to gradilište i kategoriju
-    qs = Dopis.objects.filter(
-        dogadjaj__gradiliste_id=gradiliste_id, kategorija=kategorija
-    ).values_list("broj", flat=True)
-
-    # izvuci najveći broj na kraju stringa (npr. "ZZI 14" -> 14)
-    max_n = 0
-    for b in qs:
-        if not b:
-            continue
-        m = re.search(r"(\d+)\s*$", str(b))
-        if m:
-            n = int(m.group(1))
-            if n > max_n:
-                max_n = n
-
-    next_n = max_n + 1
-    return JsonResponse({"next": f"{kategorija.upper()} {next_n}"})
+    # brojač po gradilištu i kategoriji – samo čitamo, broj se rezervira tek
+    # pri spremanju dopisa (vidi Dopis.save), pa preview ne troši brojeve
+    next_n = sljedeci_broj(gradiliste_id, kategorija)
+    return JsonResponse({"next": f"{kategorija.upper()} {next_n}", "broj": next_n})
+
+
+# ---------- brzina odgovora (vidi odziv.py) ----------
+
+def _parametri_odziva(request):
+    grupiraj = request.GET.get("grupiraj") or "kategorija"
+    if grupiraj not in odziv.GRUPE:
+        raise api.GreskaUpita(f"grupiraj mora biti jedno od: {', '.join(odziv.GRUPE)}")
+    raspon = {}
+    for ime in ("od", "do"):
+        tekst = (request.GET.get(ime) or "").strip()
+        try:
+            raspon[ime] = date.fromisoformat(tekst) if tekst else None
+        except ValueError:
+            raise api.GreskaUpita(f"neispravan datum {ime} '{tekst}'")
+    return grupiraj, raspon
+
+
+def odzivi(request, gradiliste_id):
+    """Medijan / p90 / najdulje vrijeme odgovora obiju strana po kategoriji ili mjesecu."""
+    gradiliste = get_object_or_404(Gradiliste, pk=gradiliste_id)
+    try:
+        grupiraj, raspon = _parametri_odziva(request)
+    except api.GreskaUpita as e:
+        return HttpResponse(str(e), status=400)
+    return render(
+        request,
+        "evidencija/odzivi.html",
+        {
+            "gradiliste": gradiliste,
+            "grupiraj": grupiraj,
+            "grupe": list(odziv.GRUPE),
+            "od": raspon["od"],
+            "do": raspon["do"],
+            "statistika": odziv.statistika(gradiliste.id, grupiraj, **raspon),
+            "najsporiji": [
+                ("Naši najsporiji odgovori", odziv.najsporiji(gradiliste.id, "mi", **raspon)),
+                ("Njihovi najsporiji odgovori", odziv.najsporiji(gradiliste.id, "oni", **raspon)),
+            ],
+        },
+    )
+
+
+# ---------- JSON API (samo čitanje, vidi api.py) ----------
+
+def _api_promjene(request, qs):
+    """?promijenjeno_od= -> filtar + poredak (updated_at, id) za inkrementalno povlačenje."""
+    od = api.promijenjeno_od(request)
+    if od is None:
+        return qs, ("id",)
+    return qs.filter(updated_at__gte=od), ("updated_at", "id")
+
+
+@require_GET
+@login_required
+def api_gradilista(request):
+    try:
+        qs, order = _api_promjene(request, Gradiliste.objects.all())
+        return api.stranica(request, qs, api.POLJA_GRADILISTA, order)
+    except api.GreskaUpita as e:
+        return api.greska(str(e))
+
+
+@require_GET
+@login_required
+def api_dogadjaji(request):
+    """Filtri: ?gradiliste=, ?status=, ?promijenjeno_od=."""
+    try:
+        qs = Dogadjaj.objects.all()
+        if (gradiliste_id := api.broj(request, "gradiliste")) is not None:
+            qs = qs.filter(gradiliste_id=gradiliste_id)
+        if status := request.GET.get("status"):
+            qs = qs.filter(status=status)
+        qs, order = _api_promjene(request, qs)
+        return api.stranica(request, qs, api.POLJA_DOGADJAJA, order)
+    except api.GreskaUpita as e:
+        return api.greska(str(e))
+
+
+@require_GET
+@login_required
+def api_odzivi(request):
+    """?gradiliste= (obavezno), ?grupiraj=kategorija|mjesec|dogadjaj, ?od=, ?do=, ?najsporijih=."""
+    try:
+        gradiliste_id = api.broj(request, "gradiliste")
+        if gradiliste_id is None:
+            raise api.GreskaUpita("nedostaje gradiliste")
+        grupiraj, raspon = _parametri_odziva(request)
+        limit = api.broj(request, "najsporijih")
+        limit = 10 if limit is None else max(0, min(limit, api.MAX_LIMIT))
+    except api.GreskaUpita as e:
+        return api.greska(str(e))
+    return JsonResponse({
+        "gradiliste": gradiliste_id,
+        "grupiraj": grupiraj,
+        "results": odziv.statistika(gradiliste_id, grupiraj, **raspon),
+        "najsporiji": {
+            smjer: odziv.najsporiji(gradiliste_id, smjer, limit, **raspon) for smjer in ("mi", "oni")
+        },
+    })
+
+
+@require_GET
+@login_required
+def api_dopisi(request):
+    """Filtri: ?gradiliste=, ?dogadjaj=, ?kategorija=, ?status= (događaja), ?promijenjeno_od=."""
+    try:
+        qs = Dopis.objects.all()
+        if (gradiliste_id := api.broj(request, "gradiliste")) is not None:
+            qs = qs.filter(gradiliste_id=gradiliste_id)
+        if (dogadjaj_id := api.broj(request, "dogadjaj")) is not None:
+            qs = qs.filter(dogadjaj_id=dogadjaj_id)
+        if "kategorija" in request.GET:  # prazna kategorija je dopuštena vrijednost
+            qs = qs.filter(kategorija=request.GET["kategorija"].strip())
+        if status := request.GET.get("status"):
+            qs = qs.filter(dogadjaj__status=status)
+        qs, order = _api_promjene(request, qs)
+        return api.stranica(request, qs, api.POLJA_DOPISA, order)
+    except api.GreskaUpita as e:
+        return api.greska(str(e))
+
+
+@require_GET
+@staff_member_required
+def kes_statistika(request):
+    """Pogoci/promašaji keša redova dogadjaj_list, gledano iz procesa koji odgovara.
+
+    S locmem kešem brojke postoje samo u tom procesu (svaki worker ima svoje) –
+    zato se čitaju ovdje, a ne iz naredbe kes_statistika.
+    """
+    s = kes.statistika()
+    ukupno = s["hit"] + s["miss"]
+    return JsonResponse({
+        **s,
+        "omjer": round(s["hit"] / ukupno, 4) if ukupno else None,
+        "zajednicki": kes.zajednicki(),
+        "proces": os.getpid(),
+    })
+
+
+# ---------- PRILOZI: upload u komadima i preuzimanje (vidi prilozi.py) ----------
+
+@require_POST
+@login_required
+def prilog_upload(request, gradiliste_id, pk):
+    """
+    Otvara upload priloga za dopis: POST ime, velicina (B), opis ->
+    201 {"id", "primljeno": 0, "url"}. Komadi idu PUT-om na "url".
+    """
+    dopis = get_object_or_404(Dopis, pk=pk, gradiliste_id=gradiliste_id)
+    try:
+        velicina = int(request.POST.get("velicina") or 0)
+        upload = prilozi.Upload.zapocni(
+            dopis, request.POST.get("ime"), velicina, request.POST.get("opis")
+        )
+    except ValueError as e:
+        return JsonResponse({"greska": str(e)}, status=getattr(e, "status", 400))
+    url = reverse("prilog_upload_komad", args=[gradiliste_id, upload.id])
+    return JsonResponse({"id": upload.id, "primljeno": 0, "url": url}, status=201)
+
+
+@require_http_methods(["GET", "PUT"])
+@login_required
+def prilog_upload_komad(request, gradiliste_id, upload_id):
+    """
+    GET -> {"primljeno", "velicina"} (odakle nastaviti nakon prekida).
+    PUT s Content-Range: bytes a-b/ukupno i komadom u tijelu -> isto;
+    zadnji komad sprema Prilog -> 201 {"prilog", "url"}. Komad koji ne
+    nastavlja na primljeno, ili zadnji komad uploada koji se već završava
+    (ponovljen PUT) -> 409 s "primljeno".
+    """
+    upload = prilozi.Upload.ucitaj(upload_id)
+    if upload is None or upload.meta["gradiliste_id"] != gradiliste_id:
+        raise Http404("Nema takvog uploada.")
+    if request.method == "PUT":
+        try:
+            pocetak, kraj, ukupno = prilozi.content_range(request.headers.get("Content-Range"))
+            upload.dodaj(request, pocetak, kraj, ukupno)
+            if upload.gotov:
+                prilog = upload.zavrsi()
+                url = reverse("prilog_preuzmi", args=[gradiliste_id, prilog.pk])
+                return JsonResponse({"prilog": prilog.pk, "url": url}, status=201)
+        except prilozi.GreskaUploada as e:
+            return JsonResponse({"greska": str(e), "primljeno": upload.primljeno}, status=e.status)
+    return JsonResponse({"primljeno": upload.primljeno, "velicina": upload.meta["velicina"]})
+
+
+@require_safe
+def prilog_preuzmi(request, gradiliste_id, pk):
+    """
+    Prilog s ETag/Last-Modified (304) i Range (206). Ako je postavljen
+    PRILOZI_SENDFILE, datoteku šalje web server (X-Sendfile / X-Accel-Redirect),
+    pa i Range radi on. ?preuzmi=1 -> Content-Disposition: attachment.
+    """
+    prilog = get_object_or_404(Prilog, pk=pk, dopis__gradiliste_id=gradiliste_id)
+    st, ime = prilog.file.storage, prilog.file.name
+    if not ime or not st.exists(ime):
+        raise Http404("Datoteka priloga ne postoji.")
+    velicina = st.size(ime)
+    # blob se zove po SHA-256 sadržaja, pa je ime (+ veličina) dobar ETag
+    etag = f'"{os.path.splitext(os.path.basename(ime))[0]}-{velicina}"'
+    zadnja = int(prilog.uploaded_at.timestamp())
+    odgovor = get_conditional_response(request, etag=etag, last_modified=zadnja)
+    if odgovor is not None:
+        return odgovor
+
+    naziv = prilog.ime or os.path.basename(ime)
+    zaglavlja = {
+        "ETag": etag,
+        "Last-Modified": http_date(zadnja),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition_header(bool(request.GET.get("preuzmi")), naziv),
+    }
+
+    if settings.PRILOZI_SENDFILE:
+        response = HttpResponse(content_type=mimetypes.guess_type(naziv)[0] or "application/octet-stream")
+        if settings.PRILOZI_SENDFILE == "X-Accel-Redirect":
+            response["X-Accel-Redirect"] = settings.PRILOZI_SENDFILE_PREFIKS + ime
+        else:
+            response["X-Sendfile"] = st.path(ime)
+        for k, v in zaglavlja.items():
+            response[k] = v
+        return response
+
+    # If-Range: raspon samo ako klijent ima istu verziju datoteke
+    if_range = request.headers.get("If-Range")
+    try:
+        dio = None
+        if if_range is None or if_range in (etag, http_date(zadnja)):
+            dio = prilozi.raspon(request.headers.get("Range"), velicina)
+    except prilozi.NedostupanRaspon:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{velicina}"
+        return response
+
+    f = st.open(ime, "rb")
+    if dio is None:
+        response = FileResponse(f, filename=naziv)
+    else:
+        pocetak, kraj = dio
+        response = FileResponse(prilozi.Isjecak(f, pocetak, kraj - pocetak + 1), filename=naziv, status=206)
+        response["Content-Length"] = kraj - pocetak + 1
+        response["Content-Range"] = f"bytes {pocetak}-{kraj}/{velicina}"
+    response.block_size = prilozi.CHUNK_SIZE
+    for k, v in zaglavlja.items():
+        response[k] = v
+    return response
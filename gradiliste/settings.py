@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # prvi, da mjeri i ostale middlewareove (evidencija/profiliranje.py)
+    'evidencija.profiliranje.ProfilMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,11 +57,98 @@ PA_DB_PATH = Path("/home/Frenki/db_prod.sqlite3")
 if PA_DB_PATH.exists():
     DB_PATH = PA_DB_PATH
 
+# PRAGMA-e koje se postave na svaku novu konekciju (init_command):
+# WAL – čitatelji ne blokiraju pisca i obrnuto; NORMAL je u WAL-u siguran
+# (gubi se najviše zadnja transakcija kod nestanka struje, baza ostaje
+# ispravna); busy_timeout – pisac čeka na lock umjesto "database is locked";
+# cache_size u KiB (negativno), mmap_size u bajtovima.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 20000,
+    "cache_size": -20000,
+    "mmap_size": 128 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+SQLITE_OPTIONS = {
+    "init_command": ";".join(f"PRAGMA {k}={v}" for k, v in SQLITE_PRAGMAS.items()),
+    # BEGIN IMMEDIATE – transakcija odmah uzima write lock, pa nema
+    # deadlocka kad dvije transakcije krenu čitati pa obje žele pisati
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 20,
+}
+
 DATABASES = {
      "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(DB_PATH),
+        "OPTIONS": SQLITE_OPTIONS,
+        # konekcija se drži između requestova (provjeri se prije korištenja)
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        # testovi koriste datoteku, ne in-memory bazu – testovi s više dretvi
+        # (npr. brojači dopisa) trebaju pravo zaključavanje baze
+        "TEST": {"NAME": str(BASE_DIR / "test_db.sqlite3")},
+    }
+}
+
+# keš (npr. redovi dogadjaj_list, vidi evidencija/kes.py); locmem je po
+# procesu – s više worker procesa postavi KES_DIR pa svi dijele isti keš
+if os.environ.get("KES_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["KES_DIR"],
+        }
     }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# podsjetnik na rokove (evidencija/podsjetnik.py) – svaki sat, inkrementalno;
+# instalacija: manage.py crontab add
+CRONJOBS = [
+    ("0 * * * *", "evidencija.podsjetnik.pokreni"),
+    # blobovi priloga bez referenci (evidencija/prilozi.py)
+    ("30 3 * * *", "evidencija.prilozi.pocisti"),
+]
+# rok za najviše toliko dana (ili prošao) -> ide u podsjetnik
+PODSJETNIK_DANA = int(os.environ.get("PODSJETNIK_DANA", 2))
+# prazno -> podsjetnik odbija slanje (i ne pomiče watermark), ništa se ne gubi
+PODSJETNIK_PRIMATELJI = [
+    a.strip() for a in os.environ.get("PODSJETNIK_PRIMATELJI", "").split(",") if a.strip()
+]
+
+# lokalno se mailovi ispisuju u konzolu, ili spremaju u EMAIL_FILE_PATH
+if os.environ.get("EMAIL_FILE_PATH"):
+    EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+    EMAIL_FILE_PATH = os.environ["EMAIL_FILE_PATH"]
+else:
+    EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "evidencija@localhost")
+
+# preuzimanje priloga preko web servera (views.prilog_preuzmi): "" = Django
+# šalje sam, "X-Sendfile" (Apache/lighttpd) ili "X-Accel-Redirect" (nginx –
+# internal location PRILOZI_SENDFILE_PREFIKS mapiran na MEDIA_ROOT)
+PRILOZI_SENDFILE = os.environ.get("PRILOZI_SENDFILE", "")
+PRILOZI_SENDFILE_PREFIKS = os.environ.get("PRILOZI_SENDFILE_PREFIKS", "/zasticeno/")
+
+# udio requestova koje ProfilMiddleware mjeri (0 = isključeno, 1 = svi) –
+# Server-Timing zaglavlje + JSON redak u logu "evidencija.profil";
+# isključeno dok se ne postavi (npr. PROFIL_UZORAK=0.05), testovi ga
+# uključuju sami (override_settings)
+PROFIL_UZORAK = float(os.environ.get("PROFIL_UZORAK", 0))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "evidencija.profil": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -6,9 +6,11 @@ from evidencija.views import dopisi_po_kategoriji
 urlpatterns = [
     path("", views.gradiliste_list, name="gradiliste_list"),
     path("gradilista/novo/", views.gradiliste_create, name="gradiliste_create"),
+    path("kasnjenja/", views.kasnjenja, name="kasnjenja"),
 
     path("gradilista/<int:gradiliste_id>/", views.dogadjaj_list, name="dogadjaj_list"),
     path("gradilista/<int:gradiliste_id>/dogadjaj/<int:pk>/", views.dogadjaj_detail, name="dogadjaj_detail"),
+    path("gradilista/<int:gradiliste_id>/dogadjaj/<int:pk>/tijek/", views.dogadjaj_tijek, name="dogadjaj_tijek"),
 
     # ⬇⬇⬇ DODANO
     path("gradilista/<int:gradiliste_id>/dogadjaj/novo/", views.dogadjaj_create, name="dogadjaj_create"),
@@ -40,5 +42,22 @@ urlpatterns = [
 ),
 
     path("gradilista/<int:gradiliste_id>/dopisi/", dopisi_po_kategoriji, name="dopisi_po_kategoriji"),
+    path("gradilista/<int:gradiliste_id>/dopisi/export/", views.dopisi_export, name="dopisi_export"),
+    path("gradilista/<int:gradiliste_id>/pretraga/", views.pretraga, name="pretraga"),
+    path("gradilista/<int:gradiliste_id>/odzivi/", views.odzivi, name="odzivi"),
+
+    # prilozi: upload u komadima (nastavljiv) i preuzimanje s Range
+    path("gradilista/<int:gradiliste_id>/dopis/<int:pk>/prilozi/upload/", views.prilog_upload, name="prilog_upload"),
+    path("gradilista/<int:gradiliste_id>/prilozi/upload/<str:upload_id>/", views.prilog_upload_komad, name="prilog_upload_komad"),
+    path("gradilista/<int:gradiliste_id>/prilog/<int:pk>/", views.prilog_preuzmi, name="prilog_preuzmi"),
+
+    # JSON API za izvještaje (samo čitanje)
+    path("api/gradilista/", views.api_gradilista, name="api_gradilista"),
+    path("api/dogadjaji/", views.api_dogadjaji, name="api_dogadjaji"),
+    path("api/dopisi/", views.api_dopisi, name="api_dopisi"),
+    path("api/odzivi/", views.api_odzivi, name="api_odzivi"),
+
+    # pogoci keša dogadjaj_list iz procesa koji poslužuje (samo staff)
+    path("kes/statistika/", views.kes_statistika, name="kes_statistika"),
     
 ]